@@ -1,156 +1,942 @@
 """
 ai.py - AIEngine sử dụng Minimax với Alpha-Beta Pruning.
+
+Hai thuật toán tìm (tham số `algorithm`), cho cùng nước đi ở cùng độ sâu:
+- "alphabeta": minimax hai nhánh max/min (_minimax).
+- "pvs": negamax Principal Variation Search (_pvs). Nước đầu tiên (PV)
+  được tìm với cửa sổ đầy đủ, các nước sau chỉ thăm dò bằng cửa sổ rỗng
+  (alpha, alpha + 1) và tìm lại khi vượt alpha; ở gốc, mỗi vòng lặp sâu
+  dần bắt đầu với cửa sổ aspiration quanh điểm của vòng lặp trước.
 """
 
-from typing import Optional
+import threading
+import time
+from typing import Callable, Iterator, Optional, Union
 from consts import (
-    BOARD_SIZE, WIN_CONDITION, EMPTY, HUMAN, AI,
-    AI_DEPTH, NEIGHBOR_RADIUS, DIRECTIONS,
-    SCORE_FIVE, SCORE_OPEN_FOUR, SCORE_CLOSED_FOUR,
-    SCORE_OPEN_THREE, SCORE_CLOSED_THREE,
-    SCORE_OPEN_TWO, SCORE_CLOSED_TWO, SCORE_ONE,
-    DEFENSE_MULTIPLIER
+    HUMAN, AI,
+    AI_DEPTH, PONDER_REPLIES, SEARCH_ALGORITHM, ASPIRATION_WINDOW, MAX_SEARCH_DEPTH, TIME_CHECK_INTERVAL, BEAM_WIDTH,
+    NEIGHBOR_RADIUS, TT_SIZE, TT_REPLACEMENT, BOARD_BACKEND, THREAT_SEARCH, THREAT_TIME_SHARE,
+    OPENING_BOOK_PATH, PERSISTENT_CACHE_PATH, PERSISTENT_CACHE_MIN_DEPTH,
+    SCORE_FIVE, DEFENSE_MULTIPLIER
 )
 from board import Board
+from bitboard import BitBoard
+from geometry import Geometry, get_geometry
+from evaluator import score_grid
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from threats import (
+    ThreatSolver, shape_at, shape_tables, SHAPE_BY_WEIGHT,
+    SHAPE_OPEN_THREE, SHAPE_FOUR, SHAPE_OPEN_FOUR, SHAPE_FIVE
+)
+from patterns import WINDOW_MASK
+from book import OpeningBook
+from persistent_cache import PersistentCache
+from instrumentation import (
+    SearchStats, SearchProfiler, stats_enabled,
+    count_check_winner, count_candidates, time_evaluate, time_candidates, time_classify, time_ordering
+)
+
+
+class SearchTimeout(Exception):
+    """Hết thời gian tìm kiếm giữa chừng một vòng lặp sâu dần."""
+
+
+class SearchResult:
+    __slots__ = ('move', 'score', 'depth', 'nodes', 'elapsed', 'pv',
+                 'nodes_per_ply', 'cutoffs_per_ply', 'stats', 'ponder_hit')
+    
+    def __init__(self, move: Optional[tuple[int, int]], score: float = 0.0, depth: int = 0,
+                 nodes: int = 0, elapsed: float = 0.0,
+                 pv: Optional[list[tuple[int, int]]] = None,
+                 nodes_per_ply: Optional[list[int]] = None,
+                 cutoffs_per_ply: Optional[list[int]] = None) -> None:
+        self.move = move
+        self.score = score
+        self.depth = depth          # Độ sâu của vòng lặp cuối cùng đã hoàn tất
+        self.nodes = nodes          # Tổng số node của mọi vòng lặp
+        self.elapsed = elapsed
+        self.pv = pv if pv is not None else ([move] if move else [])
+        # Số node / số lần cắt beta theo từng ply của vòng lặp cuối đã hoàn tất
+        self.nodes_per_ply = nodes_per_ply if nodes_per_ply is not None else []
+        self.cutoffs_per_ply = cutoffs_per_ply if cutoffs_per_ply is not None else []
+        self.stats: Optional[SearchStats] = None    # Gắn bởi AIEngine.search
+        self.ponder_hit = False     # Lấy từ kết quả đã tìm sẵn trong lúc ponder
+    
+    @property
+    def branching_factors(self) -> list[float]:
+        # Hệ số phân nhánh hiệu dụng giữa hai ply liên tiếp
+        counts = self.nodes_per_ply
+        return [counts[i + 1] / counts[i] for i in range(len(counts) - 1) if counts[i]]
+    
+    def __repr__(self) -> str:
+        return (f"SearchResult(move={self.move}, score={self.score}, depth={self.depth}, "
+                f"nodes={self.nodes}, elapsed={self.elapsed:.3f}s, pv={self.pv})")
+
+
+BOARD_BACKENDS: tuple[str, ...] = ("list", "bitboard")
+SEARCH_ALGORITHMS: tuple[str, ...] = ("alphabeta", "pvs")
+
+# Độ rộng cửa sổ rỗng của PVS. Điểm là số thực (DEFENSE_MULTIPLIER) nên có
+# thể rơi vào giữa (alpha, alpha + 1); kết quả vẫn đúng vì mọi điểm lớn hơn
+# alpha (kể cả nằm trong cửa sổ) đều được tìm lại với cửa sổ đầy đủ.
+_NULL_WINDOW = 1
+
+
+# Nhóm ưu tiên khi sắp xếp nước đi (lớn hơn được thử trước)
+_ORDER_PV = 8
+_ORDER_TT = 7
+_ORDER_OPEN_FOUR = 6        # Tạo bốn mở / hai bốn / bốn-ba
+_ORDER_BLOCK_THREE = 5      # Chặn ba mở của đối thủ (ô đối thủ sẽ thành bốn mở)
+_ORDER_FOUR = 4
+_ORDER_OPEN_THREE = 3
+_ORDER_KILLER = 2           # Killer thứ nhất; killer thứ hai dùng _ORDER_KILLER - 1
+_ORDER_SHIFT = 32           # Điểm history nằm ở các bit thấp
+
+
+def _negate_bound(score: float, flag: int) -> tuple[float, int]:
+    # Đổi điểm TT sang góc nhìn bên kia: cận dưới thành cận trên và ngược lại
+    if flag == LOWER: flag = UPPER
+    elif flag == UPPER: flag = LOWER
+    return -score, flag
 
 
 class AIEngine:
-    __slots__ = ('_depth', '_board')
+    __slots__ = ('_depth', '_time_limit', '_max_depth', '_backend', '_algorithm', '_beam_width',
+                 '_board', '_tt', '_nodes', '_deadline', '_pv_table', '_last_result',
+                 '_root_depth', '_killers', '_history', '_ply_nodes', '_ply_cutoffs',
+                 '_threat_solver', '_instrument', '_stats', '_profiler',
+                 '_check_winner', '_evaluate', '_candidates', '_order', '_neighbors', '_classify',
+                 '_move_buffers', '_on_iteration',
+                 '_stop_event', '_ponder_results', '_book', '_cache', '_geometry', '_active_cache')
     
-    def __init__(self, depth: int = AI_DEPTH) -> None:
+    def __init__(self, depth: int = AI_DEPTH, time_limit: Optional[float] = None,
+                 max_depth: int = MAX_SEARCH_DEPTH, tt_size: int = TT_SIZE,
+                 tt_policy: str = TT_REPLACEMENT, board_backend: str = BOARD_BACKEND,
+                 algorithm: str = SEARCH_ALGORITHM,
+                 beam_width: Optional[int] = BEAM_WIDTH,
+                 threat_search: bool = THREAT_SEARCH,
+                 instrument: Optional[bool] = None,
+                 opening_book: Union[str, OpeningBook, None] = OPENING_BOOK_PATH,
+                 persistent_cache: Union[str, PersistentCache, None] = PERSISTENT_CACHE_PATH) -> None:
+        if board_backend not in BOARD_BACKENDS:
+            raise ValueError(f"board_backend phải là một trong {BOARD_BACKENDS}, nhận {board_backend!r}")
+        if algorithm not in SEARCH_ALGORITHMS:
+            raise ValueError(f"algorithm phải là một trong {SEARCH_ALGORITHMS}, nhận {algorithm!r}")
         self._depth: int = depth
+        self._time_limit: Optional[float] = time_limit
+        self._max_depth: int = max_depth
+        self._backend: str = board_backend
+        self._algorithm: str = algorithm
+        self._beam_width: Optional[int] = beam_width
         self._board: Optional[Board] = None
+        self._tt: TranspositionTable = TranspositionTable(tt_size, tt_policy)
+        self._nodes: int = 0
+        self._deadline: Optional[float] = None
+        self._pv_table: dict[int, tuple[int, int]] = {}
+        self._last_result: Optional[SearchResult] = None
+        self._root_depth: int = 0
+        self._killers: list[list[Optional[tuple[int, int]]]] = []
+        # Bảng history theo kích thước bàn cờ của lượt tìm (xem _set_geometry)
+        self._geometry: Optional[Geometry] = None
+        self._history: dict[str, list[list[int]]] = {}
+        self._ply_nodes: list[int] = []
+        self._ply_cutoffs: list[int] = []
+        # Tìm chuỗi thắng VCF/VCT vượt tầm nhìn của minimax (None = tắt)
+        self._threat_solver: Optional[ThreatSolver] = ThreatSolver() if threat_search else None
+        # Thống kê chi tiết (None = theo biến môi trường CARO_STATS)
+        self._instrument: bool = stats_enabled() if instrument is None else instrument
+        self._stats: SearchStats = SearchStats(self._instrument)
+        self._profiler: Optional[SearchProfiler] = SearchProfiler.from_env()
+        # Các hàm gọi trong vòng lặp nóng, được thay bằng bản có đo đếm khi bật thống kê
+        self._check_winner: Optional[Callable[[int, int], Optional[str]]] = None
+        self._evaluate: Callable[[], float] = self._evaluate_board
+        self._candidates: Callable[[], list[tuple[int, int]]] = self._get_candidate_moves
+        self._order: Callable[..., list[tuple[int, int]]] = self._order_moves
+        self._neighbors: Optional[Callable[[], set[tuple[int, int]]]] = None
+        self._classify: Callable[..., Optional[tuple[int, int]]] = self._classify_moves
+        # Bộ đệm (ép buộc, đe dọa, còn lại) theo ply của _staged_moves, dùng lại giữa các node
+        self._move_buffers: list[tuple[list[int], list[int], list[int]]] = []
+        self._on_iteration: Optional[Callable[[SearchResult], None]] = None
+        self._stop_event: Optional[threading.Event] = None
+        # Kết quả tìm sẵn khi ponder: zobrist hash -> (depth, time_limit, kết quả)
+        self._ponder_results: dict[int, tuple[int, Optional[float], SearchResult]] = {}
+        # Sách khai cuộc (file chỉ được mở ở lần tra đầu tiên; None = không dùng)
+        if isinstance(opening_book, str):
+            opening_book = OpeningBook(opening_book)
+        self._book: Optional[OpeningBook] = opening_book
+        # Cache trên đĩa dùng chung giữa các process, làm nóng _minimax giữa các ván
+        if isinstance(persistent_cache, str):
+            persistent_cache = PersistentCache(persistent_cache)
+        self._cache: Optional[PersistentCache] = persistent_cache
+        # Cache của lượt tìm hiện tại: file cache chỉ dành cho bàn cờ mặc định
+        self._active_cache: Optional[PersistentCache] = None
+    
+    @property
+    def transposition_table(self) -> TranspositionTable:
+        return self._tt
+    
+    @property
+    def persistent_cache(self) -> Optional[PersistentCache]:
+        return self._cache
+    
+    @property
+    def board_backend(self) -> str:
+        return self._backend
+    
+    @property
+    def algorithm(self) -> str:
+        return self._algorithm
+    
+    @property
+    def last_result(self) -> Optional[SearchResult]:
+        return self._last_result
+    
+    @property
+    def instrument(self) -> bool:
+        return self._instrument
     
     def get_best_move(self, board: Board) -> Optional[tuple[int, int]]:
-        self._board = board
+        return self.search(board).move
+    
+    def search(self, board: Board, depth: Optional[int] = None,
+               time_limit: Optional[float] = None,
+               on_iteration: Optional[Callable[[SearchResult], None]] = None,
+               stop_event: Optional[threading.Event] = None) -> SearchResult:
+        """
+        Tìm nước đi tốt nhất bằng iterative deepening.
+        
+        - Chỉ có depth: tìm sâu dần 1..depth.
+        - Có time_limit (giây): tìm sâu dần tới khi hết giờ (tối đa depth
+          hoặc max_depth), trả về kết quả của vòng lặp cuối đã hoàn tất.
+        - Không truyền gì: dùng cấu hình lúc khởi tạo engine.
+        
+        on_iteration (nếu có) được gọi với kết quả của mỗi vòng lặp vừa
+        hoàn tất, trong thread đang tìm kiếm. Khi stop_event được set (từ
+        thread khác), lượt tìm dừng như hết giờ và trả về kết quả của vòng
+        lặp cuối đã hoàn tất.
+        """
+        if depth is None and time_limit is None:
+            depth, time_limit = (None, self._time_limit) if self._time_limit else (self._depth, None)
+        if depth is None:
+            depth = self._max_depth
+        
+        cached = self._ponder_results.pop(board.zobrist_hash, None)
+        self._ponder_results.clear()
+        if cached is not None and cached[:2] == (depth, time_limit):
+            result = cached[2]
+            result.ponder_hit = True
+            self._last_result = result
+            return result
+        
+        self._on_iteration = on_iteration
+        self._stop_event = stop_event
+        try:
+            if self._profiler is not None:
+                with self._profiler:
+                    return self._timed_search(board, depth, time_limit)
+            return self._timed_search(board, depth, time_limit)
+        finally:
+            self._on_iteration = None
+            self._stop_event = None
+    
+    def _timed_search(self, board: Board, depth: int, time_limit: Optional[float]) -> SearchResult:
+        start = time.perf_counter()
+        self._deadline = start + time_limit if time_limit is not None else None
+        if self._deadline is None and self._stop_event is not None:
+            # Bật kiểm tra định kỳ để còn đọc được stop_event
+            self._deadline = float('inf')
+        self._nodes = 0
+        self._stats = SearchStats(self._instrument)
+        self._tt.reset_stats()
+        result = self._search(board, depth)
+        result.nodes = self._nodes
+        result.elapsed = time.perf_counter() - start
+        self._deadline = None
+        
+        stats = self._stats
+        stats.nodes = result.nodes
+        stats.elapsed = result.elapsed
+        stats.nodes_per_ply = result.nodes_per_ply
+        stats.cutoffs_per_ply = result.cutoffs_per_ply
+        stats.tt = self._tt.stats()
+        result.stats = stats
+        self._last_result = result
+        return result
+    
+    def ponder(self, board: Board, stop_event: threading.Event,
+               replies: int = PONDER_REPLIES) -> int:
+        """
+        Tìm trước cho các nước trả lời khả dĩ nhất của HUMAN (tới lượt HUMAN).
+        
+        Chạy tới khi xong `replies` nước dự đoán hoặc stop_event được set.
+        Nước dự đoán là best move trong TT (PV của lượt tìm trước) rồi tới
+        các nước đứng đầu theo thứ tự sắp xếp nước đi. Mỗi thế cờ sau nước
+        trả lời được tìm với cấu hình mặc định của engine; nếu HUMAN đánh
+        đúng nước đó, search() trả về kết quả ngay. Nếu đánh nước khác,
+        search() tìm như bình thường với TT/history đã được làm nóng.
+        
+        Returns:
+            Số nước dự đoán đã tìm xong
+        """
+        self._ponder_results = {}
+        if board.move_count < 2 or board.is_full():
+            return 0
+        predictions = self.predict_replies(board, replies)
+        
+        depth, time_limit = (None, self._time_limit) if self._time_limit else (self._depth, None)
+        results: dict[int, tuple[int, Optional[float], SearchResult]] = {}
+        for row, col in predictions:
+            if stop_event.is_set():
+                break
+            child = board.clone()
+            child.make_move(row, col, HUMAN)
+            if child.check_winner(row, col) is not None or child.is_full():
+                continue
+            result = self.search(child, depth, time_limit, stop_event=stop_event)
+            if stop_event.is_set():
+                break   # Bị ngắt giữa chừng: kết quả chưa đủ sâu
+            results[child.zobrist_hash] = (depth if depth is not None else self._max_depth,
+                                           time_limit, result)
+        self._ponder_results = results
+        return len(results)
+    
+    def predict_replies(self, board: Board, count: int) -> list[tuple[int, int]]:
+        """
+        Các nước trả lời khả dĩ nhất của HUMAN (tới lượt HUMAN), tốt nhất trước.
+        
+        Dựa trên best move trong TT và thứ tự sắp xếp nước đi, không tìm kiếm.
+        """
+        self._set_search_board(board)
+        entry = self._tt.probe(board.zobrist_hash)
+        return self._order_moves(
+            self._get_candidate_moves(), HUMAN, 1, None, entry[3] if entry is not None else None
+        )[:count]
+    
+    def score_root_move(self, board: Board, move: tuple[int, int], depth: int,
+                        alpha: float = float('-inf'),
+                        time_limit: Optional[float] = None) -> Optional[float]:
+        """
+        Điểm của một nước ở gốc với độ sâu cố định và cửa sổ (alpha, +inf).
+        
+        Dùng cho tìm kiếm song song chia theo nước ở gốc (xem parallel.py).
+        Trả về None nếu hết time_limit trước khi tìm xong.
+        """
+        self._deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        self._nodes = 0
+        self._stats = SearchStats(self._instrument)
+        self._set_search_board(board)
+        if len(self._killers) <= depth:
+            self._killers = [[None, None] for _ in range(depth + 1)]
+        if len(self._move_buffers) <= depth:
+            self._move_buffers = [([], [], []) for _ in range(depth + 1)]
+        self._begin_iteration(depth)
+        try:
+            return self._score_root_move(move, depth, alpha)
+        except SearchTimeout:
+            return None
+        finally:
+            self._deadline = None
+    
+    @property
+    def nodes(self) -> int:
+        # Số node của lần tìm gần nhất (search hoặc score_root_move)
+        return self._nodes
+    
+    def _set_search_board(self, board: Board) -> None:
+        # Tìm trên bản sao để có thể bỏ ngang khi hết giờ mà không làm hỏng bàn cờ gốc
+        if self._backend == "bitboard" and not isinstance(board, BitBoard):
+            self._board = BitBoard.from_board(board)
+        else:
+            self._board = board.clone()
+        if board.geometry is not self._geometry:
+            self._set_geometry(board.geometry)
+        self._install_hooks()
+    
+    def _set_geometry(self, geometry: Geometry) -> None:
+        # Đổi kích thước/luật: khóa Zobrist và ô của bàn cờ cũ không còn nghĩa
+        previous = self._geometry
+        self._geometry = geometry
+        self._history = {
+            player: [[0] * geometry.size for _ in range(geometry.size)] for player in (HUMAN, AI)
+        }
+        if previous is not None:
+            self._tt.clear()
+        self._ponder_results = {}
+        self._active_cache = self._cache if geometry is get_geometry() else None
+    
+    def _install_hooks(self) -> None:
+        # Khi tắt thống kê, vòng lặp nóng gọi thẳng bound method, không tốn thêm gì
+        self._check_winner = self._board.check_winner
+        self._neighbors = self._board.neighbor_cells
+        if not self._instrument:
+            return
+        stats = self._stats
+        self._check_winner = count_check_winner(self._check_winner, stats)
+        # Frontier chỉ được đọc trong _classify_moves nên chỉ đếm, thời gian tính ở _classify
+        self._neighbors = count_candidates(self._neighbors, stats)
+        self._classify = time_classify(self._classify_moves, stats)
+        self._evaluate = time_evaluate(self._evaluate_board, stats)
+        self._candidates = time_candidates(self._get_candidate_moves, stats)
+        self._order = time_ordering(self._order_moves, stats)
+    
+    def _prepare_search(self, board: Board, max_depth: int) -> list[tuple[int, int]]:
+        # Khởi tạo trạng thái cho một lượt tìm và trả về các nước ở gốc đã sắp xếp
+        self._set_search_board(board)
+        self._tt.new_search()
+        self._pv_table = {}
+        self._killers = [[None, None] for _ in range(max_depth + 1)]
+        if len(self._move_buffers) <= max_depth:
+            self._move_buffers = [([], [], []) for _ in range(max_depth + 1)]
+        self._age_history()
+        entry = self._tt.probe(board.zobrist_hash)
+        return self._order(
+            self._candidates(), AI, 0, None, entry[3] if entry is not None else None
+        )
+    
+    def _begin_iteration(self, depth: int) -> None:
+        self._root_depth = depth
+        self._ply_nodes = [1] + [0] * depth
+        self._ply_cutoffs = [0] * (depth + 1)
+    
+    def _finish_iteration(self, candidate_moves: list[tuple[int, int]], best_move: tuple[int, int],
+                          best_score: float, depth: int) -> SearchResult:
+        # Lưu gốc vào TT, dựng PV và dùng PV để sắp xếp nước đi cho vòng lặp sau
+        self._tt.store(self._board.zobrist_hash, depth, best_score, EXACT, best_move)
+        if self._active_cache is not None:
+            self._active_cache.store(self._board.canonical_hash(), True, depth, best_score, EXACT, best_move)
+        pv = self._extract_pv(best_move, depth)
+        self._seed_pv(pv)
+        self._order_first(candidate_moves, best_move)
+        return SearchResult(best_move, best_score, depth, pv=pv,
+                            nodes_per_ply=self._ply_nodes, cutoffs_per_ply=self._ply_cutoffs)
+    
+    def _search(self, board: Board, max_depth: int) -> SearchResult:
+        if self._book is not None:
+            entry = self._book.probe(board)
+            if entry is not None:
+                move, depth, score = entry
+                return SearchResult(move, score, depth)
         if board.move_count == 0:
-            center = BOARD_SIZE // 2
-            return (center, center)
+            center = board.size // 2
+            return SearchResult((center, center))
         if board.move_count == 1:
-            return self._get_adjacent_to_opponent()
+            self._board = board
+            return SearchResult(self._get_adjacent_to_opponent())
+        
+        candidate_moves = self._prepare_search(board, max_depth)
+        if not candidate_moves:
+            return SearchResult(None)
+        
+        if self._threat_solver is not None:
+            # Có giới hạn thời gian: solver chỉ được một phần thời gian còn lại,
+            # phần lớn để dành cho minimax (ít nhất độ sâu 1 phải xong)
+            deadline = None
+            if self._deadline is not None and self._deadline != float('inf'):
+                now = time.perf_counter()
+                deadline = now + max(0.0, self._deadline - now) * THREAT_TIME_SHARE
+            line = self._threat_solver.solve(self._board, AI, deadline, self._stop_event)
+            self._nodes += self._threat_solver.nodes
+            self._stats.threat_nodes = self._threat_solver.nodes
+            if line is not None:
+                return SearchResult(line[0], SCORE_FIVE + len(line), len(line), pv=line)
         
+        result = SearchResult(candidate_moves[0])
+        # Điểm gốc theo độ sâu: điểm dao động theo bên đi nước cuối nên aspiration
+        # lấy vòng lặp cùng tính chẵn lẻ (depth - 2)
+        scores: list[float] = []
+        max_depth = min(max_depth, board.size ** 2 - board.move_count)
+        for depth in range(1, max_depth + 1):
+            self._begin_iteration(depth)
+            try:
+                if self._algorithm == "pvs" and depth > 2:
+                    best_move, best_score = self._aspiration_root(candidate_moves, depth, scores[-2])
+                else:
+                    best_move, best_score = self._search_root(candidate_moves, depth)
+            except SearchTimeout:
+                break
+            result = self._finish_iteration(candidate_moves, best_move, best_score, depth)
+            scores.append(best_score)
+            if self._on_iteration is not None:
+                result.nodes = self._nodes
+                self._on_iteration(result)
+            if abs(best_score) >= SCORE_FIVE: break
+        return result
+    
+    def _search_root(self, candidate_moves: list[tuple[int, int]], depth: int,
+                     alpha: float = float('-inf'),
+                     beta: float = float('inf')) -> tuple[tuple[int, int], float]:
         best_move = None
         best_score = float('-inf')
-        alpha = float('-inf')
-        beta = float('inf')
-        
-        candidate_moves = self._get_candidate_moves()
+        pvs = self._algorithm == "pvs"
         
-        for row, col in candidate_moves:
-            board.make_move(row, col, AI)
-            
-            if board.check_winner(row, col) == AI:
-                board.undo_move(row, col)
-                return (row, col)
-            
-            score = self._minimax(self._depth - 1, False, alpha, beta, (row, col))
-            board.undo_move(row, col)
+        for move in candidate_moves:
+            if pvs and best_move is not None:
+                # Chỉ cần biết nước này có hơn alpha không; hơn thì tìm lại lấy điểm chính xác
+                score = self._score_root_move(move, depth, alpha, alpha + _NULL_WINDOW)
+                if alpha < score < beta:
+                    score = self._score_root_move(move, depth, alpha, beta)
+            else:
+                score = self._score_root_move(move, depth, alpha, beta)
             
             if score > best_score:
                 best_score = score
-                best_move = (row, col)
+                best_move = move
+                # Thắng ngay: không nước nào khác có điểm cao hơn
+                if score >= SCORE_FIVE + depth: break
             
             alpha = max(alpha, score)
+            if alpha >= beta: break
         
-        return best_move
+        return best_move, best_score
     
-    def _minimax(self, depth: int, is_maximizing: bool, alpha: float, beta: float, last_move: tuple[int, int]) -> float:
-        winner = self._board.check_winner(last_move[0], last_move[1])
+    def _aspiration_root(self, candidate_moves: list[tuple[int, int]], depth: int,
+                         guess: float) -> tuple[tuple[int, int], float]:
+        """
+        Tìm ở gốc với cửa sổ (guess - ASPIRATION_WINDOW, guess + ASPIRATION_WINDOW).
+        
+        Điểm rơi ra ngoài cửa sổ chỉ là một cận: mở phía bị vượt ra vô cùng
+        rồi tìm lại (mỗi phía tối đa một lần).
+        """
+        if abs(guess) >= SCORE_FIVE:
+            return self._search_root(candidate_moves, depth)
+        alpha = guess - ASPIRATION_WINDOW
+        beta = guess + ASPIRATION_WINDOW
+        while True:
+            best_move, best_score = self._search_root(candidate_moves, depth, alpha, beta)
+            if best_score <= alpha and alpha > float('-inf'):
+                alpha = float('-inf')
+            elif best_score >= beta and beta < float('inf'):
+                beta = float('inf')
+            else:
+                return best_move, best_score
+    
+    def _score_root_move(self, move: tuple[int, int], depth: int, alpha: float,
+                         beta: float = float('inf')) -> float:
+        board = self._board
+        row, col = move
+        board.make_move(row, col, AI)
+        if self._check_winner(row, col) == AI:
+            score = SCORE_FIVE + depth
+        elif self._algorithm == "pvs":
+            score = -self._pvs(depth - 1, HUMAN, -beta, -alpha)
+        else:
+            score = self._minimax(depth - 1, False, alpha, beta)
+        board.undo_move(row, col)
+        return score
+    
+    def _extract_pv(self, best_move: tuple[int, int], depth: int) -> list[tuple[int, int]]:
+        # Đi theo best move trong transposition table để dựng principal variation
+        board = self._board.clone()
+        pv = [best_move]
+        player = AI
+        board.make_move(best_move[0], best_move[1], player)
+        while len(pv) < depth and board.check_winner(*pv[-1]) is None:
+            entry = self._tt.probe(board.zobrist_hash)
+            if entry is None or entry[3] is None or not board.is_valid_move(*entry[3]): break
+            player = HUMAN if player == AI else AI
+            board.make_move(entry[3][0], entry[3][1], player)
+            pv.append(entry[3])
+        return pv
+    
+    def _seed_pv(self, pv: list[tuple[int, int]]) -> None:
+        board = self._board.clone()
+        player = AI
+        self._pv_table = {}
+        for move in pv:
+            self._pv_table[board.zobrist_hash] = move
+            board.make_move(move[0], move[1], player)
+            player = HUMAN if player == AI else AI
+    
+    def _minimax(self, depth: int, is_maximizing: bool, alpha: float, beta: float) -> float:
+        self._nodes += 1
+        ply = self._root_depth - depth
+        self._ply_nodes[ply] += 1
+        if (self._deadline is not None and self._nodes % TIME_CHECK_INTERVAL == 0
+                and (time.perf_counter() >= self._deadline
+                     or (self._stop_event is not None and self._stop_event.is_set()))):
+            raise SearchTimeout
+        
+        last_row, last_col = self._board.last_move
+        winner = self._check_winner(last_row, last_col)
         if winner == AI:
             return SCORE_FIVE + depth
         if winner == HUMAN:
             return -SCORE_FIVE - depth
         if self._board.is_full():
             return 0
+        
+        # Tra transposition table: dùng điểm nếu đủ sâu, nếu không chỉ lấy best move để sắp xếp
+        key = self._board.zobrist_hash
+        entry = self._tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            if tt_depth >= depth:
+                if tt_flag == EXACT: return tt_score
+                if tt_flag == LOWER: alpha = max(alpha, tt_score)
+                else: beta = min(beta, tt_score)
+                if beta <= alpha: return tt_score
         if depth == 0:
-            return self._evaluate_board()
+            score = self._evaluate()
+            self._tt.store(key, 0, score, EXACT, None)
+            return score
+        
+        # Cache trên đĩa: chỉ tra khi TT không đủ sâu, ở các node đủ lớn để bù chi phí chuẩn hóa hash
+        canonical = None
+        cache = self._active_cache
+        if cache is not None and depth >= PERSISTENT_CACHE_MIN_DEPTH:
+            canonical = self._board.canonical_hash()
+            if entry is None or entry[0] < depth:
+                cached = cache.probe(canonical, is_maximizing)
+                if cached is not None:
+                    cached_depth, cached_score, cached_flag, cached_move = cached
+                    if cached_move is not None and self._board.is_valid_move(*cached_move):
+                        tt_move = cached_move
+                    if cached_depth >= depth:
+                        if cached_flag == EXACT: return cached_score
+                        if cached_flag == LOWER: alpha = max(alpha, cached_score)
+                        else: beta = min(beta, cached_score)
+                        if beta <= alpha: return cached_score
+        alpha_orig, beta_orig = alpha, beta
         
-        candidate_moves = self._get_candidate_moves()
+        player = AI if is_maximizing else HUMAN
+        candidate_moves = self._staged_moves(player, ply, self._pv_table.get(key), tt_move)
+        best_move = None
         
         if is_maximizing:
-            max_score = float('-inf')
+            best_score = float('-inf')
             for row, col in candidate_moves:
                 self._board.make_move(row, col, AI)
-                score = self._minimax(depth - 1, False, alpha, beta, (row, col))
+                score = self._minimax(depth - 1, False, alpha, beta)
                 self._board.undo_move(row, col)
-                max_score = max(max_score, score)
+                if score > best_score:
+                    best_score = score
+                    best_move = (row, col)
                 alpha = max(alpha, score)
                 if beta <= alpha: break
-            return max_score
         else:
-            min_score = float('inf')
+            best_score = float('inf')
             for row, col in candidate_moves:
                 self._board.make_move(row, col, HUMAN)
-                score = self._minimax(depth - 1, True, alpha, beta, (row, col))
+                score = self._minimax(depth - 1, True, alpha, beta)
                 self._board.undo_move(row, col)
-                min_score = min(min_score, score)
+                if score < best_score:
+                    best_score = score
+                    best_move = (row, col)
                 beta = min(beta, score)
                 if beta <= alpha: break
-            return min_score
+        
+        if beta <= alpha:
+            self._record_cutoff(best_move, player, ply, depth)
+        
+        if best_score <= alpha_orig: flag = UPPER
+        elif best_score >= beta_orig: flag = LOWER
+        else: flag = EXACT
+        self._tt.store(key, depth, best_score, flag, best_move)
+        if canonical is not None:
+            cache.store(canonical, is_maximizing, depth, best_score, flag, best_move)
+        return best_score
     
-    def _get_candidate_moves(self) -> list[tuple[int, int]]:
-        candidates: set[tuple[int, int]] = set()
-        center = BOARD_SIZE // 2
+    def _pvs(self, depth: int, player: str, alpha: float, beta: float) -> float:
+        """
+        Negamax PVS: điểm theo góc nhìn của `player` (bên tới lượt).
+        
+        TT và cache trên đĩa vẫn lưu điểm theo góc nhìn của AI như _minimax
+        nên hai thuật toán dùng chung được dữ liệu.
+        """
+        self._nodes += 1
+        ply = self._root_depth - depth
+        self._ply_nodes[ply] += 1
+        if (self._deadline is not None and self._nodes % TIME_CHECK_INTERVAL == 0
+                and (time.perf_counter() >= self._deadline
+                     or (self._stop_event is not None and self._stop_event.is_set()))):
+            raise SearchTimeout
+        
+        board = self._board
+        last_row, last_col = board.last_move
+        # Chỉ bên vừa đi mới có thể thắng
+        if self._check_winner(last_row, last_col) is not None:
+            return -SCORE_FIVE - depth
+        if board.is_full():
+            return 0
+        maximizing = player == AI
+        
+        key = board.zobrist_hash
+        entry = self._tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            if tt_depth >= depth:
+                if not maximizing:
+                    tt_score, tt_flag = _negate_bound(tt_score, tt_flag)
+                if tt_flag == EXACT: return tt_score
+                if tt_flag == LOWER: alpha = max(alpha, tt_score)
+                else: beta = min(beta, tt_score)
+                if beta <= alpha: return tt_score
+        if depth == 0:
+            score = self._evaluate()
+            self._tt.store(key, 0, score, EXACT, None)
+            return score if maximizing else -score
         
-        for played_row, played_col in self._board.played_cells:
-            for dr in range(-NEIGHBOR_RADIUS, NEIGHBOR_RADIUS + 1):
-                for dc in range(-NEIGHBOR_RADIUS, NEIGHBOR_RADIUS + 1):
-                    if dr == 0 and dc == 0: continue
-                    nr, nc = played_row + dr, played_col + dc
-                    if self._board.is_valid_move(nr, nc):
-                        candidates.add((nr, nc))
+        canonical = None
+        cache = self._active_cache
+        if cache is not None and depth >= PERSISTENT_CACHE_MIN_DEPTH:
+            canonical = board.canonical_hash()
+            if entry is None or entry[0] < depth:
+                cached = cache.probe(canonical, maximizing)
+                if cached is not None:
+                    cached_depth, cached_score, cached_flag, cached_move = cached
+                    if cached_move is not None and board.is_valid_move(*cached_move):
+                        tt_move = cached_move
+                    if cached_depth >= depth:
+                        if not maximizing:
+                            cached_score, cached_flag = _negate_bound(cached_score, cached_flag)
+                        if cached_flag == EXACT: return cached_score
+                        if cached_flag == LOWER: alpha = max(alpha, cached_score)
+                        else: beta = min(beta, cached_score)
+                        if beta <= alpha: return cached_score
+        alpha_orig = alpha
         
-        return sorted(candidates, key=lambda p: abs(p[0] - center) + abs(p[1] - center))
+        opponent = HUMAN if maximizing else AI
+        best_move = None
+        best_score = float('-inf')
+        for row, col in self._staged_moves(player, ply, self._pv_table.get(key), tt_move):
+            board.make_move(row, col, player)
+            if best_move is None:
+                score = -self._pvs(depth - 1, opponent, -beta, -alpha)
+            else:
+                score = -self._pvs(depth - 1, opponent, -alpha - _NULL_WINDOW, -alpha)
+                if alpha < score < beta:
+                    score = -self._pvs(depth - 1, opponent, -beta, -alpha)
+            board.undo_move(row, col)
+            if score > best_score:
+                best_score = score
+                best_move = (row, col)
+            alpha = max(alpha, score)
+            if alpha >= beta: break
+        
+        if alpha >= beta:
+            self._record_cutoff(best_move, player, ply, depth)
+        
+        if best_score <= alpha_orig: flag = UPPER
+        elif best_score >= beta: flag = LOWER
+        else: flag = EXACT
+        stored, stored_flag = (best_score, flag) if maximizing else _negate_bound(best_score, flag)
+        self._tt.store(key, depth, stored, stored_flag, best_move)
+        if canonical is not None:
+            cache.store(canonical, maximizing, depth, stored, stored_flag, best_move)
+        return best_score
+    
+    @staticmethod
+    def _order_first(moves: list[tuple[int, int]], move: Optional[tuple[int, int]]) -> None:
+        # Đưa nước (từ transposition table / PV) lên đầu danh sách
+        if move is None or not moves or moves[0] == move: return
+        try:
+            moves.remove(move)
+        except ValueError:
+            return
+        moves.insert(0, move)
+    
+    def _order_moves(self, moves: list[tuple[int, int]], player: str, ply: int,
+                     pv_move: Optional[tuple[int, int]],
+                     tt_move: Optional[tuple[int, int]]) -> list[tuple[int, int]]:
+        """
+        Sắp xếp nước đi: thắng ngay > chặn năm > nước PV/TT > tạo bốn mở >
+        chặn ba mở > tạo bốn > tạo ba mở > killer > history.
+        
+        Có nước thắng ngay thì chỉ trả về nước đó; đối thủ có ô thắng ngay
+        thì chỉ giữ các nước chặn (mọi nước khác thua ngay ở lượt sau).
+        """
+        board = self._board
+        opponent = HUMAN if player == AI else AI
+        killer_1, killer_2 = self._killers[ply] if ply < len(self._killers) else (None, None)
+        history = self._history[player]
+        forced: list[tuple[int, int]] = []
+        keys: dict[tuple[int, int], int] = {}
+        for move in moves:
+            row, col = move
+            own = shape_at(board, row, col, player)
+            if own == SHAPE_FIVE:
+                return [move]
+            opp = shape_at(board, row, col, opponent)
+            if opp == SHAPE_FIVE:
+                forced.append(move)
+                continue
+            if move == pv_move: order = _ORDER_PV
+            elif move == tt_move: order = _ORDER_TT
+            elif own == SHAPE_OPEN_FOUR: order = _ORDER_OPEN_FOUR
+            elif opp == SHAPE_OPEN_FOUR: order = _ORDER_BLOCK_THREE
+            elif own == SHAPE_FOUR: order = _ORDER_FOUR
+            elif own == SHAPE_OPEN_THREE: order = _ORDER_OPEN_THREE
+            elif move == killer_1: order = _ORDER_KILLER
+            elif move == killer_2: order = _ORDER_KILLER - 1
+            else: order = 0
+            keys[move] = (order << _ORDER_SHIFT) + history[row][col]
+        if forced:
+            return forced
+        # sorted ổn định: cùng khóa thì giữ thứ tự gần tâm của _get_candidate_moves
+        ordered = sorted(keys, key=keys.__getitem__, reverse=True)
+        if self._beam_width is not None:
+            del ordered[self._beam_width:]
+        return ordered
+    
+    def _staged_moves(self, player: str, ply: int, pv_move: Optional[tuple[int, int]],
+                      tt_move: Optional[tuple[int, int]]) -> Iterator[tuple[int, int]]:
+        """
+        Sinh nước đi theo từng giai đoạn cho _minimax/_pvs. Khi bên gọi cắt
+        (break), các giai đoạn sau không chạy.
+        
+        1. Nước PV rồi nước TT: chỉ kiểm tra ô còn trống, chưa đụng tới frontier.
+        2. Phân loại frontier (_classify_moves): có nước thắng ngay thì chỉ đi
+           nước đó, đối thủ có ô thắng thì chỉ đi các nước chặn, nếu không thì
+           các nước tạo/chặn hình đe dọa.
+        3. Các nước còn lại (killer, history), chỉ sắp xếp khi tới lượt.
+        
+        Thứ tự giống _order_moves trừ việc nước PV/TT luôn đi trước. Bộ đệm
+        của mỗi ply chứa số nguyên khóa * số ô + (số ô - 1 - thứ hạng gần
+        tâm), giải mã qua Geometry.ranked_cells, nên không tạo list/dict/tuple
+        mới cho mỗi node.
+        """
+        board = self._board
+        remaining = self._beam_width or board.size * board.size
+        first = second = None
+        if pv_move is not None and board.is_valid_move(*pv_move):
+            first = pv_move
+            yield first
+            remaining -= 1
+        if tt_move is not None and tt_move != first and board.is_valid_move(*tt_move) and remaining:
+            second = tt_move
+            yield second
+            remaining -= 1
+        
+        buffers = self._move_buffers[ply]
+        win = self._classify(player, ply, buffers)
+        if win is not None:
+            if win != first and win != second:
+                yield win
+            return
+        ranked = board.geometry.ranked_cells
+        count = len(ranked)
+        last = count - 1
+        forced, threats, quiet = buffers
+        if forced:
+            # Mọi nước khác thua ngay ở lượt sau: không giới hạn beam
+            forced.sort(reverse=True)
+            for value in forced:
+                move = ranked[last - value % count]
+                if move != first and move != second:
+                    yield move
+            return
+        for stage in (threats, quiet):
+            stage.sort(reverse=True)
+            for value in stage:
+                if remaining <= 0:
+                    return
+                move = ranked[last - value % count]
+                if move != first and move != second:
+                    yield move
+                    remaining -= 1
+    
+    def _classify_moves(self, player: str, ply: int,
+                        buffers: tuple[list[int], list[int], list[int]]) -> Optional[tuple[int, int]]:
+        """
+        Điền bộ đệm (ép buộc, đe dọa, còn lại) của _staged_moves từ frontier.
+        
+        Hình của hai bên giống shape_at nhưng mỗi cửa sổ 9 ô chỉ đọc một lần
+        (shape_tables); luật không có bảng thì gọi shape_at.
+        
+        Returns:
+            Nước thắng ngay gần tâm nhất, hoặc None
+        """
+        board = self._board
+        geometry = board.geometry
+        opponent = HUMAN if player == AI else AI
+        rank = geometry.center_rank
+        count = len(rank)
+        last = count - 1
+        killer_1, killer_2 = self._killers[ply]
+        history = self._history[player]
+        tables = shape_tables(geometry)
+        if tables is not None:
+            own_table = tables[player]
+            opp_table = tables[opponent]
+            codes = board.line_codes
+            slots = geometry.window_slots
+        forced, threats, quiet = buffers
+        forced.clear()
+        threats.clear()
+        quiet.clear()
+        win = None
+        for move in self._neighbors():
+            row, col = move
+            if tables is None:
+                own = shape_at(board, row, col, player)
+                opp = shape_at(board, row, col, opponent)
+            else:
+                own = opp = 0
+                for line, shift in slots[row][col]:
+                    window = (codes[line] >> shift) & WINDOW_MASK
+                    own += own_table[window]
+                    opp += opp_table[window]
+                own = SHAPE_BY_WEIGHT[own]
+                opp = SHAPE_BY_WEIGHT[opp]
+            if own == SHAPE_FIVE:
+                if win is None or rank[move] < rank[win]:
+                    win = move
+                continue
+            if win is not None:
+                continue
+            if opp == SHAPE_FIVE:
+                forced.append(last - rank[move])
+                continue
+            if own == SHAPE_OPEN_FOUR: order = _ORDER_OPEN_FOUR
+            elif opp == SHAPE_OPEN_FOUR: order = _ORDER_BLOCK_THREE
+            elif own == SHAPE_FOUR: order = _ORDER_FOUR
+            elif own == SHAPE_OPEN_THREE: order = _ORDER_OPEN_THREE
+            elif move == killer_1: order = _ORDER_KILLER
+            elif move == killer_2: order = _ORDER_KILLER - 1
+            else: order = 0
+            value = ((order << _ORDER_SHIFT) + history[row][col]) * count + last - rank[move]
+            if order >= _ORDER_OPEN_THREE:
+                threats.append(value)
+            else:
+                quiet.append(value)
+        return win
+    
+    def _record_cutoff(self, move: tuple[int, int], player: str, ply: int, depth: int) -> None:
+        # Cập nhật killer move của ply và bảng history sau một lần cắt beta
+        self._ply_cutoffs[ply] += 1
+        killers = self._killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self._history[player][move[0]][move[1]] += depth * depth
+    
+    def _age_history(self) -> None:
+        # Giảm một nửa điểm history giữa các lượt tìm để ưu tiên thông tin mới
+        for table in self._history.values():
+            for row in table:
+                for col in range(len(row)):
+                    row[col] >>= 1
+    
+    def _get_candidate_moves(self) -> list[tuple[int, int]]:
+        # Gần tâm trước; hòa khoảng cách thì theo (row, col) để thứ tự không phụ thuộc backend
+        return sorted(self._board.neighbor_cells(NEIGHBOR_RADIUS), key=self._board.geometry.center_rank.__getitem__)
 
     def _get_adjacent_to_opponent(self) -> tuple[int, int]:
         for row, col in self._board.played_cells:
             for dr, dc in [(1,1), (1,-1), (-1,1), (-1,-1), (0,1), (1,0)]:
                 nr, nc = row + dr, col + dc
                 if self._board.is_valid_move(nr, nc): return (nr, nc)
-        return (BOARD_SIZE//2, BOARD_SIZE//2)
+        return (self._board.size//2, self._board.size//2)
 
     def _evaluate_board(self) -> float:
-        return self._evaluate_player(AI) - self._evaluate_player(HUMAN) * DEFENSE_MULTIPLIER
+        # Điểm từng đường được Board cập nhật tăng dần, ở đây chỉ đọc tổng
+        board = self._board
+        return board.heuristic_score(AI) - board.heuristic_score(HUMAN) * DEFENSE_MULTIPLIER
 
-    def _evaluate_player(self, player: str) -> float:
-        total_score: float = 0
-        evaluated = set()
-        for row, col in self._board.played_cells:
-            if self._board.get_cell(row, col) != player: continue
-            for dr, dc in DIRECTIONS:
-                if (row, col, dr, dc) in evaluated: continue
-                score, cells = self._evaluate_line(row, col, dr, dc, player)
-                total_score += score
-                for c in cells: evaluated.add((c[0], c[1], dr, dc))
-        return total_score
-
-    def _evaluate_line(self, row, col, dr, dc, player):
-        cells = [(row, col)]
-        count = 1
-        
-        r, c = row + dr, col + dc
-        while 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE and self._board.get_cell(r, c) == player:
-            cells.append((r, c))
-            count += 1
-            r += dr
-            c += dc
-        open_f = (0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE and self._board.get_cell(r, c) == EMPTY)
-        
-        r, c = row - dr, col - dc
-        while 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE and self._board.get_cell(r, c) == player:
-            cells.append((r, c))
-            count += 1
-            r -= dr
-            c -= dc
-        open_b = (0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE and self._board.get_cell(r, c) == EMPTY)
-        
-        return self._get_pattern_score(count, int(open_f) + int(open_b)), cells
-
-    def _get_pattern_score(self, count, open_ends):
-        if count >= WIN_CONDITION: return SCORE_FIVE
-        if open_ends == 0: return 0
-        if count == 4: return SCORE_OPEN_FOUR if open_ends == 2 else SCORE_CLOSED_FOUR
-        if count == 3: return SCORE_OPEN_THREE if open_ends == 2 else SCORE_CLOSED_THREE
-        if count == 2: return SCORE_OPEN_TWO if open_ends == 2 else SCORE_CLOSED_TWO
-        if count == 1: return SCORE_ONE if open_ends == 2 else SCORE_ONE // 2
-        return 0
+    def _evaluate_board_full(self) -> float:
+        # Bản chấm lại mọi đường từ grid, dùng để đối chiếu với bản tra bảng tăng dần
+        board = self._board
+        human_score, ai_score = score_grid(board.grid, board.geometry)
+        return ai_score - human_score * DEFENSE_MULTIPLIER
@@ -0,0 +1,335 @@
+"""
+arena.py - Chạy AIEngine không cần giao diện: đấu tự động và đo hiệu năng.
+
+Hai lệnh con:
+    match: đấu N ván giữa hai cấu hình AIEngine (luân phiên đi trước), có
+           thể chạy song song trên nhiều process; ghi thống kê từng nước
+           (thời gian, nodes/giây, độ sâu) và kết quả thắng/hòa/thua ra
+           JSON/CSV.
+    suite: tìm nước đi trên bộ thế cờ cố định benchmark.POSITIONS, ghi
+           thời gian kèm commit git hiện tại vào file lịch sử JSONL và so
+           với lần chạy trước để thấy hồi quy hiệu năng của ai.py/board.py.
+
+Cấu hình engine là các cặp key=value truyền thẳng cho AIEngine (hoặc
+MCTSEngine khi có engine=mcts), ví dụ:
+    python arena.py match --a depth=3 --b depth=2 beam_width=8 --games 20 --jobs 4 \\
+        --json match.json --csv moves.csv
+    python arena.py match --a engine=mcts time_limit=1.0 --b depth=2 --games 4
+    python arena.py match --a depth=4 algorithm=pvs --b depth=4 --games 10
+    python arena.py suite --depth 3 --history bench_history.jsonl
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional, Sequence
+from consts import BOARD_SIZE, HUMAN, AI, AI_DEPTH
+from board import Board
+from ai import AIEngine
+from mcts import MCTSEngine
+
+EngineConfig = dict[str, Any]
+
+# Các cột của file CSV theo từng nước
+MOVE_FIELDS: tuple[str, ...] = (
+    'game', 'ply', 'engine', 'player', 'row', 'col',
+    'depth', 'score', 'nodes', 'elapsed', 'nps',
+)
+
+
+def parse_config(items: Sequence[str]) -> EngineConfig:
+    """
+    Đọc cấu hình engine từ các chuỗi key=value.
+
+    Giá trị được hiểu là int, float, True/False/None nếu được, nếu không
+    giữ nguyên chuỗi (vd: board_backend=bitboard).
+    """
+    config: EngineConfig = {}
+    for item in items:
+        key, sep, raw = item.partition('=')
+        if not sep or not key:
+            raise ValueError(f"cấu hình phải có dạng key=value, nhận {item!r}")
+        value: Any = raw
+        if raw in ('None', 'True', 'False'):
+            value = {'None': None, 'True': True, 'False': False}[raw]
+        else:
+            for cast in (int, float):
+                try:
+                    value = cast(raw)
+                    break
+                except ValueError:
+                    pass
+        config[key] = value
+    return config
+
+
+def make_engine(config: EngineConfig) -> Any:
+    """AIEngine theo cấu hình, hoặc MCTSEngine nếu cấu hình có engine=mcts."""
+    config = dict(config)
+    kind = config.pop('engine', 'minimax')
+    if kind == 'mcts':
+        return MCTSEngine(**config)
+    if kind != 'minimax':
+        raise ValueError(f"engine phải là 'minimax' hoặc 'mcts', nhận {kind!r}")
+    return AIEngine(**config)
+
+
+def swap_colors(board: Board) -> Board:
+    """
+    Bản sao bàn cờ với hai bên đổi màu.
+
+    AIEngine luôn tìm nước cho AI; để một engine cầm quân HUMAN, ta cho nó
+    tìm trên bàn cờ đã đổi màu.
+    """
+    swapped = Board()
+    for row, col in board.played_cells:
+        swapped.make_move(row, col, AI if board.get_cell(row, col) == HUMAN else HUMAN)
+    return swapped
+
+
+def random_opening(rng: random.Random, moves: int) -> list[tuple[int, int]]:
+    """Vài nước khai cuộc ngẫu nhiên gần tâm để các ván không giống nhau."""
+    center = BOARD_SIZE // 2
+    opening: list[tuple[int, int]] = []
+    while len(opening) < moves:
+        cell = (center + rng.randint(-2, 2), center + rng.randint(-2, 2))
+        if cell not in opening:
+            opening.append(cell)
+    return opening
+
+
+def play_game(game: int, config_a: EngineConfig, config_b: EngineConfig, a_first: bool,
+              opening: Sequence[tuple[int, int]], max_moves: int) -> dict[str, Any]:
+    """
+    Đấu một ván giữa engine "a" và "b".
+
+    Người đi trước cầm quân HUMAN (X). Các nước khai cuộc được đánh sẵn và
+    không được tính thống kê.
+
+    Returns:
+        {'game', 'a_first', 'winner' ('a'/'b'/None), 'length', 'moves': [...]}
+    """
+    engines = {'a': make_engine(config_a), 'b': make_engine(config_b)}
+    names = {HUMAN: 'a' if a_first else 'b', AI: 'b' if a_first else 'a'}
+    board = Board()
+    player = HUMAN
+    winner: Optional[str] = None
+    records: list[dict[str, Any]] = []
+
+    for ply in range(max_moves):
+        if ply < len(opening):
+            move = opening[ply]
+        else:
+            name = names[player]
+            view = board if player == AI else swap_colors(board)
+            result = engines[name].search(view)
+            move = result.move
+            if move is None:
+                break
+            records.append({
+                'game': game, 'ply': ply, 'engine': name, 'player': player,
+                'row': move[0], 'col': move[1], 'depth': result.depth,
+                'score': result.score, 'nodes': result.nodes,
+                'elapsed': result.elapsed,
+                'nps': result.nodes / result.elapsed if result.elapsed > 0 else 0.0,
+            })
+        board.make_move(move[0], move[1], player)
+        if board.check_winner(move[0], move[1]) == player:
+            winner = names[player]
+            break
+        if board.is_full():
+            break
+        player = AI if player == HUMAN else HUMAN
+
+    return {'game': game, 'a_first': a_first, 'winner': winner,
+            'length': board.move_count, 'moves': records}
+
+
+def summarize(games: Sequence[dict[str, Any]]) -> dict[str, Any]:
+    """Thắng/hòa/thua của engine "a" và thống kê tốc độ theo từng engine."""
+    summary: dict[str, Any] = {
+        'games': len(games),
+        'a_wins': sum(1 for g in games if g['winner'] == 'a'),
+        'b_wins': sum(1 for g in games if g['winner'] == 'b'),
+        'draws': sum(1 for g in games if g['winner'] is None),
+    }
+    for name in ('a', 'b'):
+        moves = [m for g in games for m in g['moves'] if m['engine'] == name]
+        nodes = sum(m['nodes'] for m in moves)
+        elapsed = sum(m['elapsed'] for m in moves)
+        summary[name] = {
+            'moves': len(moves),
+            'avg_latency': elapsed / len(moves) if moves else 0.0,
+            'max_latency': max((m['elapsed'] for m in moves), default=0.0),
+            'avg_depth': sum(m['depth'] for m in moves) / len(moves) if moves else 0.0,
+            'nps': nodes / elapsed if elapsed > 0 else 0.0,
+        }
+    return summary
+
+
+def run_match(config_a: EngineConfig, config_b: EngineConfig, games: int, jobs: int = 1,
+              opening_moves: int = 2, max_moves: int = BOARD_SIZE * BOARD_SIZE,
+              seed: int = 0) -> list[dict[str, Any]]:
+    """
+    Đấu `games` ván, luân phiên bên đi trước; mỗi cặp ván dùng chung khai cuộc.
+
+    Args:
+        jobs: Số process chạy song song (1 = chạy tuần tự trong process này)
+    """
+    rng = random.Random(seed)
+    tasks = []
+    for game in range(games):
+        if game % 2 == 0:
+            opening = random_opening(rng, opening_moves)
+        tasks.append((game, config_a, config_b, game % 2 == 0, opening, max_moves))
+    if jobs <= 1:
+        return [play_game(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(play_game, *zip(*tasks)))
+
+
+def git_revision() -> Optional[str]:
+    """Commit git hiện tại (kèm '+dirty' nếu có thay đổi chưa commit), None nếu không có git."""
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=cwd,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=cwd,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision + '+dirty' if dirty else revision
+
+
+def run_suite(depth: int, config: Optional[EngineConfig] = None) -> dict[str, Any]:
+    """
+    Tìm nước đi trên mọi thế cờ của benchmark.POSITIONS với độ sâu cố định.
+
+    Returns:
+        {'revision', 'timestamp', 'depth', 'config', 'positions': [...],
+         'nodes', 'elapsed', 'nps'}
+    """
+    from benchmark import POSITIONS, load_position
+
+    config = dict(config or {})
+    config['depth'] = depth
+    positions = []
+    for index, moves in enumerate(POSITIONS):
+        result = AIEngine(**config).search(load_position(moves))
+        positions.append({
+            'position': index, 'move': list(result.move) if result.move else None,
+            'score': result.score, 'depth': result.depth,
+            'nodes': result.nodes, 'elapsed': result.elapsed,
+        })
+    nodes = sum(p['nodes'] for p in positions)
+    elapsed = sum(p['elapsed'] for p in positions)
+    return {
+        'revision': git_revision(), 'timestamp': time.time(), 'depth': depth,
+        'config': config, 'positions': positions,
+        'nodes': nodes, 'elapsed': elapsed,
+        'nps': nodes / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def _load_history(path: str) -> list[dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _match_command(args: argparse.Namespace) -> None:
+    config_a = parse_config(args.a)
+    config_b = parse_config(args.b)
+    for config in (config_a, config_b):
+        if config.get('engine', 'minimax') == 'minimax':
+            config.setdefault('depth', AI_DEPTH)
+    start = time.perf_counter()
+    games = run_match(config_a, config_b, args.games, args.jobs,
+                      args.opening_moves, args.max_moves, args.seed)
+    summary = summarize(games)
+    summary['wall_time'] = time.perf_counter() - start
+
+    print(f"a = {config_a}")
+    print(f"b = {config_b}")
+    print(f"{summary['games']} ván: a thắng {summary['a_wins']}, b thắng {summary['b_wins']}, "
+          f"hòa {summary['draws']} ({summary['wall_time']:.1f}s)")
+    print(f"{'engine':<7} {'moves':>6} {'avg (s)':>9} {'max (s)':>9} {'depth':>6} {'nodes/s':>10}")
+    for name in ('a', 'b'):
+        row = summary[name]
+        print(f"{name:<7} {row['moves']:>6} {row['avg_latency']:>9.3f} {row['max_latency']:>9.3f} "
+              f"{row['avg_depth']:>6.2f} {row['nps']:>10.0f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': {'a': config_a, 'b': config_b}, 'summary': summary,
+                       'games': games}, f, indent=2)
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=MOVE_FIELDS)
+            writer.writeheader()
+            for game in games:
+                writer.writerows(game['moves'])
+
+
+def _suite_command(args: argparse.Namespace) -> None:
+    report = run_suite(args.depth, parse_config(args.config))
+    history = _load_history(args.history) if args.history else []
+    previous = next((r for r in reversed(history) if r['depth'] == report['depth']
+                     and r['config'] == report['config']), None)
+
+    print(f"revision: {report['revision']}, depth: {report['depth']}")
+    print(f"{'pos':<4} {'move':>9} {'nodes':>9} {'time (s)':>9} {'before':>9}")
+    for row in report['positions']:
+        before = ''
+        if previous is not None:
+            before = f"{previous['positions'][row['position']]['elapsed']:.3f}"
+        move = tuple(row['move']) if row['move'] else None
+        print(f"{row['position']:<4} {str(move):>9} {row['nodes']:>9} {row['elapsed']:>9.3f} {before:>9}")
+    print(f"tổng: {report['nodes']} nodes, {report['elapsed']:.3f}s, {report['nps']:.0f} nodes/s")
+    if previous is not None and previous['elapsed'] > 0:
+        ratio = report['elapsed'] / previous['elapsed']
+        print(f"so với {previous['revision']}: thời gian x{ratio:.2f}")
+
+    if args.history:
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report) + '\n')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Đấu tự động và đo hiệu năng AIEngine")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    match = commands.add_parser('match', help="đấu N ván giữa hai cấu hình engine")
+    match.add_argument('--a', nargs='*', default=[], metavar='KEY=VALUE', help="cấu hình engine a")
+    match.add_argument('--b', nargs='*', default=[], metavar='KEY=VALUE', help="cấu hình engine b")
+    match.add_argument('--games', type=int, default=10)
+    match.add_argument('--jobs', type=int, default=1, help="số process chạy song song")
+    match.add_argument('--opening-moves', type=int, default=2)
+    match.add_argument('--max-moves', type=int, default=BOARD_SIZE * BOARD_SIZE)
+    match.add_argument('--seed', type=int, default=0)
+    match.add_argument('--json', help="ghi toàn bộ kết quả ra file JSON")
+    match.add_argument('--csv', help="ghi thống kê từng nước ra file CSV")
+    match.set_defaults(handler=_match_command)
+
+    suite = commands.add_parser('suite', help="đo thời gian trên bộ thế cờ cố định")
+    suite.add_argument('--depth', type=int, default=3)
+    suite.add_argument('--config', nargs='*', default=[], metavar='KEY=VALUE')
+    suite.add_argument('--history', help="file JSONL lưu kết quả theo commit")
+    suite.set_defaults(handler=_suite_command)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
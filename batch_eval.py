@@ -0,0 +1,104 @@
+"""
+batch_eval.py - Đánh giá heuristic cho hàng loạt thế cờ cùng lúc bằng NumPy.
+
+Dùng cho phân tích offline, sinh sách khai cuộc, gán nhãn ván tự đấu...
+Đầu vào là mảng int8 kích thước (N, size, size) với mã ô EMPTY_CODE /
+HUMAN_CODE / AI_CODE; kết quả là N điểm, giống hệt
+AIEngine._evaluate_board trên từng thế cờ (cùng win_length và luật thắng).
+
+Cách tính: với mỗi độ dài đường, gom các ô của mọi đường cùng độ dài
+trên mọi bàn cờ thành một mảng rồi tính mã base-4 của từng đường
+(không gồm ô biên, nên đường tối đa 32 ô để vừa uint64). Mỗi mã khác
+nhau (np.unique) được chấm một lần bằng evaluator.score_cells, cùng cách
+chấm hình liên tiếp và gián đoạn với Board, rồi cộng lại theo bàn cờ.
+
+NumPy là phụ thuộc tùy chọn: chỉ cần khi gọi các hàm trong module này.
+
+Kiểm tra khớp với AIEngine._evaluate_board trên các thế cờ ngẫu nhiên:
+    python -m pytest tests/test_batch_eval.py
+"""
+
+from typing import Any, Sequence
+from consts import (
+    BOARD_SIZE, WIN_CONDITION, EXACT_WIN, EMPTY, HUMAN, AI, DEFENSE_MULTIPLIER,
+    EMPTY_CODE, HUMAN_CODE, AI_CODE
+)
+from board import Board
+from evaluator import score_cells
+from geometry import get_geometry
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy không bắt buộc
+    np = None
+
+_CODES = {EMPTY: EMPTY_CODE, HUMAN: HUMAN_CODE, AI: AI_CODE}
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("batch_eval cần numpy (pip install numpy)")
+
+
+def boards_to_array(boards: Sequence[Board]) -> Any:
+    """Chuyển danh sách Board (cùng kích thước) thành mảng int8 (N, size, size)."""
+    _require_numpy()
+    size = boards[0].size if boards else BOARD_SIZE
+    array = np.zeros((len(boards), size, size), dtype=np.int8)
+    for index, board in enumerate(boards):
+        grid = board.grid
+        for row, col in board.played_cells:
+            array[index, row, col] = _CODES[grid[row][col]]
+    return array
+
+
+def pattern_scores(boards: Any, win_length: int = WIN_CONDITION, exact: bool = EXACT_WIN) -> tuple[Any, Any]:
+    """
+    Tổng điểm hình cờ của mỗi người chơi trên từng bàn cờ (như Board.heuristic_score).
+
+    Args:
+        boards: Mảng (N, size, size) mã ô
+        win_length / exact: Luật thắng (như Board)
+
+    Returns:
+        (điểm của HUMAN, điểm của AI), mỗi mảng int64 N phần tử
+
+    Raises:
+        ValueError: Nếu bàn cờ lớn hơn 32 ô mỗi cạnh
+    """
+    _require_numpy()
+    boards = np.asarray(boards, dtype=np.int8)
+    count_boards, size = boards.shape[0], boards.shape[1]
+    if size > 32:
+        raise ValueError(f"batch_eval chỉ hỗ trợ bàn cờ tối đa 32 ô mỗi cạnh, nhận {size}")
+    geometry = get_geometry(size, win_length, exact)
+    by_length: dict[int, list[list[tuple[int, int]]]] = {}
+    for cells in geometry.lines:
+        by_length.setdefault(len(cells), []).append(cells)
+    human_total = np.zeros(count_boards, dtype=np.int64)
+    ai_total = np.zeros(count_boards, dtype=np.int64)
+    for length, lines in by_length.items():
+        index = np.array(lines)  # (số đường, length, 2)
+        cells = boards[:, index[..., 0], index[..., 1]].astype(np.uint64)
+        codes = (cells << (2 * np.arange(length, dtype=np.uint64))).sum(axis=2)
+        unique, inverse = np.unique(codes, return_inverse=True)
+        human_scores = np.zeros(len(unique), dtype=np.int64)
+        ai_scores = np.zeros(len(unique), dtype=np.int64)
+        for k, code in enumerate(unique.tolist()):
+            line = [(code >> (2 * i)) & 3 for i in range(length)]
+            human_scores[k], ai_scores[k] = score_cells(line, geometry)
+        inverse = inverse.reshape(codes.shape)
+        human_total += human_scores[inverse].sum(axis=1)
+        ai_total += ai_scores[inverse].sum(axis=1)
+    return human_total, ai_total
+
+
+def evaluate_batch(boards: Any, win_length: int = WIN_CONDITION, exact: bool = EXACT_WIN) -> Any:
+    """
+    Điểm của AI trên từng bàn cờ, cùng công thức với AIEngine._evaluate_board.
+
+    Returns:
+        Mảng float64 N phần tử
+    """
+    human_scores, ai_scores = pattern_scores(boards, win_length, exact)
+    return ai_scores - human_scores * DEFENSE_MULTIPLIER
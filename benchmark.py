@@ -0,0 +1,386 @@
+"""
+benchmark.py - Đo tốc độ tìm kiếm (nodes/giây) của AIEngine.
+
+Chạy:
+    python benchmark.py --depth 3 --backends list bitboard
+    python benchmark.py --board-ops                 # chỉ các thao tác bàn cờ của mỗi node, theo backend
+    python benchmark.py --depth 3 --sizes 15 19     # so sánh theo kích thước bàn cờ
+    python benchmark.py --depth 4 --algorithms alphabeta pvs   # so sánh số node theo thuật toán
+    python benchmark.py --allocations               # bộ nhớ cấp phát khi sinh nước mỗi node
+    python benchmark.py --startup                   # import + nước đi đầu của process mới so với ngân sách
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Sequence
+from consts import BOARD_SIZE, HUMAN, AI, AI_DEPTH, STARTUP_IMPORT_BUDGET, STARTUP_FIRST_MOVE_BUDGET
+from board import Board
+from bitboard import BitBoard
+from ai import AIEngine, BOARD_BACKENDS, SEARCH_ALGORITHMS
+
+# Bộ thế cờ cố định (X đi trước, tới lượt O = AI). Không sửa các thế cờ
+# này để số liệu giữa các lần đo còn so sánh được với nhau.
+POSITIONS: tuple[tuple[tuple[int, int], ...], ...] = (
+    ((8, 9), (7, 3), (6, 4), (7, 4), (9, 8), (12, 8), (9, 6), (5, 10), (7, 8)),
+    ((5, 6), (12, 5), (3, 7), (7, 8), (6, 10), (8, 13), (8, 7), (10, 9), (5, 9), (5, 10),
+     (5, 7), (5, 3), (8, 5), (5, 8), (3, 9)),
+    ((9, 9), (8, 10), (5, 5), (4, 4), (9, 7), (9, 4), (5, 8), (10, 10), (5, 3), (4, 8),
+     (7, 10), (7, 8), (5, 10), (2, 6), (8, 6), (4, 6), (4, 2), (8, 3), (1, 8), (3, 8),
+     (3, 9)),
+    ((9, 6), (6, 3), (7, 7), (5, 6), (3, 10), (7, 6), (8, 7), (7, 8), (9, 9), (8, 9),
+     (3, 9), (2, 4), (7, 9), (1, 4), (4, 5), (6, 9), (8, 14), (11, 3), (3, 6), (6, 8),
+     (8, 3), (9, 8), (14, 6), (3, 5), (6, 4), (3, 8), (10, 7)),
+    ((11, 5), (6, 5), (5, 10), (7, 6), (9, 11), (9, 9), (9, 4), (5, 8), (4, 4), (4, 8),
+     (5, 6), (8, 9), (9, 8), (8, 2), (6, 9), (9, 5), (8, 6), (4, 3), (3, 5), (14, 2),
+     (9, 7), (7, 8), (6, 6), (7, 7), (7, 5), (10, 8), (6, 3), (4, 6), (6, 4), (9, 3),
+     (10, 2), (8, 4), (2, 6), (4, 7), (3, 4)),
+    ((8, 5), (8, 1), (5, 10), (6, 8), (4, 10), (9, 9), (4, 8), (1, 8), (8, 6), (10, 6),
+     (11, 5), (5, 6), (14, 2), (6, 6), (8, 3), (11, 2), (11, 6), (2, 6), (3, 3), (3, 6),
+     (10, 5), (8, 8), (7, 7), (2, 7), (6, 4), (2, 4), (5, 5), (7, 12), (6, 7), (5, 7),
+     (4, 0), (7, 10), (6, 11), (3, 7), (8, 4), (8, 10), (7, 3), (10, 8), (9, 3), (5, 8),
+     (7, 8), (7, 2), (7, 6), (5, 4), (3, 11)),
+)
+
+
+def load_position(moves: Sequence[tuple[int, int]], size: int = BOARD_SIZE) -> Board:
+    """
+    Dựng Board từ danh sách nước đi (X đi trước, hai bên luân phiên).
+
+    Với bàn cờ lớn hơn BOARD_SIZE, thế cờ được dời vào giữa bàn.
+    """
+    board = Board(size)
+    offset = (size - BOARD_SIZE) // 2
+    player = HUMAN
+    for row, col in moves:
+        board.make_move(row + offset, col + offset, player)
+        player = AI if player == HUMAN else HUMAN
+    return board
+
+
+def run_backend_benchmark(depth: int, backends: Sequence[str]) -> dict[str, dict[str, object]]:
+    """
+    Tìm nước đi trên mọi thế cờ trong POSITIONS với từng backend.
+
+    Returns:
+        {backend: {'nodes', 'elapsed', 'nps', 'moves'}}: 'moves' là các nước
+        tìm được, mọi backend phải cho cùng kết quả
+    """
+    totals: dict[str, dict[str, object]] = {}
+    for backend in backends:
+        nodes = 0
+        elapsed = 0.0
+        moves_found = []
+        for moves in POSITIONS:
+            engine = AIEngine(depth=depth, board_backend=backend)
+            start = time.perf_counter()
+            result = engine.search(load_position(moves))
+            elapsed += time.perf_counter() - start
+            nodes += result.nodes
+            moves_found.append(result.move)
+        totals[backend] = {
+            'nodes': nodes,
+            'elapsed': elapsed,
+            'nps': nodes / elapsed if elapsed > 0 else 0.0,
+            'moves': moves_found,
+        }
+    return totals
+
+
+def run_board_benchmark(backends: Sequence[str], rounds: int = 20) -> dict[str, dict[str, float]]:
+    """
+    Đo riêng các thao tác bàn cờ mà mỗi node tìm kiếm gọi tới: với mỗi thế
+    cờ trong POSITIONS, thử lần lượt mọi ô frontier: make_move,
+    check_winner, heuristic_score của hai bên, frontier, rồi undo_move.
+
+    Returns:
+        {backend: {'ops', 'elapsed', 'ops_per_s'}}: một op là một lượt
+        make/kiểm tra/undo như trên
+    """
+    board_types = {'list': Board, 'bitboard': BitBoard}
+    totals: dict[str, dict[str, float]] = {}
+    for backend in backends:
+        boards = [load_position(moves) for moves in POSITIONS]
+        if backend != 'list':
+            boards = [board_types[backend].from_board(board) for board in boards]
+        ops = 0
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for board in boards:
+                for row, col in sorted(board.frontier):
+                    board.make_move(row, col, AI)
+                    board.check_winner(row, col)
+                    board.heuristic_score(AI)
+                    board.heuristic_score(HUMAN)
+                    board.frontier
+                    board.undo_move(row, col)
+                    ops += 1
+        elapsed = time.perf_counter() - start
+        totals[backend] = {'ops': ops, 'elapsed': elapsed, 'ops_per_s': ops / elapsed if elapsed > 0 else 0.0}
+    return totals
+
+
+def run_size_benchmark(depth: int, sizes: Sequence[int],
+                       backend: str = "list") -> dict[int, dict[str, float]]:
+    """
+    Tìm nước đi trên POSITIONS (dời vào giữa bàn) với từng kích thước bàn cờ.
+
+    Chi phí mỗi node không nên tăng theo diện tích bàn cờ: so sánh 'nps'
+    giữa các kích thước.
+
+    Returns:
+        {size: {'nodes', 'elapsed', 'nps'}}
+    """
+    totals: dict[int, dict[str, float]] = {}
+    for size in sizes:
+        nodes = 0
+        elapsed = 0.0
+        for moves in POSITIONS:
+            engine = AIEngine(depth=depth, board_backend=backend, opening_book=None)
+            board = load_position(moves, size)
+            start = time.perf_counter()
+            result = engine.search(board)
+            elapsed += time.perf_counter() - start
+            nodes += result.nodes
+        totals[size] = {
+            'nodes': nodes,
+            'elapsed': elapsed,
+            'nps': nodes / elapsed if elapsed > 0 else 0.0,
+        }
+    return totals
+
+
+def run_algorithm_benchmark(depth: int, algorithms: Sequence[str],
+                            backend: str = "list") -> dict[str, dict[str, object]]:
+    """
+    Tìm nước đi trên POSITIONS với từng thuật toán tìm kiếm (không dùng
+    ThreatSolver để mọi thế cờ đều đi qua minimax/PVS).
+
+    Các thuật toán phải chọn cùng nước đi với cùng điểm; so sánh 'nodes'.
+
+    Returns:
+        {algorithm: {'nodes', 'elapsed', 'nps', 'moves'}}
+    """
+    totals: dict[str, dict[str, object]] = {}
+    for algorithm in algorithms:
+        nodes = 0
+        elapsed = 0.0
+        moves = []
+        for position in POSITIONS:
+            engine = AIEngine(depth=depth, board_backend=backend, algorithm=algorithm,
+                              threat_search=False, opening_book=None)
+            start = time.perf_counter()
+            result = engine.search(load_position(position))
+            elapsed += time.perf_counter() - start
+            nodes += result.nodes
+            moves.append((result.move, result.score))
+        totals[algorithm] = {
+            'nodes': nodes,
+            'elapsed': elapsed,
+            'nps': nodes / elapsed if elapsed > 0 else 0.0,
+            'moves': moves,
+        }
+    return totals
+
+
+def _peak_allocation(action: Callable[[], object]) -> int:
+    # Bộ nhớ cấp phát thêm ở đỉnh (byte) trong lúc chạy action, theo tracemalloc
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    action()
+    return tracemalloc.get_traced_memory()[1] - before
+
+
+def run_allocation_benchmark(depth: int = 2) -> dict[str, dict[str, float]]:
+    """
+    Đo bộ nhớ cấp phát khi sinh nước đi ở một node bằng tracemalloc: danh
+    sách đầy đủ (_order_moves của _get_candidate_moves) so với bộ sinh
+    theo giai đoạn mà _minimax/_pvs dùng (_staged_moves).
+
+    Mỗi thế cờ trong POSITIONS được tìm trước ở `depth` để có history và
+    killer thật; sau đó mỗi node con của gốc được sinh nước hai cách: chỉ
+    lấy nước đầu tiên (node bị cắt ngay) và lấy hết. Mỗi phép đo chạy một
+    lần trước để bộ đệm theo ply đã đủ lớn.
+
+    Returns:
+        {'list' | 'staged': {'first', 'all'}}: byte cấp phát đỉnh trung bình mỗi node
+    """
+    def consume(moves: object) -> None:
+        for _ in moves:
+            pass
+
+    totals = {name: {'first': 0.0, 'all': 0.0} for name in ('list', 'staged')}
+    nodes = 0
+    tracemalloc.start()
+    try:
+        for position in POSITIONS:
+            engine = AIEngine(depth=depth, threat_search=False, opening_book=None)
+            engine.search(load_position(position))
+            board = engine._board
+            for row, col in sorted(board.neighbor_cells()):
+                board.make_move(row, col, AI)
+                actions = {
+                    'list': (
+                        lambda: engine._order_moves(engine._get_candidate_moves(), HUMAN, 1, None, None)[0],
+                        lambda: consume(engine._order_moves(engine._get_candidate_moves(), HUMAN, 1, None, None)),
+                    ),
+                    'staged': (
+                        lambda: next(engine._staged_moves(HUMAN, 1, None, None)),
+                        lambda: consume(engine._staged_moves(HUMAN, 1, None, None)),
+                    ),
+                }
+                for name, (first, every) in actions.items():
+                    every()
+                    totals[name]['first'] += _peak_allocation(first)
+                    totals[name]['all'] += _peak_allocation(every)
+                board.undo_move(row, col)
+                nodes += 1
+    finally:
+        tracemalloc.stop()
+    return {name: {key: value / nodes for key, value in row.items()} for name, row in totals.items()}
+
+
+# Thế cờ khai cuộc của phép đo khởi động: nước đầu tiên một process engine mới thường gặp
+STARTUP_POSITION: tuple[tuple[int, int], ...] = ((7, 7), (6, 8), (8, 8))
+
+# Chạy trong process mới: import engine (như python -m engine), tìm một nước,
+# rồi tìm lại cùng thế cờ bằng engine mới để tách chi phí khởi động khỏi chi phí tìm
+_STARTUP_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+import engine, protocol
+from board import Board
+from bitboard import BitBoard
+from ai import AIEngine
+imported = time.perf_counter()
+board = Board()
+board.replay([tuple(move) for move in MOVES])
+AIEngine(depth=DEPTH).search(board)
+done = time.perf_counter()
+AIEngine(depth=DEPTH).search(board)
+warm = time.perf_counter() - done
+print(imported - start, done - imported, warm, 'tkinter' in sys.modules)
+'''
+
+
+def run_startup_benchmark(runs: int = 5, depth: int = AI_DEPTH) -> dict[str, float]:
+    """
+    Đo thời gian khởi động của engine trong `runs` process mới: import
+    (engine, protocol, board, ai) và nước đi đầu tiên ở STARTUP_POSITION
+    (gồm dựng Geometry, nạp bảng hình...), so với tìm lại cùng thế cờ khi
+    mọi thứ đã sẵn sàng (warm). Lần chạy đầu có thể phải dựng và ghi file
+    cache bảng hình nên được báo riêng, không tính vào trung vị.
+
+    Returns:
+        {'first_import', 'first_move', 'import', 'move', 'warm', 'process'}:
+        giây (trung vị của các lần sau lần đầu; process gồm cả khởi động
+        trình thông dịch)
+
+    Raises:
+        RuntimeError: Nếu đường import của engine kéo theo tkinter
+    """
+    script = _STARTUP_SCRIPT.replace('MOVES', json.dumps(STARTUP_POSITION)).replace('DEPTH', str(depth))
+    directory = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs + 1):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', script], cwd=directory, check=True,
+                                capture_output=True, text=True).stdout
+        process = time.perf_counter() - start
+        imported, move, warm, tkinter = output.split()
+        if tkinter == 'True':
+            raise RuntimeError("đường import của engine đã import tkinter")
+        samples.append((float(imported), float(move), float(warm), process))
+    first, rest = samples[0], samples[1:] or samples[:1]
+    return {
+        'first_import': first[0],
+        'first_move': first[1],
+        'import': statistics.median(sample[0] for sample in rest),
+        'move': statistics.median(sample[1] for sample in rest),
+        'warm': statistics.median(sample[2] for sample in rest),
+        'process': statistics.median(sample[3] for sample in rest),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Đo nodes/giây của AIEngine")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--backends", nargs="+", choices=BOARD_BACKENDS, default=list(BOARD_BACKENDS))
+    parser.add_argument("--sizes", nargs="+", type=int,
+                        help="so sánh theo kích thước bàn cờ (backend đầu tiên) thay vì theo backend")
+    parser.add_argument("--algorithms", nargs="+", choices=SEARCH_ALGORITHMS,
+                        help="so sánh số node theo thuật toán tìm (backend đầu tiên)")
+    parser.add_argument("--board-ops", action="store_true",
+                        help="chỉ đo make/check_winner/heuristic/frontier/undo theo backend")
+    parser.add_argument("--allocations", action="store_true",
+                        help="đo bộ nhớ cấp phát khi sinh nước mỗi node (tracemalloc)")
+    parser.add_argument("--startup", action="store_true",
+                        help="đo import và nước đi đầu của process mới; mã thoát 1 nếu vượt ngân sách")
+    parser.add_argument("--runs", type=int, default=5, help="số process của --startup")
+    args = parser.parse_args()
+
+    if args.startup:
+        row = run_startup_benchmark(args.runs)
+        over = row['import'] > STARTUP_IMPORT_BUDGET or row['move'] > STARTUP_FIRST_MOVE_BUDGET
+        print(f"{'':<12} {'import (ms)':>12} {'move (ms)':>10}")
+        print(f"{'lần đầu':<12} {1000 * row['first_import']:>12.1f} {1000 * row['first_move']:>10.1f}")
+        print(f"{'trung vị':<12} {1000 * row['import']:>12.1f} {1000 * row['move']:>10.1f}"
+              f"   (tìm lại {1000 * row['warm']:.1f} ms, cả process {1000 * row['process']:.1f} ms)")
+        print(f"{'ngân sách':<12} {1000 * STARTUP_IMPORT_BUDGET:>12.1f} {1000 * STARTUP_FIRST_MOVE_BUDGET:>10.1f}"
+              f"   {'VƯỢT' if over else 'đạt'}")
+        if over:
+            sys.exit(1)
+        return
+
+    if args.board_ops:
+        totals = run_board_benchmark(args.backends)
+        baseline = totals[args.backends[0]]['ops_per_s']
+        print(f"{'backend':<10} {'ops':>10} {'time (s)':>10} {'ops/s':>10} {'speedup':>8}")
+        for backend, row in totals.items():
+            speedup = row['ops_per_s'] / baseline if baseline else 0.0
+            print(f"{backend:<10} {row['ops']:>10} {row['elapsed']:>10.3f} {row['ops_per_s']:>10.0f} {speedup:>7.2f}x")
+        return
+
+    if args.allocations:
+        totals = run_allocation_benchmark()
+        print(f"{'movegen':<10} {'first (B)':>10} {'all (B)':>10}")
+        for name, row in totals.items():
+            print(f"{name:<10} {row['first']:>10.0f} {row['all']:>10.0f}")
+        return
+
+    if args.algorithms:
+        totals = run_algorithm_benchmark(args.depth, args.algorithms, args.backends[0])
+        baseline = totals[args.algorithms[0]]
+        print(f"{'algorithm':<10} {'nodes':>10} {'time (s)':>10} {'nodes/s':>10} {'nodes':>8}  cùng nước đi")
+        for algorithm, row in totals.items():
+            relative = row['nodes'] / baseline['nodes'] if baseline['nodes'] else 0.0
+            same = 'có' if row['moves'] == baseline['moves'] else 'KHÔNG'
+            print(f"{algorithm:<10} {row['nodes']:>10} {row['elapsed']:>10.3f} {row['nps']:>10.0f} "
+                  f"{relative:>7.2f}x  {same}")
+        return
+
+    if args.sizes:
+        totals = run_size_benchmark(args.depth, args.sizes, args.backends[0])
+        baseline = totals[args.sizes[0]]['nps']
+        print(f"{'size':<10} {'nodes':>10} {'time (s)':>10} {'nodes/s':>10} {'relative':>8}")
+        for size, row in totals.items():
+            relative = row['nps'] / baseline if baseline else 0.0
+            print(f"{size:<10} {row['nodes']:>10} {row['elapsed']:>10.3f} {row['nps']:>10.0f} {relative:>7.2f}x")
+        return
+
+    totals = run_backend_benchmark(args.depth, args.backends)
+    baseline = totals[args.backends[0]]
+    print(f"{'backend':<10} {'nodes':>10} {'time (s)':>10} {'nodes/s':>10} {'speedup':>8}  cùng nước đi")
+    for backend, row in totals.items():
+        speedup = row['nps'] / baseline['nps'] if baseline['nps'] else 0.0
+        same = 'có' if row['moves'] == baseline['moves'] else 'KHÔNG'
+        print(f"{backend:<10} {row['nodes']:>10} {row['elapsed']:>10.3f} {row['nps']:>10.0f} {speedup:>7.2f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
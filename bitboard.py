@@ -0,0 +1,516 @@
+"""
+bitboard.py - Board backend dùng bitmask số nguyên cho từng người chơi.
+
+Mỗi người chơi có một số nguyên Python làm bitmask các ô đã đánh. Bit của
+ô (row, col) nằm ở vị trí row * stride + col với stride = size + 1: cột
+đệm cuối mỗi hàng luôn bằng 0 nên phép dịch bit theo hàng ngang và hai
+đường chéo không bị "tràn" sang hàng kế tiếp. Nhờ vậy 4 hướng đều là phép
+dịch cố định (1, stride, stride + 1, stride - 1) và phát hiện chuỗi thắng
+chỉ còn vài phép AND/shift.
+
+BitBoard không giữ grid dạng list: trạng thái quân cờ chỉ là các bitmask
+cùng mã base-4 của từng đường (như Board.line_codes). Điểm heuristic của
+một đường chỉ phụ thuộc mã của nó nên được tra theo mã trong bảng dùng
+chung với Board (evaluator.LineScoreTable): mỗi nước đi chỉ còn 4 lần tra
+dict. Frontier là phép nở bitmask quân đã đánh.
+
+Các bảng bit phụ thuộc kích thước và luật thắng nên được gom vào BitLayout,
+dựng một lần cho mỗi Geometry (bit_layout()).
+"""
+
+from typing import Iterator, Optional, Sequence
+from consts import (
+    BOARD_SIZE, WIN_CONDITION, EXACT_WIN, EMPTY, HUMAN, AI, DIRECTIONS, NEIGHBOR_RADIUS
+)
+from board import Board
+from evaluator import LineScoreTable, line_score_table, SCORE_SHIFT, SCORE_MASK
+from geometry import Geometry, get_geometry, SYMMETRY_COUNT
+
+
+def _run_steps(shift: int, length: int) -> tuple[int, ...]:
+    """
+    Các bước dịch để phát hiện `length` bit liên tiếp theo bước `shift`.
+
+    Dùng phép nhân đôi độ dài: sau mỗi bước `m &= m >> step`, bit i còn lại
+    nghĩa là các bit i, i + shift, ... (độ dài chuỗi hiện tại) đều bằng 1.
+    Với length = 5: dịch 1, 2 rồi 1 lần bước (chuỗi dài 2 -> 4 -> 5).
+    """
+    steps = []
+    run = 1
+    while run * 2 <= length:
+        steps.append(run * shift)
+        run *= 2
+    if run < length:
+        steps.append((length - run) * shift)
+    return tuple(steps)
+
+
+class BitLayout:
+    """
+    Bố trí bit của một Geometry.
+
+    Attributes:
+        stride: Số bit mỗi hàng (size + 1, gồm cột đệm)
+        shifts: Bước dịch bit tương ứng với từng hướng trong DIRECTIONS
+        bits: bits[row][col] là bit của ô
+        windows: Với mỗi ô, 4 cặp (mask cửa sổ, các bước dịch): cửa sổ gồm
+            các ô cách ô gốc tối đa win_length - 1 bước theo hướng đó (về
+            cả hai phía), mọi chuỗi thắng đi qua ô gốc đều nằm gọn trong đó
+        full_mask: Mask mọi ô của bàn cờ
+        cell_of_bit: Vị trí bit -> ô (row, col)
+        line_table: Bảng điểm theo mã đường của geometry (dùng chung với Board)
+    """
+
+    __slots__ = ('stride', 'shifts', 'bits', 'windows', 'full_mask', 'cell_of_bit', 'line_table',
+                 '_win_length')
+
+    def __init__(self, geometry: Geometry) -> None:
+        size = geometry.size
+        self.stride: int = size + 1
+        self.shifts: list[int] = [dr * self.stride + dc for dr, dc in DIRECTIONS]
+        self.bits: list[list[int]] = [
+            [1 << (row * self.stride + col) for col in range(size)] for row in range(size)
+        ]
+        self.full_mask: int = sum(bit for row in self.bits for bit in row)
+        self.line_table: LineScoreTable = line_score_table(geometry)
+        self._win_length: int = geometry.win_length
+        # Tra ngược từ vị trí bit sang (row, col)
+        self.cell_of_bit: dict[int, tuple[int, int]] = {
+            row * self.stride + col: geometry.cells[row][col] for row in range(size) for col in range(size)
+        }
+        reach = geometry.win_length - 1
+        self.windows: list[list[list[tuple[int, tuple[int, ...]]]]] = []
+        for row in range(size):
+            row_windows = []
+            for col in range(size):
+                cell_windows = []
+                for (dr, dc), shift in zip(DIRECTIONS, self.shifts):
+                    mask = 0
+                    for k in range(-reach, reach + 1):
+                        r, c = row + k * dr, col + k * dc
+                        if geometry.on_board(r, c):
+                            mask |= self.bits[r][c]
+                    cell_windows.append((mask, _run_steps(shift, geometry.win_length)))
+                row_windows.append(cell_windows)
+            self.windows.append(row_windows)
+
+    def dilate(self, mask: int, radius: int = 1) -> int:
+        """
+        Nở mask thành vùng vuông bán kính `radius` (khoảng cách Chebyshev).
+
+        Mỗi bước chỉ dịch 1 ô rồi AND với full_mask để xóa bit rơi vào cột
+        đệm, nên không có bit nào tràn sang hàng khác.
+        """
+        full_mask = self.full_mask
+        stride = self.stride
+        for _ in range(radius):
+            mask = (mask | (mask << 1) | (mask >> 1)) & full_mask
+            mask = (mask | (mask << stride) | (mask >> stride)) & full_mask
+        return mask
+
+    def iter_cells(self, mask: int) -> Iterator[tuple[int, int]]:
+        """Duyệt các ô (row, col) có bit bằng 1 trong mask, theo thứ tự bit tăng dần."""
+        cell_of_bit = self.cell_of_bit
+        while mask:
+            low = mask & -mask
+            yield cell_of_bit[low.bit_length() - 1]
+            mask ^= low
+
+    def has_run(self, mask: int, shift: int, length: Optional[int] = None) -> bool:
+        """Kiểm tra mask có `length` (mặc định win_length) bit liên tiếp theo bước dịch `shift` không."""
+        for step in _run_steps(shift, self._win_length if length is None else length):
+            mask &= mask >> step
+        return mask != 0
+
+
+_LAYOUTS: dict[Geometry, BitLayout] = {}
+
+
+def bit_layout(geometry: Geometry) -> BitLayout:
+    """BitLayout của geometry, dựng ở lần gọi đầu tiên."""
+    layout = _LAYOUTS.get(geometry)
+    if layout is None:
+        layout = _LAYOUTS[geometry] = BitLayout(geometry)
+    return layout
+
+
+class BitBoard:
+    """
+    Bàn cờ chỉ gồm bitmask của từng người chơi, dùng thay Board trong tìm kiếm.
+
+    Có cùng API công khai với Board (make_move / undo_move / push / pop,
+    check_winner, is_valid_move, played_cells, frontier, Zobrist hash, điểm
+    heuristic, line_codes, clone...) nhưng không kế thừa Board và không giữ
+    grid: is_valid_move, get_cell, check_winner đọc thẳng bitmask.
+
+    Attributes:
+        _layout: Bố trí bit theo geometry của bàn cờ
+        _masks: Bitmask các ô đã đánh của từng người chơi
+        _occupied: Bitmask mọi ô đã có quân
+        _history: Các ô đã đánh theo thứ tự (ngăn xếp nước đi)
+        _line_codes: Mã base-4 của từng đường (giống Board.line_codes)
+        _line_scores: Điểm đã gói của từng đường theo mã hiện tại
+        _score: Tổng _line_scores (điểm HUMAN và AI đã gói)
+        _frontier / _frontier_mask: Frontier (set) và bitmask tương ứng
+        _frontier_key: Bitmask _occupied lúc cập nhật frontier lần cuối
+        _grid / _grid_key: Ảnh grid dạng list và cặp bitmask lúc dựng nó
+    """
+
+    __slots__ = ('_geometry', '_layout', '_masks', '_occupied', '_history', '_hash',
+                 '_line_codes', '_line_scores', '_score', '_frontier', '_frontier_mask', '_frontier_key',
+                 '_grid', '_grid_key')
+
+    def __init__(self, size: int = BOARD_SIZE, win_length: int = WIN_CONDITION,
+                 exact: bool = EXACT_WIN) -> None:
+        self._geometry: Geometry = get_geometry(size, win_length, exact)
+        self._layout: BitLayout = bit_layout(self._geometry)
+        self._masks: dict[str, int] = {HUMAN: 0, AI: 0}
+        self._occupied: int = 0
+        self._history: list[tuple[int, int]] = []
+        self._hash: int = 0
+        self._line_codes: list[int] = self._geometry.empty_line_codes[:]
+        self._line_scores: list[int] = [self._layout.line_table.packed(code) for code in self._line_codes]
+        self._score: int = sum(self._line_scores)
+        self._frontier: set[tuple[int, int]] = set()
+        self._frontier_mask: int = 0
+        self._frontier_key: int = 0
+        self._grid: Optional[list[list[str]]] = None
+        self._grid_key: Optional[tuple[int, int]] = None
+
+    @classmethod
+    def from_board(cls, board: Board) -> 'BitBoard':
+        """
+        Tạo BitBoard có cùng thế cờ (và cùng thứ tự nước đi) với một Board.
+
+        Args:
+            board: Bàn cờ nguồn
+
+        Returns:
+            BitBoard tương đương (độc lập với bàn cờ nguồn)
+        """
+        if isinstance(board, BitBoard):
+            return board.clone()
+        new_board = cls(board.size, board.win_length, board.geometry.exact)
+        for row, col in board.history:
+            new_board.make_move(row, col, board.get_cell(row, col))
+        return new_board
+
+    def to_board(self) -> Board:
+        """Board (grid dạng list) có cùng thế cờ và thứ tự nước đi."""
+        board = Board(self.size, self.win_length, self._geometry.exact)
+        for row, col in self._history:
+            board.make_move(row, col, self.get_cell(row, col))
+        return board
+
+    # =========================================================================
+    # PROPERTIES
+    # =========================================================================
+
+    @property
+    def geometry(self) -> Geometry:
+        return self._geometry
+
+    @property
+    def size(self) -> int:
+        return self._geometry.size
+
+    @property
+    def win_length(self) -> int:
+        return self._geometry.win_length
+
+    @property
+    def grid(self) -> list[list[str]]:
+        """
+        Ảnh grid dạng list của thế cờ hiện tại (chỉ đọc). Khác Board.grid,
+        đây là ảnh chụp: không tự cập nhật theo nước đi sau đó; được dựng
+        lại khi thế cờ đã đổi.
+        """
+        key = (self._masks[HUMAN], self._masks[AI])
+        if self._grid_key != key:
+            size = self._geometry.size
+            grid = [[EMPTY] * size for _ in range(size)]
+            for player, mask in self._masks.items():
+                for row, col in self._layout.iter_cells(mask):
+                    grid[row][col] = player
+            self._grid = grid
+            self._grid_key = key
+        return self._grid
+
+    @property
+    def line_codes(self) -> list[int]:
+        """Mã base-4 của các đường (read-only reference, xem patterns.py)."""
+        return self._line_codes
+
+    @property
+    def played_cells(self) -> set[tuple[int, int]]:
+        """Set các ô đã đánh (tạo mới từ bitmask ở mỗi lần gọi)."""
+        return set(self._layout.iter_cells(self._occupied))
+
+    @property
+    def frontier(self) -> set[tuple[int, int]]:
+        """
+        Các ô trống trong bán kính NEIGHBOR_RADIUS quanh một quân bất kỳ
+        (read-only reference): phép nở bitmask quân đã đánh. Chỉ tính lại
+        khi thế cờ đã đổi, và set chỉ được sửa ở các bit khác với lần trước.
+        """
+        occupied = self._occupied
+        if self._frontier_key != occupied:
+            layout = self._layout
+            mask = layout.dilate(occupied, NEIGHBOR_RADIUS) & ~occupied
+            changed = mask ^ self._frontier_mask
+            frontier = self._frontier
+            cell_of_bit = layout.cell_of_bit
+            while changed:
+                low = changed & -changed
+                cell = cell_of_bit[low.bit_length() - 1]
+                if mask & low:
+                    frontier.add(cell)
+                else:
+                    frontier.discard(cell)
+                changed ^= low
+            self._frontier_mask = mask
+            self._frontier_key = occupied
+        return self._frontier
+
+    @property
+    def empty_mask(self) -> int:
+        """Bitmask các ô trống."""
+        return self._layout.full_mask & ~self._occupied
+
+    @property
+    def last_move(self) -> Optional[tuple[int, int]]:
+        history = self._history
+        return history[-1] if history else None
+
+    @property
+    def history(self) -> list[tuple[int, int]]:
+        """Các ô đã đánh theo thứ tự (read-only reference)."""
+        return self._history
+
+    @property
+    def move_count(self) -> int:
+        return len(self._history)
+
+    @property
+    def zobrist_hash(self) -> int:
+        return self._hash
+
+    def player_mask(self, player: str) -> int:
+        """Bitmask các ô đã đánh của người chơi."""
+        return self._masks[player]
+
+    def canonical_hash(self) -> tuple[int, int]:
+        """Zobrist hash chuẩn hóa theo 8 phép đối xứng (giống Board.canonical_hash)."""
+        zobrist = self._geometry.zobrist
+        stones = [(cell, zobrist[player]) for player, mask in self._masks.items()
+                  for cell in self._layout.iter_cells(mask)]
+        best_hash, best_symmetry = -1, 0
+        for symmetry in range(SYMMETRY_COUNT):
+            cells = self._geometry.symmetry_cells[symmetry]
+            key = 0
+            for (row, col), keys in stones:
+                tr, tc = cells[row][col]
+                key ^= keys[tr][tc]
+            if best_hash < 0 or key < best_hash:
+                best_hash, best_symmetry = key, symmetry
+        return best_hash, best_symmetry
+
+    def heuristic_score(self, player: str) -> int:
+        """Tổng điểm pattern (SCORE_*) của người chơi, O(1)."""
+        return self._score & SCORE_MASK if player == AI else self._score >> SCORE_SHIFT
+
+    # =========================================================================
+    # BASIC OPERATIONS
+    # =========================================================================
+
+    def get_cell(self, row: int, col: int) -> str:
+        bit = self._layout.bits[row][col]
+        if not self._occupied & bit:
+            return EMPTY
+        return HUMAN if self._masks[HUMAN] & bit else AI
+
+    def is_valid_move(self, row: int, col: int) -> bool:
+        """Kiểm tra ô nằm trong bàn cờ và còn trống (theo bitmask)."""
+        size = self._geometry.size
+        if not (0 <= row < size and 0 <= col < size):
+            return False
+        return not self._occupied & self._layout.bits[row][col]
+
+    def make_move(self, row: int, col: int, player: str) -> bool:
+        """Đánh quân; False nếu ô nằm ngoài bàn cờ hoặc đã có quân."""
+        geometry = self._geometry
+        size = geometry.size
+        if not (0 <= row < size and 0 <= col < size):
+            return False
+        layout = self._layout
+        bit = layout.bits[row][col]
+        if self._occupied & bit:
+            return False
+        self._masks[player] |= bit
+        self._occupied |= bit
+        self._hash ^= geometry.zobrist[player][row][col]
+        self._history.append(geometry.cells[row][col])
+        codes = self._line_codes
+        line_scores = self._line_scores
+        table = layout.line_table
+        known = table.known
+        score = self._score
+        for line, delta in geometry.line_deltas[player][row][col]:
+            code = codes[line] + delta
+            codes[line] = code
+            packed = known.get(code)
+            if packed is None:
+                packed = table.packed(code)
+            score += packed - line_scores[line]
+            line_scores[line] = packed
+        self._score = score
+        return True
+
+    def undo_move(self, row: int, col: int) -> None:
+        """
+        Hoàn tác nước cuối cùng, (row, col) phải là last_move.
+
+        Raises:
+            ValueError: Nếu (row, col) không phải nước cuối cùng
+        """
+        history = self._history
+        if not history or history[-1] != (row, col):
+            raise ValueError(f"chỉ hoàn tác được nước cuối cùng {self.last_move}, nhận {(row, col)}")
+        history.pop()
+        geometry = self._geometry
+        layout = self._layout
+        bit = layout.bits[row][col]
+        player = HUMAN if self._masks[HUMAN] & bit else AI
+        self._masks[player] ^= bit
+        self._occupied ^= bit
+        self._hash ^= geometry.zobrist[player][row][col]
+        codes = self._line_codes
+        line_scores = self._line_scores
+        table = layout.line_table
+        known = table.known
+        score = self._score
+        for line, delta in geometry.line_deltas[player][row][col]:
+            code = codes[line] - delta
+            codes[line] = code
+            packed = known.get(code)
+            if packed is None:
+                packed = table.packed(code)
+            score += packed - line_scores[line]
+            line_scores[line] = packed
+        self._score = score
+
+    def push(self, row: int, col: int, player: str) -> bool:
+        """Tên khác của make_move (cặp với pop)."""
+        return self.make_move(row, col, player)
+
+    def pop(self) -> Optional[tuple[int, int]]:
+        """Hoàn tác nước cuối cùng; trả về ô đó, hoặc None nếu bàn cờ trống."""
+        if not self._history:
+            return None
+        row, col = cell = self._history[-1]
+        self.undo_move(row, col)
+        return cell
+
+    def takeback(self, count: int) -> list[tuple[int, int]]:
+        """Hoàn tác `count` nước gần nhất; trả về các ô đã hoàn tác, nước mới nhất trước."""
+        return [self.pop() for _ in range(min(count, len(self._history)))]
+
+    def replay(self, moves: Sequence[tuple[int, int]], first_player: str = HUMAN) -> None:
+        """
+        Reset rồi đánh lại danh sách nước đi, hai bên luân phiên.
+
+        Raises:
+            ValueError: Nếu có nước đi không hợp lệ
+        """
+        self.reset()
+        player = first_player
+        for row, col in moves:
+            if not self.make_move(row, col, player):
+                raise ValueError(f"nước đi không hợp lệ: {(row, col)}")
+            player = AI if player == HUMAN else HUMAN
+
+    def reset(self) -> None:
+        self._masks = {HUMAN: 0, AI: 0}
+        self._occupied = 0
+        self._history.clear()
+        self._hash = 0
+        self._line_codes[:] = self._geometry.empty_line_codes
+        self._line_scores[:] = [self._layout.line_table.packed(code) for code in self._line_codes]
+        self._score = sum(self._line_scores)
+
+    def is_full(self) -> bool:
+        return not self.empty_mask
+
+    def neighbor_cells(self, radius: int = NEIGHBOR_RADIUS) -> set[tuple[int, int]]:
+        """
+        Các ô trống lân cận quân đã đánh, bằng phép nở bitmask.
+
+        Bán kính mặc định trả về frontier (read-only reference).
+        """
+        if radius == NEIGHBOR_RADIUS:
+            return self.frontier
+        layout = self._layout
+        return set(layout.iter_cells(layout.dilate(self._occupied, radius) & ~self._occupied))
+
+    def check_winner(self, last_row: int, last_col: int) -> Optional[str]:
+        """
+        Kiểm tra người thắng qua ô vừa đánh bằng phép AND/shift.
+
+        Chỉ xét các ô trong cửa sổ ±(win_length - 1) quanh ô vừa đánh
+        theo từng hướng, giống ngữ nghĩa của Board.check_winner. Với luật
+        chính xác, chuỗi qua ô đó còn phải dài đúng win_length (đếm bit
+        liên tiếp, chỉ khi đã có chuỗi đủ dài).
+        """
+        layout = self._layout
+        bit = layout.bits[last_row][last_col]
+        if not self._occupied & bit:
+            return None
+        player = HUMAN if self._masks[HUMAN] & bit else AI
+        mask = self._masks[player]
+        geometry = self._geometry
+        win_length = geometry.win_length
+        for (window, steps), shift in zip(layout.windows[last_row][last_col], layout.shifts):
+            m = mask & window
+            if m.bit_count() < win_length:
+                continue
+            for step in steps:
+                m &= m >> step
+            if m:
+                if not geometry.exact or self._run_length(mask, bit, shift) == win_length:
+                    return player
+        return None
+
+    @staticmethod
+    def _run_length(mask: int, bit: int, shift: int) -> int:
+        # Số bit liên tiếp của mask đi qua `bit` theo bước `shift` (cột đệm chặn tràn hàng)
+        count = 1
+        probe = bit << shift
+        while probe & mask:
+            count += 1
+            probe <<= shift
+        probe = bit >> shift
+        while probe & mask:
+            count += 1
+            probe >>= shift
+        return count
+
+    def clone(self) -> 'BitBoard':
+        new_board = BitBoard.__new__(BitBoard)
+        new_board._geometry = self._geometry
+        new_board._layout = self._layout
+        new_board._masks = self._masks.copy()
+        new_board._occupied = self._occupied
+        new_board._history = self._history[:]
+        new_board._hash = self._hash
+        new_board._line_codes = self._line_codes[:]
+        new_board._line_scores = self._line_scores[:]
+        new_board._score = self._score
+        new_board._frontier = self._frontier.copy()
+        new_board._frontier_mask = self._frontier_mask
+        new_board._frontier_key = self._frontier_key
+        new_board._grid = self._grid
+        new_board._grid_key = self._grid_key
+        return new_board
+
+    def __repr__(self) -> str:
+        return '\n'.join(' '.join(cell if cell else '.' for cell in row) for row in self.grid)
@@ -6,12 +6,28 @@ Chức năng:
 - Kiểm tra nước đi hợp lệ
 - Phát hiện người thắng (tối ưu: chỉ kiểm tra xung quanh nước đi mới nhất)
 - Theo dõi các ô đã đánh để tối ưu hóa AI
+- Duy trì Zobrist hash tăng dần (dùng cho transposition table)
+- Duy trì điểm heuristic tăng dần theo từng đường (đọc ra O(1))
+- Duy trì mã base-4 của từng đường cho bảng tra hình cờ (patterns.py)
+- Duy trì "frontier": các ô trống gần quân đã đánh (ứng viên nước đi của AI)
+- Kích thước bàn cờ và luật thắng theo từng instance (bảng tra cứu dùng
+  chung theo cấu hình, xem geometry.py)
 """
 
-from typing import Optional
-from consts import (
-    BOARD_SIZE, WIN_CONDITION, EMPTY, DIRECTIONS
-)
+from typing import Optional, Sequence
+from consts import BOARD_SIZE, WIN_CONDITION, EXACT_WIN, EMPTY, HUMAN, AI, DIRECTIONS, NEIGHBOR_RADIUS
+from evaluator import LineScoreTable, line_score_table, SCORE_SHIFT, SCORE_MASK
+from geometry import Geometry, get_geometry, SYMMETRY_COUNT
+
+
+def transform_cell(symmetry: int, row: int, col: int) -> tuple[int, int]:
+    """Ảnh của ô (row, col) qua phép đối xứng `symmetry` (0..SYMMETRY_COUNT-1) trên bàn cờ mặc định."""
+    return get_geometry().symmetry_cells[symmetry][row][col]
+
+
+def inverse_symmetry(symmetry: int) -> int:
+    """Phép đối xứng ngược của `symmetry`."""
+    return get_geometry().symmetry_inverse[symmetry]
 
 
 class Board:
@@ -19,48 +35,156 @@ class Board:
     Class quản lý bàn cờ Caro.
     
     Attributes:
+        _geometry: Kích thước, luật thắng và các bảng tra cứu dùng chung
         _grid: Mảng 2D lưu trạng thái các ô
         _played_cells: Set các ô đã được đánh (để truy xuất nhanh)
-        _last_move: Nước đi gần nhất (row, col)
+        _history: Các ô đã đánh theo thứ tự (ngăn xếp nước đi)
         _move_count: Số nước đã đánh
+        _hash: Zobrist hash của thế cờ hiện tại
+        _line_codes: Mã base-4 của từng đường (thứ tự Geometry.lines)
+        _line_table: Bảng điểm theo mã đường, dùng chung theo geometry
+        _line_scores: Điểm đã gói của từng đường theo mã hiện tại
+        _score: Tổng _line_scores (điểm HUMAN và AI đã gói, xem evaluator.py)
+        _neighbor_count: Số quân nằm trong bán kính NEIGHBOR_RADIUS của mỗi ô
+        _frontier: Set các ô trống có _neighbor_count > 0
+        _pending: Các nước đã đánh nhưng chưa áp vào _neighbor_count/_frontier
     """
     
-    __slots__ = ('_grid', '_played_cells', '_last_move', '_move_count')
+    __slots__ = (
+        '_geometry', '_grid', '_played_cells', '_history', '_move_count', '_hash',
+        '_line_codes', '_line_table', '_line_scores', '_score', '_neighbor_count', '_frontier', '_pending'
+    )
     
-    def __init__(self) -> None:
-        """Khởi tạo bàn cờ trống."""
+    def __init__(self, size: int = BOARD_SIZE, win_length: int = WIN_CONDITION,
+                 exact: bool = EXACT_WIN) -> None:
+        """
+        Khởi tạo bàn cờ trống.
+        
+        Args:
+            size: Kích thước bàn cờ (size x size)
+            win_length: Số quân liên tiếp để thắng
+            exact: True nếu chỉ đúng win_length quân mới thắng
+        """
+        self._geometry: Geometry = get_geometry(size, win_length, exact)
         self._grid: list[list[str]] = [
-            [EMPTY for _ in range(BOARD_SIZE)] 
-            for _ in range(BOARD_SIZE)
+            [EMPTY for _ in range(size)] 
+            for _ in range(size)
         ]
         self._played_cells: set[tuple[int, int]] = set()
-        self._last_move: Optional[tuple[int, int]] = None
+        self._history: list[tuple[int, int]] = []
         self._move_count: int = 0
+        self._hash: int = 0
+        self._line_codes: list[int] = self._geometry.empty_line_codes[:]
+        self._line_table: LineScoreTable = line_score_table(self._geometry)
+        self._line_scores: list[int] = [self._line_table.packed(code) for code in self._line_codes]
+        self._score: int = sum(self._line_scores)
+        self._neighbor_count: list[list[int]] = [
+            [0] * size for _ in range(size)
+        ]
+        self._frontier: set[tuple[int, int]] = set()
+        self._pending: list[tuple[int, int]] = []
     
     # =========================================================================
     # PROPERTIES (Encapsulation)
     # =========================================================================
     
+    @property
+    def geometry(self) -> Geometry:
+        """Trả về cấu hình bàn cờ (dùng chung giữa các Board cùng cấu hình)."""
+        return self._geometry
+    
+    @property
+    def size(self) -> int:
+        """Trả về kích thước bàn cờ."""
+        return self._geometry.size
+    
+    @property
+    def win_length(self) -> int:
+        """Trả về số quân liên tiếp để thắng."""
+        return self._geometry.win_length
+    
     @property
     def grid(self) -> list[list[str]]:
         """Trả về bàn cờ (read-only reference)."""
         return self._grid
     
+    @property
+    def line_codes(self) -> list[int]:
+        """Trả về mã base-4 của các đường (read-only reference, xem patterns.py)."""
+        return self._line_codes
+    
     @property
     def played_cells(self) -> set[tuple[int, int]]:
         """Trả về set các ô đã đánh (read-only reference)."""
         return self._played_cells
     
+    @property
+    def frontier(self) -> set[tuple[int, int]]:
+        """
+        Trả về set các ô trống trong bán kính NEIGHBOR_RADIUS quanh một quân
+        bất kỳ (read-only reference, cập nhật tăng dần theo nước đi).
+        """
+        if self._pending:
+            self._flush_frontier()
+        return self._frontier
+    
     @property
     def last_move(self) -> Optional[tuple[int, int]]:
-        """Trả về nước đi gần nhất."""
-        return self._last_move
+        """Trả về nước đi gần nhất (luôn đúng kể cả sau khi hoàn tác)."""
+        history = self._history
+        return history[-1] if history else None
+    
+    @property
+    def history(self) -> list[tuple[int, int]]:
+        """Trả về các ô đã đánh theo thứ tự (read-only reference)."""
+        return self._history
     
     @property
     def move_count(self) -> int:
         """Trả về số nước đã đánh."""
         return self._move_count
     
+    @property
+    def zobrist_hash(self) -> int:
+        """Trả về Zobrist hash 64-bit của thế cờ hiện tại."""
+        return self._hash
+    
+    def canonical_hash(self) -> tuple[int, int]:
+        """
+        Zobrist hash chuẩn hóa theo 8 phép đối xứng của bàn cờ.
+        
+        Các thế cờ đối xứng nhau có cùng hash chuẩn hóa. Chi phí
+        O(8 * số quân), chỉ nên dùng ngoài vòng lặp tìm kiếm.
+        
+        Returns:
+            (hash nhỏ nhất trong 8 ảnh, phép đối xứng cho ra hash đó):
+            ô (row, col) của bàn cờ này ứng với transform_cell(symmetry, row, col)
+            trong thế cờ chuẩn hóa
+        """
+        grid = self._grid
+        zobrist = self._geometry.zobrist
+        best_hash, best_symmetry = -1, 0
+        for symmetry in range(SYMMETRY_COUNT):
+            cells = self._geometry.symmetry_cells[symmetry]
+            key = 0
+            for row, col in self._played_cells:
+                tr, tc = cells[row][col]
+                key ^= zobrist[grid[row][col]][tr][tc]
+            if best_hash < 0 or key < best_hash:
+                best_hash, best_symmetry = key, symmetry
+        return best_hash, best_symmetry
+    
+    def heuristic_score(self, player: str) -> int:
+        """
+        Tổng điểm pattern (SCORE_*) của người chơi trên toàn bàn cờ.
+        
+        Được cập nhật tăng dần trong make_move/undo_move nên chi phí O(1).
+        
+        Args:
+            player: Người chơi (HUMAN hoặc AI)
+        """
+        return self._score & SCORE_MASK if player == AI else self._score >> SCORE_SHIFT
+    
     # =========================================================================
     # BASIC OPERATIONS
     # =========================================================================
@@ -89,7 +213,8 @@ class Board:
         Returns:
             True nếu ô trống và nằm trong bàn cờ
         """
-        if not (0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE):
+        size = self._geometry.size
+        if not (0 <= row < size and 0 <= col < size):
             return False
         return self._grid[row][col] == EMPTY
     
@@ -108,37 +233,191 @@ class Board:
         if not self.is_valid_move(row, col):
             return False
         
+        geometry = self._geometry
+        cell = geometry.cells[row][col]
         self._grid[row][col] = player
-        self._played_cells.add((row, col))
-        self._last_move = (row, col)
+        self._hash ^= geometry.zobrist[player][row][col]
+        self._played_cells.add(cell)
+        self._history.append(cell)
         self._move_count += 1
+        self._update_lines(geometry.line_deltas[player][row][col], 1)
+        # Frontier được cập nhật trễ tới lần đọc kế tiếp (xem _flush_frontier)
+        self._pending.append(cell)
         return True
     
     def undo_move(self, row: int, col: int) -> None:
         """
-        Hoàn tác nước đi (dùng cho AI backtracking).
+        Hoàn tác nước cuối cùng (dùng cho AI backtracking). Lịch sử là một
+        ngăn xếp: chỉ hoàn tác được last_move, không hỗ trợ bỏ nước cũ hơn
+        (dùng pop() khi không cần chỉ rõ ô).
         
         Args:
             row: Chỉ số hàng
             col: Chỉ số cột
+
+        Raises:
+            ValueError: Nếu (row, col) không phải nước cuối cùng
         """
+        history = self._history
+        if not history or history[-1] != (row, col):
+            raise ValueError(f"chỉ hoàn tác được nước cuối cùng {self.last_move}, nhận {(row, col)}")
+        player = self._grid[row][col]
+        geometry = self._geometry
+        cell = history.pop()
+        self._update_lines(geometry.line_deltas[player][row][col], -1)
         self._grid[row][col] = EMPTY
-        self._played_cells.discard((row, col))
+        self._hash ^= geometry.zobrist[player][row][col]
+        self._played_cells.discard(cell)
         self._move_count -= 1
-        # Không cập nhật _last_move vì AI sẽ restore sau
+        
+        # Nước chưa được áp vào frontier thì chỉ cần bỏ khỏi hàng đợi (trường
+        # hợp thường gặp ở node lá của AI); ngược lại giảm bộ đếm lân cận.
+        # Hàng đợi là phần cuối của lịch sử nên nước cuối luôn nằm ở đỉnh nếu có.
+        pending = self._pending
+        if pending:
+            pending.pop()
+        else:
+            counts = self._neighbor_count
+            frontier = self._frontier
+            for neighbor in geometry.neighbors[row][col]:
+                nr, nc = neighbor
+                counts[nr][nc] -= 1
+                if counts[nr][nc] == 0:
+                    frontier.discard(neighbor)
+            if counts[row][col]:
+                frontier.add(cell)
+    
+    def push(self, row: int, col: int, player: str) -> bool:
+        """Tên khác của make_move (cặp với pop), chỉ để đọc code ngăn xếp cho rõ."""
+        return self.make_move(row, col, player)
+    
+    def pop(self) -> Optional[tuple[int, int]]:
+        """
+        Hoàn tác nước cuối cùng, khôi phục mọi trạng thái dẫn xuất (nước
+        cuối, số nước, hash, điểm heuristic, frontier).
+        
+        Returns:
+            Ô vừa hoàn tác, hoặc None nếu bàn cờ trống
+        """
+        if not self._history:
+            return None
+        row, col = cell = self._history[-1]
+        self.undo_move(row, col)
+        return cell
+    
+    def takeback(self, count: int) -> list[tuple[int, int]]:
+        """
+        Hoàn tác `count` nước gần nhất (tối đa bằng số nước đã đánh).
+        
+        Returns:
+            Các ô đã hoàn tác, nước mới nhất trước
+        """
+        taken = []
+        for _ in range(min(count, len(self._history))):
+            taken.append(self.pop())
+        return taken
+    
+    def replay(self, moves: Sequence[tuple[int, int]], first_player: str = HUMAN) -> None:
+        """
+        Reset rồi đánh lại danh sách nước đi, hai bên luân phiên.
+        
+        Raises:
+            ValueError: Nếu có nước đi không hợp lệ
+        """
+        self.reset()
+        player = first_player
+        for row, col in moves:
+            if not self.make_move(row, col, player):
+                raise ValueError(f"nước đi không hợp lệ: {(row, col)}")
+            player = AI if player == HUMAN else HUMAN
     
     def reset(self) -> None:
         """Reset bàn cờ về trạng thái ban đầu."""
-        for row in range(BOARD_SIZE):
-            for col in range(BOARD_SIZE):
+        size = self._geometry.size
+        for row in range(size):
+            for col in range(size):
                 self._grid[row][col] = EMPTY
         self._played_cells.clear()
-        self._last_move = None
+        self._history.clear()
         self._move_count = 0
+        self._hash = 0
+        self._line_codes[:] = self._geometry.empty_line_codes
+        self._line_scores[:] = [self._line_table.packed(code) for code in self._line_codes]
+        self._score = sum(self._line_scores)
+        for counts in self._neighbor_count:
+            counts[:] = [0] * size
+        self._frontier.clear()
+        self._pending.clear()
+    
+    def _update_lines(self, deltas: list[tuple[int, int]], sign: int) -> None:
+        """
+        Cộng (sign = 1) hoặc trừ (sign = -1) mã quân vào 4 đường qua ô vừa
+        đổi, rồi cập nhật điểm từng đường bằng cách tra bảng theo mã mới.
+        """
+        codes = self._line_codes
+        line_scores = self._line_scores
+        table = self._line_table
+        known = table.known
+        score = self._score
+        for line, delta in deltas:
+            code = codes[line] + sign * delta
+            codes[line] = code
+            packed = known.get(code)
+            if packed is None:
+                packed = table.packed(code)
+            score += packed - line_scores[line]
+            line_scores[line] = packed
+        self._score = score
+    
+    def _flush_frontier(self) -> None:
+        """
+        Áp các nước đang chờ vào bộ đếm lân cận và frontier.
+        
+        Mỗi nước tốn O(radius²): tăng bộ đếm các ô lân cận, ô trống có quân
+        đầu tiên ở gần thì vào frontier. Việc cập nhật được dồn tới lần đọc
+        frontier kế tiếp nên các nước đánh rồi hoàn tác ngay (node lá) không
+        tốn gì.
+        """
+        counts = self._neighbor_count
+        grid = self._grid
+        frontier = self._frontier
+        neighbors = self._geometry.neighbors
+        for cell in self._pending:
+            row, col = cell
+            frontier.discard(cell)
+            for neighbor in neighbors[row][col]:
+                nr, nc = neighbor
+                counts[nr][nc] += 1
+                if counts[nr][nc] == 1 and grid[nr][nc] == EMPTY:
+                    frontier.add(neighbor)
+        self._pending.clear()
     
     def is_full(self) -> bool:
         """Kiểm tra bàn cờ đã đầy chưa (hòa)."""
-        return self._move_count >= BOARD_SIZE * BOARD_SIZE
+        return self._move_count >= self._geometry.size ** 2
+    
+    def neighbor_cells(self, radius: int = NEIGHBOR_RADIUS) -> set[tuple[int, int]]:
+        """
+        Các ô trống nằm trong vùng vuông bán kính `radius` quanh một quân bất kỳ.
+        
+        Args:
+            radius: Bán kính (khoảng cách Chebyshev) tính từ các ô đã đánh
+            
+        Returns:
+            Set các ô (row, col) trống lân cận. Với radius mặc định đây là
+            chính frontier (read-only reference), không tốn chi phí tính lại.
+        """
+        if radius == NEIGHBOR_RADIUS:
+            return self.frontier
+        cells: set[tuple[int, int]] = set()
+        for played_row, played_col in self._played_cells:
+            for dr in range(-radius, radius + 1):
+                for dc in range(-radius, radius + 1):
+                    if dr == 0 and dc == 0: continue
+                    nr, nc = played_row + dr, played_col + dc
+                    if self.is_valid_move(nr, nc):
+                        cells.add((nr, nc))
+        return cells
     
     # =========================================================================
     # WIN DETECTION (Optimized)
@@ -149,7 +428,8 @@ class Board:
         Kiểm tra người thắng dựa trên nước đi cuối cùng.
         
         Tối ưu: Chỉ kiểm tra 4 hướng đi qua ô vừa đánh thay vì
-        quét toàn bộ bàn cờ.
+        quét toàn bộ bàn cờ. Với luật chính xác, chuỗi dài hơn win_length
+        không tính là thắng.
         
         Args:
             last_row: Hàng của nước đi cuối
@@ -161,6 +441,8 @@ class Board:
         player = self._grid[last_row][last_col]
         if player == EMPTY:
             return None
+        win_length = self._geometry.win_length
+        exact = self._geometry.exact
         
         for dr, dc in DIRECTIONS:
             count = 1  # Đếm ô hiện tại
@@ -171,7 +453,7 @@ class Board:
             # Đếm theo hướng nghịch (-dr, -dc)
             count += self._count_direction(last_row, last_col, -dr, -dc, player)
             
-            if count >= WIN_CONDITION:
+            if count == win_length or (count > win_length and not exact):
                 return player
         
         return None
@@ -198,9 +480,10 @@ class Board:
             Số quân liên tiếp (không tính ô bắt đầu)
         """
         count = 0
+        size = self._geometry.size
         r, c = row + dr, col + dc
         
-        while (0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE 
+        while (0 <= r < size and 0 <= c < size 
                and self._grid[r][c] == player):
             count += 1
             r += dr
@@ -219,11 +502,21 @@ class Board:
         Returns:
             Bản sao mới của Board
         """
-        new_board = Board()
+        cls = type(self)
+        new_board = cls.__new__(cls)
+        new_board._geometry = self._geometry
         new_board._grid = [row[:] for row in self._grid]
         new_board._played_cells = self._played_cells.copy()
-        new_board._last_move = self._last_move
+        new_board._history = self._history[:]
         new_board._move_count = self._move_count
+        new_board._hash = self._hash
+        new_board._line_codes = self._line_codes[:]
+        new_board._line_table = self._line_table
+        new_board._line_scores = self._line_scores[:]
+        new_board._score = self._score
+        new_board._neighbor_count = [counts[:] for counts in self._neighbor_count]
+        new_board._frontier = self._frontier.copy()
+        new_board._pending = self._pending[:]
         return new_board
     
     def __repr__(self) -> str:
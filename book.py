@@ -0,0 +1,251 @@
+"""
+book.py - Sách khai cuộc: nước đi tìm sẵn cho các thế cờ đầu ván.
+
+File sách là bảng băm địa chỉ mở (dò tuyến tính) kích thước lũy thừa 2,
+đọc qua mmap nên tra cứu O(1) và không phải nạp cả file vào bộ nhớ:
+
+    header: magic b'CBK1', version (u32), số slot (u32), số entry (u32)
+    slot:   key (u64), nước đi (u16), depth (u8), pad, score (i32)
+
+key là Board.canonical_hash() (chuẩn hóa theo 8 phép đối xứng); nước đi
+được lưu theo hướng của thế cờ chuẩn hóa (chỉ số row * BOARD_SIZE + col).
+Sách chỉ chứa thế cờ tới lượt AI, trên bàn cờ mặc định (BOARD_SIZE,
+WIN_CONDITION); bàn cờ cấu hình khác không tra sách.
+
+File chỉ được mở ở lần tra cứu đầu tiên nên không ảnh hưởng thời gian
+khởi động; thiếu file hoặc file hỏng (ghi cảnh báo qua logging) thì sách
+coi như rỗng.
+
+Sinh sách (tìm sâu, chạy offline):
+    python book.py generate --plies 8 --width 2 --depth 4 --output opening_book.bin
+"""
+
+import mmap
+import os
+import struct
+import time
+from typing import Optional
+from consts import BOARD_SIZE, HUMAN, AI, BOOK_MAX_PLIES, OPENING_BOOK_PATH
+from board import Board, transform_cell, inverse_symmetry
+from geometry import get_geometry
+
+BOOK_MAGIC: bytes = b'CBK1'
+BOOK_VERSION: int = 1
+
+_HEADER = struct.Struct('<4sIII')
+_SLOT = struct.Struct('<QHBxi')
+_EMPTY_MOVE = 0xFFFF
+
+BookEntry = tuple[tuple[int, int], int, int]
+
+
+def _book_key(key: int) -> int:
+    # Key 0 đánh dấu slot trống; thế cờ có hash 0 (bàn trống) dùng key 1
+    return key or 1
+
+
+def write_book(path: str, entries: dict[int, BookEntry]) -> None:
+    """
+    Ghi sách ra file.
+
+    Args:
+        entries: {canonical hash: (nước đi theo hướng chuẩn hóa, depth, score)}
+    """
+    slots = 1
+    while slots < 2 * max(1, len(entries)):
+        slots *= 2
+    table: list[Optional[tuple[int, BookEntry]]] = [None] * slots
+    for key, entry in entries.items():
+        key = _book_key(key)
+        index = key & (slots - 1)
+        while table[index] is not None:
+            index = (index + 1) & (slots - 1)
+        table[index] = (key, entry)
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, slots, len(entries)))
+        for slot in table:
+            if slot is None:
+                f.write(_SLOT.pack(0, _EMPTY_MOVE, 0, 0))
+            else:
+                key, ((row, col), depth, score) = slot
+                score = max(-2**31, min(2**31 - 1, int(score)))
+                f.write(_SLOT.pack(key, row * BOARD_SIZE + col, min(depth, 255), score))
+
+
+class OpeningBook:
+    """
+    Sách khai cuộc đọc qua mmap, mở lười ở lần probe đầu tiên.
+
+    Attributes:
+        path: Đường dẫn file sách (tương đối thì tính từ thư mục chứa module)
+        max_plies: Chỉ tra sách khi số nước đã đánh nhỏ hơn giá trị này
+    """
+
+    __slots__ = ('path', 'max_plies', '_loaded', '_file', '_map', '_slots')
+
+    def __init__(self, path: str = OPENING_BOOK_PATH, max_plies: int = BOOK_MAX_PLIES) -> None:
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+        self.path: str = path
+        self.max_plies: int = max_plies
+        self._loaded: bool = False
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._slots: int = 0
+
+    def _load(self) -> None:
+        # File hỏng (rỗng, cụt, sai magic/phiên bản) được coi như không có sách
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+        book_file = None
+        book_map = None
+        try:
+            book_file = open(self.path, 'rb')
+            book_map = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, slots, _ = _HEADER.unpack_from(book_map, 0)
+            if magic != BOOK_MAGIC or version != BOOK_VERSION:
+                raise ValueError("sai magic hoặc phiên bản")
+            if slots < 1 or slots & (slots - 1) or len(book_map) < _HEADER.size + slots * _SLOT.size:
+                raise ValueError(f"file cụt hoặc số slot không hợp lệ ({slots})")
+        except (OSError, ValueError, struct.error) as e:
+            if book_map is not None:
+                book_map.close()
+            if book_file is not None:
+                book_file.close()
+            # logging chỉ được import khi thật sự có lỗi, không tốn thời gian khởi động
+            import logging
+            logging.getLogger(__name__).warning("bỏ qua sách khai cuộc %s: %s", self.path, e)
+            return
+        self._file = book_file
+        self._map = book_map
+        self._slots = slots
+
+    def __len__(self) -> int:
+        if not self._loaded:
+            self._load()
+        return _HEADER.unpack_from(self._map, 0)[3] if self._map is not None else 0
+
+    def probe(self, board: Board) -> Optional[BookEntry]:
+        """
+        Tra nước đi cho thế cờ (tới lượt AI).
+
+        Returns:
+            (nước đi trên bàn cờ này, depth, score) hoặc None nếu không có trong sách
+        """
+        if board.move_count >= self.max_plies or board.geometry is not get_geometry():
+            return None
+        if not self._loaded:
+            self._load()
+        if self._map is None:
+            return None
+        key, symmetry = board.canonical_hash()
+        key = _book_key(key)
+        mask = self._slots - 1
+        index = key & mask
+        while True:
+            slot_key, move, depth, score = _SLOT.unpack_from(self._map, _HEADER.size + index * _SLOT.size)
+            if slot_key == 0:
+                return None
+            if slot_key == key:
+                break
+            index = (index + 1) & mask
+        row, col = transform_cell(inverse_symmetry(symmetry), move // BOARD_SIZE, move % BOARD_SIZE)
+        if not board.is_valid_move(row, col):
+            return None
+        return (row, col), depth, score
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._map = None
+        self._file = None
+        self._loaded = False
+
+
+def _first_moves(width: int) -> list[tuple[int, int]]:
+    # Nước đầu của HUMAN: các ô gần tâm, bỏ các ô đối xứng với ô đã chọn
+    center = BOARD_SIZE // 2
+    cells = sorted(
+        ((r, c) for r in range(center - 2, center + 3) for c in range(center - 2, center + 3)),
+        key=lambda p: (abs(p[0] - center) + abs(p[1] - center), p)
+    )
+    moves: list[tuple[int, int]] = []
+    seen: set[int] = set()
+    for row, col in cells:
+        board = Board()
+        board.make_move(row, col, HUMAN)
+        key = board.canonical_hash()[0]
+        if key not in seen:
+            seen.add(key)
+            moves.append((row, col))
+        if len(moves) == width:
+            break
+    return moves
+
+
+def generate_book(plies: int, width: int, depth: int, verbose: bool = False) -> dict[int, BookEntry]:
+    """
+    Sinh sách bằng tìm kiếm sâu cho các thế cờ tới `plies` nước đầu.
+
+    AI đi theo nước tốt nhất tìm được; HUMAN rẽ nhánh theo `width` nước trả
+    lời khả dĩ nhất (AIEngine.predict_replies). Gồm cả ván AI đi trước và
+    ván HUMAN đi trước.
+    """
+    from ai import AIEngine
+
+    engine = AIEngine(depth=depth, opening_book=None)
+    entries: dict[int, BookEntry] = {}
+    start = time.perf_counter()
+
+    def expand(board: Board, player: str) -> None:
+        if board.move_count >= plies:
+            return
+        if player == AI:
+            key, symmetry = board.canonical_hash()
+            if key in entries:
+                return
+            result = engine.search(board)
+            if result.move is None:
+                return
+            entries[key] = (transform_cell(symmetry, *result.move), result.depth, int(result.score))
+            if verbose:
+                print(f"{len(entries):>6} ply {board.move_count:>2} -> {result.move} "
+                      f"({time.perf_counter() - start:.0f}s)")
+            replies = [result.move]
+            next_player = HUMAN
+        else:
+            replies = engine.predict_replies(board, width) if board.move_count else _first_moves(width)
+            next_player = AI
+        for row, col in replies:
+            child = board.clone()
+            child.make_move(row, col, player)
+            if child.check_winner(row, col) is None:
+                expand(child, next_player)
+
+    expand(Board(), AI)
+    expand(Board(), HUMAN)
+    return entries
+
+
+def main() -> None:
+    import argparse
+    parser = argparse.ArgumentParser(description="Sách khai cuộc")
+    commands = parser.add_subparsers(dest='command', required=True)
+    generate = commands.add_parser('generate', help="sinh sách bằng tìm kiếm sâu")
+    generate.add_argument('--plies', type=int, default=8, help="số nước đầu được đưa vào sách")
+    generate.add_argument('--width', type=int, default=2, help="số nước trả lời của HUMAN ở mỗi thế cờ")
+    generate.add_argument('--depth', type=int, default=4)
+    generate.add_argument('--output', default=OPENING_BOOK_PATH)
+    args = parser.parse_args()
+
+    output = OpeningBook(args.output).path
+    entries = generate_book(args.plies, args.width, args.depth, verbose=True)
+    write_book(output, entries)
+    print(f"Đã ghi {len(entries)} thế cờ vào {output}")
+
+
+if __name__ == "__main__":
+    main()
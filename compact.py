@@ -0,0 +1,193 @@
+"""
+compact.py - Dạng biểu diễn gọn của bàn cờ cho lưu trữ và truyền giữa các process.
+
+CompactBoard giữ size * size ô (225 với bàn mặc định) trong một bytearray
+phẳng (mã EMPTY_CODE/HUMAN_CODE/AI_CODE, chỉ số row * size + col) cùng
+ngăn xếp nước đi:
+    - snapshot(): token O(1) (độ dài ngăn xếp), restore(token) hoàn tác về đó
+    - view(): memoryview chỉ đọc của các ô, không sao chép
+    - encode()/decode(): mã hóa ổn định 2 bit mỗi ô, encoded_size(size) byte
+      (ENCODED_SIZE = 57 với bàn mặc định), 4 ô mỗi byte, ô i nằm ở bit
+      2 * (i % 4) của byte i // 4. Kích thước và luật thắng không nằm trong
+      bản mã hóa mà truyền lại cho decode()
+    - move_stack(): thứ tự nước đi (array('H') chỉ số ô, 2 byte mỗi nước),
+      truyền cho decode(moves=...) để giữ nguyên history/last_move
+    - from_board()/to_board(): chuyển đổi qua lại với Board (gui.py, ai.py)
+
+Board vẫn là dạng dùng khi tìm kiếm (evaluator/frontier tăng dần gắn với
+grid của nó); CompactBoard dùng cho lưu trữ, IPC và các công cụ offline.
+"""
+
+from array import array
+from typing import Optional
+from consts import BOARD_SIZE, WIN_CONDITION, EXACT_WIN, EMPTY, HUMAN, AI, EMPTY_CODE, HUMAN_CODE, AI_CODE
+from board import Board
+from geometry import Geometry, get_geometry
+
+
+def encoded_size(size: int) -> int:
+    """Số byte của encode() cho bàn cờ size x size."""
+    return (size * size * 2 + 7) // 8
+
+
+CELL_COUNT: int = BOARD_SIZE * BOARD_SIZE
+ENCODED_SIZE: int = encoded_size(BOARD_SIZE)
+
+_CODE_OF: dict[str, int] = {EMPTY: EMPTY_CODE, HUMAN: HUMAN_CODE, AI: AI_CODE}
+_PLAYER_OF: dict[int, str] = {code: player for player, code in _CODE_OF.items()}
+
+
+class CompactBoard:
+    """
+    Bàn cờ dạng bytearray phẳng kèm ngăn xếp nước đi.
+
+    Attributes:
+        _geometry: Kích thước và luật thắng (dùng khi dựng lại Board)
+        _cells: bytearray size * size ô
+        _moves: Chỉ số ô của các nước đã đánh theo thứ tự
+    """
+
+    __slots__ = ('_geometry', '_cells', '_moves')
+
+    def __init__(self, size: int = BOARD_SIZE, win_length: int = WIN_CONDITION,
+                 exact: bool = EXACT_WIN) -> None:
+        self._geometry: Geometry = get_geometry(size, win_length, exact)
+        self._cells: bytearray = bytearray(size * size)
+        self._moves: array = array('H')
+
+    @classmethod
+    def from_board(cls, board: Board) -> 'CompactBoard':
+        """Tạo từ Board, giữ nguyên thứ tự nước đi (Board.history)."""
+        geometry = board.geometry
+        compact = cls(geometry.size, geometry.win_length, geometry.exact)
+        grid = board.grid
+        for row, col in board.history:
+            compact.make_move(row, col, grid[row][col])
+        return compact
+
+    def to_board(self) -> Board:
+        """Dựng Board mới bằng cách đánh lại ngăn xếp nước đi."""
+        geometry = self._geometry
+        board = Board(geometry.size, geometry.win_length, geometry.exact)
+        cells = self._cells
+        for index in self._moves:
+            row, col = divmod(index, geometry.size)
+            board.make_move(row, col, _PLAYER_OF[cells[index]])
+        return board
+    
+    @property
+    def geometry(self) -> Geometry:
+        return self._geometry
+
+    @property
+    def move_count(self) -> int:
+        return len(self._moves)
+
+    @property
+    def last_move(self) -> Optional[tuple[int, int]]:
+        if not self._moves:
+            return None
+        return divmod(self._moves[-1], self._geometry.size)
+
+    def get_cell(self, row: int, col: int) -> str:
+        return _PLAYER_OF[self._cells[row * self._geometry.size + col]]
+
+    def is_valid_move(self, row: int, col: int) -> bool:
+        size = self._geometry.size
+        return 0 <= row < size and 0 <= col < size and self._cells[row * size + col] == EMPTY_CODE
+
+    def make_move(self, row: int, col: int, player: str) -> bool:
+        """Đánh quân; trả về False nếu ô không hợp lệ."""
+        if not self.is_valid_move(row, col):
+            return False
+        index = row * self._geometry.size + col
+        self._cells[index] = _CODE_OF[player]
+        self._moves.append(index)
+        return True
+
+    def undo_move(self) -> Optional[tuple[int, int]]:
+        """Hoàn tác nước cuối cùng; trả về ô vừa hoàn tác (None nếu bàn trống)."""
+        if not self._moves:
+            return None
+        index = self._moves.pop()
+        self._cells[index] = EMPTY_CODE
+        return divmod(index, self._geometry.size)
+
+    def snapshot(self) -> int:
+        """Token O(1) của thế cờ hiện tại, dùng với restore()."""
+        return len(self._moves)
+
+    def restore(self, token: int) -> None:
+        """Hoàn tác các nước đã đánh sau snapshot `token`."""
+        if not 0 <= token <= len(self._moves):
+            raise ValueError(f"token không hợp lệ: {token}")
+        cells = self._cells
+        moves = self._moves
+        while len(moves) > token:
+            cells[moves.pop()] = EMPTY_CODE
+
+    def view(self) -> memoryview:
+        """memoryview chỉ đọc trỏ thẳng vào các ô (không sao chép)."""
+        return memoryview(self._cells).toreadonly()
+
+    def move_stack(self) -> bytes:
+        """
+        Ngăn xếp nước đi dạng bytes (array('H') chỉ số ô, byte order của
+        máy), dùng kèm encode() khi cần giữ thứ tự nước đi, vd qua IPC.
+        """
+        return self._moves.tobytes()
+
+    def encode(self) -> bytes:
+        """Mã hóa encoded_size(size) byte (chỉ nội dung các ô, không gồm thứ tự nước đi)."""
+        cells = self._cells
+        out = bytearray(encoded_size(self._geometry.size))
+        for index in range(0, len(cells), 4):
+            chunk = cells[index:index + 4]
+            value = 0
+            for shift, code in enumerate(chunk):
+                value |= code << (2 * shift)
+            out[index // 4] = value
+        return bytes(out)
+
+    @classmethod
+    def decode(cls, data: bytes, size: int = BOARD_SIZE, win_length: int = WIN_CONDITION,
+               exact: bool = EXACT_WIN, moves: Optional[bytes] = None) -> 'CompactBoard':
+        """
+        Dựng lại từ encode() của bàn cờ cùng cấu hình.
+
+        Args:
+            moves: move_stack() của cùng bàn cờ; None thì ngăn xếp được
+                dựng theo thứ tự ô (thứ tự nước đi thật không còn)
+
+        Raises:
+            ValueError: Nếu dữ liệu sai kích thước, có mã ô lạ hoặc `moves`
+                không khớp các ô đã đánh
+        """
+        if len(data) != encoded_size(size):
+            raise ValueError(f"cần {encoded_size(size)} byte, nhận {len(data)}")
+        compact = cls(size, win_length, exact)
+        cells = compact._cells
+        for index in range(size * size):
+            code = (data[index // 4] >> (2 * (index % 4))) & 0b11
+            if code not in _PLAYER_OF:
+                raise ValueError(f"mã ô không hợp lệ tại {index}: {code}")
+            if code != EMPTY_CODE:
+                cells[index] = code
+                compact._moves.append(index)
+        if moves is not None:
+            stack = array('H')
+            stack.frombytes(moves)
+            if sorted(stack) != list(compact._moves):
+                raise ValueError("thứ tự nước đi không khớp các ô đã đánh")
+            compact._moves = stack
+        return compact
+
+    def __eq__(self, other: object) -> bool:
+        # So nội dung các ô (cùng cấu hình), không so thứ tự nước đi
+        if not isinstance(other, CompactBoard):
+            return NotImplemented
+        return self._geometry is other._geometry and self._cells == other._cells
+
+    # CompactBoard thay đổi được (make_move / restore...) nên không hash được;
+    # cần làm key thì dùng encode()
+    __hash__ = None  # type: ignore[assignment]
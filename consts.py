@@ -4,13 +4,14 @@ consts.py - Chứa toàn bộ hằng số cho game Caro (Gomoku).
 Bao gồm: Kích thước bàn cờ, màu sắc GUI, độ sâu AI, và trọng số heuristic.
 """
 
-from typing import Final
+from typing import Final, Optional
 
 # =============================================================================
 # BOARD CONFIGURATION
 # =============================================================================
 BOARD_SIZE: Final[int] = 15          # Kích thước bàn cờ 15x15
 WIN_CONDITION: Final[int] = 5        # Số quân liên tiếp để thắng
+EXACT_WIN: Final[bool] = False       # True: chỉ đúng WIN_CONDITION quân mới thắng (chuỗi dài hơn không tính)
 
 # =============================================================================
 # PLAYER SYMBOLS
@@ -19,11 +20,87 @@ EMPTY: Final[str] = ""               # Ô trống
 HUMAN: Final[str] = "X"              # Ký hiệu người chơi
 AI: Final[str] = "O"                 # Ký hiệu máy
 
+# Mã số của ô trong các dạng biểu diễn gọn (mảng int8/bytearray)
+EMPTY_CODE: Final[int] = 0
+HUMAN_CODE: Final[int] = 1
+AI_CODE: Final[int] = 2
+WALL_CODE: Final[int] = 3            # Ô ngoài biên (mã đường/cửa sổ của patterns.py)
+
 # =============================================================================
 # AI CONFIGURATION
 # =============================================================================
 AI_DEPTH: Final[int] = 2             # Độ sâu tìm kiếm (2-3 cho bàn 15x15)
+MAX_SEARCH_DEPTH: Final[int] = 64    # Giới hạn độ sâu khi tìm theo thời gian
+TIME_CHECK_INTERVAL: Final[int] = 64   # Kiểm tra deadline sau mỗi N node
+BEAM_WIDTH: Final[Optional[int]] = None  # Giữ tối đa K nước mỗi ply (None = không cắt)
+PARALLEL_WORKERS: Final[int] = 4     # Số worker process mặc định của ParallelAIEngine
+PONDER_REPLIES: Final[int] = 3       # Số nước trả lời của người chơi được tìm trước khi ponder
+SEARCH_ALGORITHM: Final[str] = "alphabeta"  # "alphabeta" (minimax) hoặc "pvs" (negamax PVS)
+ASPIRATION_WINDOW: Final[int] = 100_000     # Nửa độ rộng cửa sổ aspiration ở gốc (PVS), cỡ một ba mở
+
+# =============================================================================
+# OPENING BOOK
+# =============================================================================
+OPENING_BOOK_PATH: Final[str] = "opening_book.bin"  # Tương đối: tính từ thư mục mã nguồn
+BOOK_MAX_PLIES: Final[int] = 10      # Chỉ tra sách trong BOOK_MAX_PLIES nước đầu
+GAME_RECORD_PATH: Final[Optional[str]] = "games.cgr"  # File ván cờ của GUI (None = không ghi), xem records.py
+
+# =============================================================================
+# THREAT-SPACE SEARCH (VCF / VCT)
+# =============================================================================
+THREAT_SEARCH: Final[bool] = True            # Chạy ThreatSolver trước minimax
+THREAT_MAX_NODES: Final[int] = 5_000         # Giới hạn node mỗi lần solve
+THREAT_TIME_LIMIT: Final[Optional[float]] = 0.1  # Giới hạn thời gian (giây) mỗi lần solve
+THREAT_TIME_SHARE: Final[float] = 0.25       # Tìm có giới hạn thời gian: phần tối đa của thời gian còn lại cho solver
+THREAT_MAX_DEPTH: Final[int] = 8             # Số nước tấn công tối đa (8 nước ~ 15 ply)
+PATTERN_RADIUS: Final[int] = 4               # Cửa sổ bảng hình cờ: 2 * PATTERN_RADIUS + 1 ô
+PATTERN_CACHE_PATH: Final[Optional[str]] = "pattern_tables_{win_length}.bin"  # Bảng đã dựng (None = tắt), tính từ thư mục mã nguồn
+
+# =============================================================================
+# MONTE CARLO TREE SEARCH
+# =============================================================================
+MCTS_TIME_LIMIT: Final[float] = 1.0          # Thời gian tìm mặc định mỗi nước (giây)
+MCTS_MAX_NODES: Final[int] = 200_000         # Sức chứa pool nút (~25 byte mỗi nút)
+MCTS_MAX_CHILDREN: Final[int] = 10           # Số nước ứng viên tối đa khi mở rộng một nút
+MCTS_EXPLORATION: Final[float] = 0.5         # Hằng số khám phá của UCT
+MCTS_EXPAND_VISITS: Final[int] = 2           # Mở rộng nút lá sau N lần thăm
+MCTS_ROLLOUT_DEPTH: Final[int] = 4           # Số nước tối đa mỗi lần mô phỏng
+MCTS_ROLLOUT_SAMPLES: Final[int] = 6         # Số ô ngẫu nhiên được xét mỗi nước mô phỏng
+MCTS_REPORT_INTERVAL: Final[float] = 0.25    # Chu kỳ gọi on_iteration (giây)
+
+# =============================================================================
+# HEADLESS ENGINE (GOMOCUP PROTOCOL / TCP SERVER)
+# =============================================================================
+ENGINE_NAME: Final[str] = "caro-minimax"
+ENGINE_VERSION: Final[str] = "1.0"
+PROTOCOL_TIME_SHARE: Final[float] = 0.8      # Phần thời gian của lượt được dùng để tìm (chừa độ trễ)
+PROTOCOL_MOVES_LEFT: Final[int] = 20         # Ước lượng số nước còn lại khi chia time_left
+PROTOCOL_MIN_MOVE_TIME: Final[float] = 0.05  # Thời gian tìm tối thiểu mỗi nước (giây)
+SERVER_HOST: Final[str] = "127.0.0.1"
+SERVER_PORT: Final[int] = 7878
+SERVER_MAX_PENDING: Final[int] = 32          # Số yêu cầu tìm đang chờ/chạy tối đa; vượt thì trả lỗi bận
+SERVER_TIME_LIMIT: Final[float] = 10.0       # Giới hạn thời gian mỗi yêu cầu (giây), tính cả lúc xếp hàng
+STARTUP_IMPORT_BUDGET: Final[float] = 0.05   # Ngân sách import engine của process mới (giây), xem benchmark.py --startup
+STARTUP_FIRST_MOVE_BUDGET: Final[float] = 0.1  # Ngân sách nước đi đầu tiên của process mới (giây)
+
+# =============================================================================
+# INSTRUMENTATION
+# =============================================================================
+STATS_ENV_VAR: Final[str] = "CARO_STATS"      # =1: bật thống kê chi tiết mặc định
+PROFILE_ENV_VAR: Final[str] = "CARO_PROFILE"  # =<file>: chạy search dưới cProfile
 NEIGHBOR_RADIUS: Final[int] = 2      # Bán kính neighbor limiting
+BOARD_BACKEND: Final[str] = "list"   # Backend bàn cờ khi tìm kiếm: "list" hoặc "bitboard"
+LINE_SCORE_CACHE_SIZE: Final[int] = 1 << 20  # Số mã đường tối đa nhớ điểm (LineScoreTable, mỗi geometry)
+
+# =============================================================================
+# TRANSPOSITION TABLE
+# =============================================================================
+TT_SIZE: Final[int] = 1 << 18        # Số slot của transposition table
+TT_REPLACEMENT: Final[str] = "depth" # "depth" (ưu tiên độ sâu) hoặc "always"
+ZOBRIST_SEED: Final[int] = 0x5A0B21  # Seed cố định cho bảng khóa Zobrist
+PERSISTENT_CACHE_PATH: Final[Optional[str]] = None  # File cache dùng chung giữa các process (None = tắt)
+PERSISTENT_CACHE_SLOTS: Final[int] = 1 << 20        # Số slot của file cache (24 byte mỗi slot)
+PERSISTENT_CACHE_MIN_DEPTH: Final[int] = 2          # Chỉ tra/ghi cache ở node còn ít nhất N ply
 
 # =============================================================================
 # GUI CONFIGURATION
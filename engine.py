@@ -0,0 +1,44 @@
+"""
+engine.py - Entry point engine không giao diện, khởi động nhanh.
+
+Chỉ import board / ai / protocol, không bao giờ import tkinter hay gui.py,
+dành cho các process sống ngắn (engine Gomocup do piskvork gọi, mỗi yêu
+cầu một process...). Không bảng lớn nào được dựng lúc import: Geometry
+dựng ở Board đầu tiên, bảng hình cờ đọc từ file cache (patterns.py).
+
+    python -m engine                            # Gomocup qua stdin/stdout
+    python -m engine --depth 3 --algorithm pvs
+    python -m engine --warm                     # ghi sẵn file cache bảng hình rồi thoát
+
+Đo thời gian khởi động: python benchmark.py --startup
+"""
+
+import sys
+from consts import AI_DEPTH, SEARCH_ALGORITHM
+
+
+def warm_up() -> None:
+    """Dựng Geometry và bảng hình của cấu hình mặc định (ghi file cache nếu chưa có)."""
+    from board import Board
+    from threats import shape_tables
+    shape_tables(Board().geometry)
+
+
+def main() -> None:
+    import argparse
+    parser = argparse.ArgumentParser(description="Engine Caro không giao diện (Gomocup qua stdin/stdout)")
+    parser.add_argument("--depth", type=int, default=AI_DEPTH,
+                        help="độ sâu tìm khi chưa có INFO thời gian")
+    parser.add_argument("--algorithm", choices=("alphabeta", "pvs"), default=SEARCH_ALGORITHM)
+    parser.add_argument("--warm", action="store_true", help="ghi sẵn file cache bảng hình rồi thoát")
+    args = parser.parse_args()
+
+    if args.warm:
+        warm_up()
+        return
+    from protocol import run_stdio
+    run_stdio(sys.stdin, sys.stdout, depth=args.depth, algorithm=args.algorithm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+evaluator.py - Điểm heuristic của bàn cờ theo từng đường.
+
+Điểm heuristic của một người chơi là tổng điểm hình cờ trên mọi đường
+(hàng, cột, 2 đường chéo). Ngoài chuỗi quân liên tiếp (pattern_score),
+hai chuỗi cùng màu cách nhau đúng một ô trống được chấm như một hình
+gián đoạn: ba X_XX và bốn XX_XX / X_XXX (score_cells).
+
+Điểm của một đường chỉ phụ thuộc mã base-4 của nó (Board.line_codes) nên
+được chấm một lần cho mỗi mã rồi nhớ lại trong LineScoreTable, dùng chung
+cho mọi Board/BitBoard cùng Geometry. Mỗi nước đi đổi mã của 4 đường, nên
+cập nhật tổng điểm chỉ còn 4 lần tra dict; tổng được đọc ra với chi phí O(1).
+
+Bảng tra theo cửa sổ 9 ô (patterns.py) không đủ cho việc chấm điểm: một
+hình gián đoạn trải trên nhiều cửa sổ và luật chính xác cần nhìn quá bán
+kính cửa sổ, nên không thể gán mỗi hình cho đúng một cửa sổ. Khóa theo mã
+của cả đường thì mỗi hình được đếm đúng một lần.
+"""
+
+from typing import TYPE_CHECKING, Sequence
+from consts import (
+    WIN_CONDITION, EXACT_WIN, EMPTY, HUMAN, AI, EMPTY_CODE, HUMAN_CODE, AI_CODE, WALL_CODE,
+    PATTERN_RADIUS, LINE_SCORE_CACHE_SIZE,
+    SCORE_FIVE, SCORE_OPEN_FOUR, SCORE_CLOSED_FOUR,
+    SCORE_OPEN_THREE, SCORE_CLOSED_THREE,
+    SCORE_OPEN_TWO, SCORE_CLOSED_TWO, SCORE_ONE
+)
+
+if TYPE_CHECKING:
+    from geometry import Geometry
+
+# Điểm của một đường được gói thành một số nguyên: HUMAN ở các bit cao, AI ở
+# SCORE_SHIFT bit thấp (tổng điểm mọi đường của một bên luôn < 2 ** SCORE_SHIFT)
+SCORE_SHIFT = 40
+SCORE_MASK = (1 << SCORE_SHIFT) - 1
+
+_CODES = {EMPTY: EMPTY_CODE, HUMAN: HUMAN_CODE, AI: AI_CODE}
+
+
+def pattern_score(count: int, open_ends: int, win_length: int = WIN_CONDITION,
+                  exact: bool = EXACT_WIN) -> int:
+    """
+    Điểm của một chuỗi quân liên tiếp.
+
+    Args:
+        count: Số quân liên tiếp
+        open_ends: Số đầu trống (0, 1 hoặc 2)
+        win_length: Số quân liên tiếp để thắng
+        exact: Luật chỉ đúng win_length quân mới thắng (chuỗi dài hơn không có giá trị)
+
+    Returns:
+        Điểm theo các hằng số SCORE_*; bốn/ba/hai tính theo số quân còn thiếu
+        để thắng nên dùng được cho mọi win_length
+    """
+    if count == win_length or (count > win_length and not exact): return SCORE_FIVE
+    if open_ends == 0 or count > win_length: return 0
+    missing = win_length - count
+    if missing == 1: return SCORE_OPEN_FOUR if open_ends == 2 else SCORE_CLOSED_FOUR
+    if missing == 2: return SCORE_OPEN_THREE if open_ends == 2 else SCORE_CLOSED_THREE
+    if missing == 3: return SCORE_OPEN_TWO if open_ends == 2 else SCORE_CLOSED_TWO
+    if count >= 1: return SCORE_ONE if open_ends == 2 else SCORE_ONE // 2
+    return 0
+
+
+def _broken_score(count: int, open_ends: int, geometry: 'Geometry') -> int:
+    # Điểm của hai chuỗi cùng màu có tổng `count` quân, cách nhau một ô trống:
+    # lấp ô trống cho chuỗi dài count + 1 (open_ends là hai đầu ngoài cùng)
+    win_length = geometry.win_length
+    if count == win_length - 1 or (count >= win_length and not geometry.exact):
+        return SCORE_CLOSED_FOUR  # Đúng một ô thắng: ô trống ở giữa
+    if count == win_length - 2:
+        return geometry.pattern_scores[count][open_ends]
+    return 0
+
+
+def score_cells(cells: Sequence[int], geometry: 'Geometry') -> tuple[int, int]:
+    """
+    Chấm điểm một đường cho cả hai người chơi.
+
+    Mỗi chuỗi liên tiếp được chấm theo pattern_score. Hai chuỗi cùng màu
+    liền kề cách nhau đúng một ô trống được chấm như một hình gián đoạn
+    (ba X_XX, bốn XX_XX) nếu điểm đó lớn hơn tổng điểm hai chuỗi; xét từ
+    đầu đường, mỗi chuỗi thuộc tối đa một hình gián đoạn.
+
+    Args:
+        cells: Mã các ô của đường (EMPTY_CODE / HUMAN_CODE / AI_CODE), không gồm ô biên
+        geometry: Luật thắng và bảng Geometry.pattern_scores
+
+    Returns:
+        (điểm của HUMAN, điểm của AI)
+    """
+    scores = geometry.pattern_scores
+    length = len(cells)
+    runs = []
+    k = 0
+    while k < length:
+        code = cells[k]
+        if code == EMPTY_CODE:
+            k += 1
+            continue
+        end = k + 1
+        while end < length and cells[end] == code:
+            end += 1
+        runs.append((code, k, end))
+        k = end
+    totals = [0, 0, 0]
+    i = 0
+    while i < len(runs):
+        code, start, end = runs[i]
+        open_before = start > 0 and cells[start - 1] == EMPTY_CODE
+        open_after = end < length and cells[end] == EMPTY_CODE
+        score = scores[end - start][open_before + open_after]
+        if i + 1 < len(runs):
+            next_code, next_start, next_end = runs[i + 1]
+            if next_code == code and next_start == end + 1:
+                next_open = next_end < length and cells[next_end] == EMPTY_CODE
+                joined = _broken_score(end - start + next_end - next_start, open_before + next_open, geometry)
+                if joined > score + scores[next_end - next_start][1 + next_open]:
+                    totals[code] += joined
+                    i += 2
+                    continue
+        totals[code] += score
+        i += 1
+    return totals[HUMAN_CODE], totals[AI_CODE]
+
+
+def score_line_code(code: int, geometry: 'Geometry') -> tuple[int, int]:
+    """
+    Như score_cells nhưng đọc mã base-4 của đường: các ô nằm giữa
+    PATTERN_RADIUS ô biên đệm ở hai đầu (xem Geometry.empty_line_codes).
+
+    Returns:
+        (điểm của HUMAN, điểm của AI)
+    """
+    cells = []
+    code >>= 2 * PATTERN_RADIUS
+    while code & 3 != WALL_CODE:
+        cells.append(code & 3)
+        code >>= 2
+    return score_cells(cells, geometry)
+
+
+def score_grid(grid: list[list[str]], geometry: 'Geometry') -> tuple[int, int]:
+    """
+    Chấm lại toàn bộ bàn cờ từ grid (bản đối chiếu, không dùng mã đường).
+
+    Returns:
+        (điểm của HUMAN, điểm của AI)
+    """
+    human_total = ai_total = 0
+    for cells in geometry.lines:
+        human_score, ai_score = score_cells([_CODES[grid[r][c]] for r, c in cells], geometry)
+        human_total += human_score
+        ai_total += ai_score
+    return human_total, ai_total
+
+
+class LineScoreTable:
+    """
+    Điểm đã gói (HUMAN << SCORE_SHIFT | AI) của mỗi mã đường đã gặp.
+
+    Người gọi tra thẳng `known` trong vòng lặp nóng và chỉ gọi packed()
+    khi mã chưa có; bộ nhớ được xóa khi vượt LINE_SCORE_CACHE_SIZE mã.
+
+    Attributes:
+        known: Mã đường -> điểm đã gói
+        _geometry: Luật thắng và bảng điểm pattern
+    """
+
+    __slots__ = ('known', '_geometry')
+
+    def __init__(self, geometry: 'Geometry') -> None:
+        self.known: dict[int, int] = {}
+        self._geometry: 'Geometry' = geometry
+
+    def packed(self, code: int) -> int:
+        """Điểm đã gói của đường có mã `code`, chấm bằng score_line_code ở lần gặp đầu tiên."""
+        packed = self.known.get(code)
+        if packed is None:
+            if len(self.known) >= LINE_SCORE_CACHE_SIZE:
+                self.known.clear()
+            human_score, ai_score = score_line_code(code, self._geometry)
+            packed = self.known[code] = (human_score << SCORE_SHIFT) | ai_score
+        return packed
+
+
+_LINE_TABLES: dict['Geometry', LineScoreTable] = {}
+
+
+def line_score_table(geometry: 'Geometry') -> LineScoreTable:
+    """LineScoreTable của geometry, dựng ở lần gọi đầu tiên."""
+    table = _LINE_TABLES.get(geometry)
+    if table is None:
+        table = _LINE_TABLES[geometry] = LineScoreTable(geometry)
+    return table
@@ -0,0 +1,251 @@
+"""
+geometry.py - Bảng tra cứu dùng chung theo kích thước bàn cờ và luật thắng.
+
+Kích thước bàn cờ và luật thắng là tham số của từng Board (mặc định
+BOARD_SIZE, WIN_CONDITION, luật tự do). Mọi bảng phụ thuộc vào chúng được
+dựng một lần cho mỗi bộ (size, win_length, exact) rồi dùng chung giữa các
+Board cùng cấu hình:
+    - tuple (row, col) dùng chung, khóa Zobrist, vùng lân cận của mỗi ô
+    - 8 phép đối xứng của bàn cờ
+    - các đường (hàng, cột, chéo) của evaluator và bảng điểm pattern
+    - mã base-4 của từng đường và vị trí cửa sổ 9 ô của mỗi ô (patterns.py)
+    - tia/đoạn quanh mỗi ô cho nhận diện hình cờ (threats.py)
+    - thứ tự gần tâm của các ô (sắp xếp nước đi của AIEngine)
+
+get_geometry() trả về cùng một object cho cùng cấu hình nên so sánh được
+bằng `is`. Các bảng chỉ chứa ô lân cận, đường và cửa sổ đi qua từng ô, nên
+chi phí mỗi nước đi không tăng theo diện tích bàn cờ. Không có Geometry nào
+được dựng lúc import (kể cả cấu hình mặc định): chi phí rơi vào Board đầu
+tiên, không vào mọi process chỉ import module.
+"""
+
+import random
+from consts import (
+    BOARD_SIZE, WIN_CONDITION, EXACT_WIN, HUMAN, AI, DIRECTIONS,
+    NEIGHBOR_RADIUS, ZOBRIST_SEED, HUMAN_CODE, AI_CODE, WALL_CODE, PATTERN_RADIUS
+)
+from evaluator import pattern_score
+
+# 8 phép đối xứng của bàn cờ vuông (4 phép xoay, 4 phép lật); phép 0 là đồng nhất
+SYMMETRY_COUNT: int = 8
+
+Cell = tuple[int, int]
+
+
+class Geometry:
+    """
+    Các bảng tra cứu của một cấu hình bàn cờ (chỉ đọc, dùng chung).
+
+    Attributes:
+        size: Kích thước bàn cờ (size x size)
+        win_length: Số quân liên tiếp để thắng
+        exact: True nếu chỉ đúng win_length quân mới thắng (quá dài không tính)
+        cells: cells[row][col] là tuple (row, col) dùng chung
+        zobrist: Khóa Zobrist 64-bit cho từng (người chơi, ô)
+        neighbors: Các ô trong bán kính NEIGHBOR_RADIUS quanh mỗi ô
+        symmetry_cells / symmetry_inverse: Ảnh của ô qua từng phép đối xứng
+            và phép đối xứng ngược
+        lines: Các đường theo 4 hướng (danh sách ô theo thứ tự hướng đi)
+        cell_lines: Với mỗi ô, 4 cặp (ô của đường đi qua nó, vị trí của ô trong đường)
+        pattern_scores: pattern_scores[count][open_ends] theo luật thắng
+        empty_line_codes: Mã của các đường khi bàn trống (chỉ có ô biên đệm
+            PATTERN_RADIUS ô ở hai đầu), cùng thứ tự với lines
+        line_deltas: line_deltas[player][row][col] là các cặp (đường, giá trị
+            cộng vào mã đường) khi player đánh vào ô
+        window_slots: Với mỗi ô, 4 cặp (đường, shift) theo thứ tự DIRECTIONS:
+            (mã đường >> shift) là cửa sổ 9 ô có ô đó ở giữa
+        rays: Với mỗi ô và hướng, các ô theo chiều thuận/nghịch trong tầm
+            với của một chuỗi thắng
+        segments: Với mỗi ô và hướng, đoạn ±win_length ô và vị trí ô gốc
+        center_rank: Thứ hạng gần tâm của mỗi ô (khoảng cách Manhattan, rồi (row, col))
+        ranked_cells: Các ô theo thứ hạng gần tâm (ranked_cells[center_rank[cell]] == cell)
+    """
+
+    __slots__ = ('size', 'win_length', 'exact', 'cells', 'zobrist', 'neighbors',
+                 'symmetry_cells', 'symmetry_inverse', 'lines', 'cell_lines',
+                 'pattern_scores', 'empty_line_codes', 'line_deltas', 'window_slots',
+                 'rays', 'segments', 'center_rank', 'ranked_cells')
+
+    def __init__(self, size: int, win_length: int, exact: bool) -> None:
+        self.size: int = size
+        self.win_length: int = win_length
+        self.exact: bool = exact
+        self.cells: list[list[Cell]] = [[(row, col) for col in range(size)] for row in range(size)]
+        self.zobrist: dict[str, list[list[int]]] = self._build_zobrist()
+        self.neighbors: list[list[list[Cell]]] = self._build_neighbors(NEIGHBOR_RADIUS)
+        self.symmetry_cells, self.symmetry_inverse = self._build_symmetries()
+        self.lines, self.cell_lines = self._build_lines()
+        self.pattern_scores: list[list[int]] = [
+            [pattern_score(count, open_ends, win_length, exact) for open_ends in range(3)]
+            for count in range(size + 1)
+        ]
+        self.empty_line_codes, self.line_deltas, self.window_slots = self._build_line_codes()
+        # Luật chính xác cần nhìn thêm một ô để phân biệt đúng win_length với chuỗi quá dài
+        self.rays: list[list[list[tuple[list[Cell], list[Cell]]]]] = self._build_rays(
+            win_length if exact else win_length - 1
+        )
+        self.segments: list[list[list[tuple[list[Cell], int]]]] = self._build_segments()
+        center = size // 2
+        self.ranked_cells: list[Cell] = sorted(
+            (cell for row in self.cells for cell in row),
+            key=lambda p: (abs(p[0] - center) + abs(p[1] - center), p)
+        )
+        self.center_rank: dict[Cell, int] = {cell: rank for rank, cell in enumerate(self.ranked_cells)}
+
+    def __repr__(self) -> str:
+        rule = "exact" if self.exact else "freestyle"
+        return f"Geometry(size={self.size}, win_length={self.win_length}, {rule})"
+
+    def on_board(self, row: int, col: int) -> bool:
+        return 0 <= row < self.size and 0 <= col < self.size
+
+    def _build_zobrist(self) -> dict[str, list[list[int]]]:
+        # Seed cố định để mọi process sinh cùng một bảng khóa
+        rng = random.Random(ZOBRIST_SEED)
+        return {
+            player: [[rng.getrandbits(64) for _ in range(self.size)] for _ in range(self.size)]
+            for player in (HUMAN, AI)
+        }
+
+    def _build_neighbors(self, radius: int) -> list[list[list[Cell]]]:
+        # Các ô trong vùng vuông bán kính `radius` quanh mỗi ô (không gồm chính nó)
+        return [
+            [
+                [
+                    self.cells[row + dr][col + dc]
+                    for dr in range(-radius, radius + 1)
+                    for dc in range(-radius, radius + 1)
+                    if (dr or dc) and self.on_board(row + dr, col + dc)
+                ]
+                for col in range(self.size)
+            ]
+            for row in range(self.size)
+        ]
+
+    def _build_symmetries(self) -> tuple[list[list[list[Cell]]], list[int]]:
+        last = self.size - 1
+        maps = (
+            lambda r, c: (r, c),
+            lambda r, c: (c, last - r),
+            lambda r, c: (last - r, last - c),
+            lambda r, c: (last - c, r),
+            lambda r, c: (r, last - c),
+            lambda r, c: (last - r, c),
+            lambda r, c: (c, r),
+            lambda r, c: (last - c, last - r),
+        )
+        size = self.size
+        cells = [
+            [[self.cells[m(r, c)[0]][m(r, c)[1]] for c in range(size)] for r in range(size)]
+            for m in maps
+        ]
+        inverse = [
+            next(t for t in range(SYMMETRY_COUNT)
+                 if all(cells[t][cells[s][r][c][0]][cells[s][r][c][1]] == (r, c)
+                        for r in range(size) for c in range(size)))
+            for s in range(SYMMETRY_COUNT)
+        ]
+        return cells, inverse
+
+    def _build_lines(self) -> tuple[list[list[Cell]], list[list[list[tuple[list[Cell], int]]]]]:
+        lines: list[list[Cell]] = []
+        cell_lines: list[list[list[tuple[list[Cell], int]]]] = [
+            [[] for _ in range(self.size)] for _ in range(self.size)
+        ]
+        for dr, dc in DIRECTIONS:
+            for row in range(self.size):
+                for col in range(self.size):
+                    # Chỉ bắt đầu đường tại ô không có ô liền trước theo hướng (dr, dc)
+                    if self.on_board(row - dr, col - dc):
+                        continue
+                    cells = []
+                    r, c = row, col
+                    while self.on_board(r, c):
+                        cell_lines[r][c].append((cells, len(cells)))
+                        cells.append(self.cells[r][c])
+                        r += dr
+                        c += dc
+                    lines.append(cells)
+        return lines, cell_lines
+
+    def _build_line_codes(self) -> tuple[list[int], dict[str, list[list[list[tuple[int, int]]]]],
+                                         list[list[list[tuple[int, int]]]]]:
+        pad = PATTERN_RADIUS
+        empty_codes = []
+        window_slots: list[list[list[tuple[int, int]]]] = [
+            [[] for _ in range(self.size)] for _ in range(self.size)
+        ]
+        for line, cells in enumerate(self.lines):
+            walls = 0
+            for k in list(range(pad)) + list(range(len(cells) + pad, len(cells) + 2 * pad)):
+                walls |= WALL_CODE << (2 * k)
+            empty_codes.append(walls)
+            # Ô thứ index nằm ở vị trí index + pad của đường đã đệm; cửa sổ bắt đầu từ index
+            for index, (row, col) in enumerate(cells):
+                window_slots[row][col].append((line, 2 * index))
+        line_deltas = {
+            player: [
+                [[(line, code << (shift + 2 * pad)) for line, shift in slots] for slots in row_slots]
+                for row_slots in window_slots
+            ]
+            for player, code in ((HUMAN, HUMAN_CODE), (AI, AI_CODE))
+        }
+        return empty_codes, line_deltas, window_slots
+
+    def _build_rays(self, reach: int) -> list[list[list[tuple[list[Cell], list[Cell]]]]]:
+        return [
+            [
+                [
+                    (
+                        [self.cells[row + k * dr][col + k * dc] for k in range(1, reach + 1)
+                         if self.on_board(row + k * dr, col + k * dc)],
+                        [self.cells[row - k * dr][col - k * dc] for k in range(1, reach + 1)
+                         if self.on_board(row - k * dr, col - k * dc)],
+                    )
+                    for dr, dc in DIRECTIONS
+                ]
+                for col in range(self.size)
+            ]
+            for row in range(self.size)
+        ]
+
+    def _build_segments(self) -> list[list[list[tuple[list[Cell], int]]]]:
+        reach = self.win_length
+        segments = []
+        for row in range(self.size):
+            row_segments = []
+            for col in range(self.size):
+                cell_segments = []
+                for dr, dc in DIRECTIONS:
+                    cells = []
+                    center = 0
+                    for k in range(-reach, reach + 1):
+                        r, c = row + k * dr, col + k * dc
+                        if self.on_board(r, c):
+                            if k == 0:
+                                center = len(cells)
+                            cells.append(self.cells[r][c])
+                    cell_segments.append((cells, center))
+                row_segments.append(cell_segments)
+            segments.append(row_segments)
+        return segments
+
+
+_GEOMETRIES: dict[tuple[int, int, bool], Geometry] = {}
+
+
+def get_geometry(size: int = BOARD_SIZE, win_length: int = WIN_CONDITION,
+                 exact: bool = EXACT_WIN) -> Geometry:
+    """
+    Geometry của cấu hình (size, win_length, exact), dựng ở lần gọi đầu tiên.
+
+    Raises:
+        ValueError: Nếu cấu hình không hợp lệ
+    """
+    key = (size, win_length, bool(exact))
+    geometry = _GEOMETRIES.get(key)
+    if geometry is None:
+        if not 3 <= win_length <= size:
+            raise ValueError(f"cần 3 <= win_length <= size, nhận size={size}, win_length={win_length}")
+        geometry = _GEOMETRIES[key] = Geometry(*key)
+    return geometry
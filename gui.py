@@ -2,25 +2,48 @@
 gui.py - Giao diện đồ họa game Caro (Style: Hand drawn on Paper).
 """
 
+import os
+import queue
+import threading
 import tkinter as tk
 from tkinter import messagebox
+from typing import Optional
 from consts import (
-    BOARD_SIZE, CELL_SIZE, PADDING, LINE_WIDTH, PIECE_RADIUS, FONT_STYLE_PIECE,
+    CELL_SIZE, PADDING, LINE_WIDTH, PIECE_RADIUS, FONT_STYLE_PIECE,
     COLOR_BACKGROUND, COLOR_LINE, COLOR_HUMAN, COLOR_AI, COLOR_HIGHLIGHT,
-    COLOR_BUTTON_BG, COLOR_BUTTON_FG, EMPTY, HUMAN, AI
+    COLOR_BUTTON_BG, COLOR_BUTTON_FG, EMPTY, HUMAN, AI, GAME_RECORD_PATH
 )
 from board import Board
-from ai import AIEngine
+from ai import AIEngine, SearchResult
+from records import GameRecord, MoveStats, append_record
+
+# Chu kỳ (ms) lấy kết quả tìm kiếm từ thread nền về vòng lặp Tk
+SEARCH_POLL_MS = 30
 
 class CaroGUI:
-    def __init__(self, board: Board, ai_engine: AIEngine, human_first: bool = True) -> None:
+    def __init__(self, board: Board, ai_engine: AIEngine, human_first: bool = True,
+                 ponder: bool = True, record_path: Optional[str] = GAME_RECORD_PATH) -> None:
         self._board = board
         self._ai_engine = ai_engine
         self._human_first = human_first
+        self._ponder = ponder
         self._is_game_over = False
         self._is_ai_thinking = False
         self._current_player = HUMAN if human_first else AI
-        self._canvas_size = BOARD_SIZE * CELL_SIZE + 2 * PADDING
+        # Tìm kiếm chạy trong thread nền; kết quả gửi về qua queue kèm mã lượt tìm,
+        # kết quả của lượt đã hủy (mã cũ) bị bỏ qua
+        self._search_thread: Optional[threading.Thread] = None
+        self._search_stop: Optional[threading.Event] = None
+        self._search_id = 0
+        self._search_queue: queue.Queue = queue.Queue()
+        self._canvas_size = board.size * CELL_SIZE + 2 * PADDING
+        # Mỗi ván được ghi vào file ván cờ (records.py) khi kết thúc, khi chơi lại
+        # hoặc khi đóng cửa sổ; _move_stats song song với board.history
+        if record_path is not None and not os.path.isabs(record_path):
+            record_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), record_path)
+        self._record_path = record_path
+        self._record_saved = False
+        self._move_stats: list[Optional[MoveStats]] = []
         
         self._root = tk.Tk()
         self._root.title("Cờ Caro (Gomoku) - Paper Style")
@@ -49,13 +72,16 @@ class CaroGUI:
         
         tk.Button(control_frame, text="Chơi lại", command=self._reset_game,
                  bg=COLOR_BUTTON_BG, fg=COLOR_BUTTON_FG).pack(side=tk.RIGHT, padx=10)
+        tk.Button(control_frame, text="Đi lại", command=self._undo_move,
+                 bg=COLOR_BUTTON_BG, fg=COLOR_BUTTON_FG).pack(side=tk.RIGHT)
                  
     def _draw_grid(self):
-        for i in range(BOARD_SIZE + 1):
+        size = self._board.size
+        for i in range(size + 1):
             # Lines go from edge to edge of the grid area
             # Adjusted to ensure full grid enclose
             start = PADDING
-            end = PADDING + BOARD_SIZE * CELL_SIZE
+            end = PADDING + size * CELL_SIZE
             pos = PADDING + i * CELL_SIZE
             
             # Horizontal
@@ -69,7 +95,9 @@ class CaroGUI:
         col = (event.x - PADDING) // CELL_SIZE
         row = (event.y - PADDING) // CELL_SIZE
         
-        if 0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE and self._board.is_valid_move(row, col):
+        if self._board.is_valid_move(row, col):
+            # Dừng ponder; nếu đã tìm sẵn cho nước này thì AI trả lời gần như ngay lập tức
+            self._cancel_search()
             self._make_move(row, col, HUMAN)
             if self._check_game_end(row, col): return
             
@@ -79,19 +107,78 @@ class CaroGUI:
             self._root.after(50, self._ai_move)
 
     def _ai_move(self):
-        if self._is_game_over: return
-        best_move = self._ai_engine.get_best_move(self._board)
+        # Nước của người chơi có thể đã bị hoàn tác trước khi tới lượt AI
+        if self._is_game_over or self._current_player != AI: return
+        # Lượt tìm đã hủy vẫn đang dừng dần: đợi xong để không dùng chung engine
+        if self._search_thread is not None and self._search_thread.is_alive():
+            self._root.after(SEARCH_POLL_MS, self._ai_move)
+            return
+        self._is_ai_thinking = True
+        self._search_id += 1
+        self._search_stop = threading.Event()
+        self._search_thread = threading.Thread(
+            target=self._run_search,
+            args=(self._board.clone(), self._search_id, self._search_stop), daemon=True
+        )
+        self._search_thread.start()
+        self._root.after(SEARCH_POLL_MS, self._poll_search, self._search_id)
+
+    def _run_search(self, board: Board, search_id: int, stop: threading.Event) -> None:
+        # Chạy trong thread nền: không được chạm vào widget Tk ở đây
+        def report(result: SearchResult) -> None:
+            self._search_queue.put(("progress", search_id, result))
+        result = self._ai_engine.search(board, on_iteration=report, stop_event=stop)
+        self._search_queue.put(("done", search_id, result))
+
+    def _poll_search(self, search_id):
+        if search_id != self._search_id: return
+        done = None
+        while True:
+            try:
+                kind, result_id, result = self._search_queue.get_nowait()
+            except queue.Empty:
+                break
+            if result_id != search_id: continue
+            if kind == "done": done = result
+            else:
+                self._update_status(
+                    f"AI đang suy nghĩ... độ sâu {result.depth}, tốt nhất {result.move}"
+                )
+        if done is not None:
+            self._apply_ai_move(done.move, done)
+        else:
+            self._root.after(SEARCH_POLL_MS, self._poll_search, search_id)
+
+    def _cancel_search(self):
+        # Bỏ qua mọi kết quả của lượt tìm hiện tại và yêu cầu engine dừng sớm
+        self._search_id += 1
+        if self._search_stop is not None:
+            self._search_stop.set()
+
+    def _apply_ai_move(self, best_move, result: Optional[SearchResult] = None):
         if best_move:
             self._make_move(best_move[0], best_move[1], AI)
+            if result is not None:
+                self._move_stats[-1] = (result.depth, result.score, result.nodes, result.elapsed)
             if self._check_game_end(best_move[0], best_move[1]):
                 self._is_ai_thinking = False
                 return
         self._current_player = HUMAN
         self._update_status("Lượt của bạn (X)")
         self._is_ai_thinking = False
+        if self._ponder: self._start_ponder()
+
+    def _start_ponder(self):
+        # Tìm trước trong thread nền trong lúc người chơi suy nghĩ
+        self._search_stop = threading.Event()
+        self._search_thread = threading.Thread(
+            target=self._ai_engine.ponder, args=(self._board.clone(), self._search_stop), daemon=True
+        )
+        self._search_thread.start()
 
     def _make_move(self, row, col, player):
         self._board.make_move(row, col, player)
+        self._move_stats.append(None)
         self._canvas.delete("highlight")
         self._draw_piece(row, col, player)
         self._highlight_last_move(row, col)
@@ -121,20 +208,53 @@ class CaroGUI:
             msg = "Bạn thắng!" if winner == HUMAN else "AI thắng!"
             variable_msg = "Chúc mừng!" if winner == HUMAN else "Cố gắng lần sau!"
             self._update_status(msg)
+            self._save_record()
             messagebox.showinfo("Kết quả", f"{msg} {variable_msg}")
             return True
         if self._board.is_full():
             self._is_game_over = True
             self._update_status("Hòa!")
+            self._save_record()
             messagebox.showinfo("Kết quả", "Ván cờ hòa!")
             return True
         return False
 
+    def _undo_move(self):
+        # Hoàn tác tới hết nước gần nhất của người chơi (kèm nước trả lời của AI nếu có)
+        grid = self._board.grid
+        count = 0
+        for row, col in reversed(self._board.history):
+            count += 1
+            if grid[row][col] == HUMAN: break
+        else: return
+        self._cancel_search()
+        self._board.takeback(count)
+        del self._move_stats[len(self._board.history):]
+        self._record_saved = False
+        self._is_game_over = False
+        self._is_ai_thinking = False
+        self._current_player = HUMAN
+        self._redraw_pieces()
+        self._update_status("Lượt của bạn (X)")
+
+    def _redraw_pieces(self):
+        self._canvas.delete("piece")
+        self._canvas.delete("highlight")
+        grid = self._board.grid
+        for row, col in self._board.history:
+            self._draw_piece(row, col, grid[row][col])
+        if self._board.last_move is not None:
+            self._highlight_last_move(*self._board.last_move)
+
     def _update_status(self, msg):
         self._status_label.config(text=msg)
 
     def _reset_game(self):
+        self._cancel_search()
+        self._save_record()
         self._board.reset()
+        self._move_stats.clear()
+        self._record_saved = False
         self._is_game_over = False
         self._is_ai_thinking = False
         self._current_player = HUMAN if self._human_first else AI
@@ -145,5 +265,15 @@ class CaroGUI:
             self._update_status("AI đang suy nghĩ...")
             self._root.after(100, self._ai_move)
 
+    def _save_record(self):
+        # Mỗi ván chỉ ghi một lần; ván chưa có nước nào thì bỏ qua
+        if self._record_path is None or self._record_saved or not self._board.history: return
+        self._record_saved = True
+        try:
+            append_record(self._record_path, GameRecord.from_board(self._board, self._move_stats))
+        except (OSError, ValueError) as e:
+            print(f"Không ghi được ván cờ vào {self._record_path}: {e}")
+
     def run(self):
         self._root.mainloop()
+        self._save_record()
@@ -0,0 +1,173 @@
+"""
+instrumentation.py - Thống kê tìm kiếm và hook profiling cho AIEngine.
+
+Mỗi lần tìm trả về một SearchStats (SearchResult.stats). Các bộ đếm rẻ
+(node, node/cắt theo ply, TT) luôn có; các bộ đếm chi tiết (lượt đánh giá
+lá, lượt check_winner, kích thước danh sách nước, thời gian đánh giá và
+sinh nước) chỉ có khi bật `instrument` (hoặc biến môi trường CARO_STATS=1).
+
+Khi tắt, AIEngine gọi thẳng các bound method nên vòng lặp nóng không tốn
+thêm gì; khi bật, các hàm đó được thay bằng bản bọc trong file này.
+
+Đặt CARO_PROFILE=<file> để chạy mỗi lần search dưới cProfile và ghi kết
+quả cộng dồn ra file (xem bằng `python -m pstats <file>`).
+"""
+
+import os
+import time
+from typing import Any, Callable, Optional
+from consts import STATS_ENV_VAR, PROFILE_ENV_VAR
+
+
+def stats_enabled() -> bool:
+    """Bật thống kê chi tiết theo biến môi trường CARO_STATS."""
+    return os.environ.get(STATS_ENV_VAR, '') not in ('', '0')
+
+
+class SearchStats:
+    """
+    Thống kê của một lần tìm kiếm.
+
+    Attributes:
+        detailed: True nếu các bộ đếm chi tiết được thu thập
+        nodes: Tổng số node (gồm cả node của ThreatSolver)
+        threat_nodes: Số node của ThreatSolver
+        nodes_per_ply / cutoffs_per_ply: Của vòng lặp sâu dần cuối đã hoàn tất
+        tt: Bộ đếm của transposition table (hits, misses, ...)
+        leaf_evals: Số lần gọi hàm đánh giá
+        check_winner_calls: Số lần kiểm tra thắng
+        candidate_lists / candidate_moves / max_candidates: Số danh sách nước
+            được sinh, tổng và lớn nhất số nước trong đó
+        eval_time / movegen_time: Thời gian (giây) trong hàm đánh giá và
+            trong sinh + sắp xếp nước đi
+        elapsed: Tổng thời gian tìm
+    """
+
+    __slots__ = ('detailed', 'nodes', 'threat_nodes', 'nodes_per_ply', 'cutoffs_per_ply',
+                 'tt', 'leaf_evals', 'check_winner_calls', 'candidate_lists',
+                 'candidate_moves', 'max_candidates', 'eval_time', 'movegen_time', 'elapsed')
+
+    def __init__(self, detailed: bool = False) -> None:
+        self.detailed: bool = detailed
+        self.nodes: int = 0
+        self.threat_nodes: int = 0
+        self.nodes_per_ply: list[int] = []
+        self.cutoffs_per_ply: list[int] = []
+        self.tt: dict[str, int] = {}
+        self.leaf_evals: int = 0
+        self.check_winner_calls: int = 0
+        self.candidate_lists: int = 0
+        self.candidate_moves: int = 0
+        self.max_candidates: int = 0
+        self.eval_time: float = 0.0
+        self.movegen_time: float = 0.0
+        self.elapsed: float = 0.0
+
+    @property
+    def avg_candidates(self) -> float:
+        return self.candidate_moves / self.candidate_lists if self.candidate_lists else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Dạng dict (để ghi JSON)."""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['avg_candidates'] = self.avg_candidates
+        return data
+
+    def __repr__(self) -> str:
+        if not self.detailed:
+            return f"SearchStats(nodes={self.nodes}, elapsed={self.elapsed:.3f}s)"
+        return (f"SearchStats(nodes={self.nodes}, leaf_evals={self.leaf_evals}, "
+                f"check_winner={self.check_winner_calls}, "
+                f"avg_candidates={self.avg_candidates:.1f}, eval={self.eval_time:.3f}s, "
+                f"movegen={self.movegen_time:.3f}s, elapsed={self.elapsed:.3f}s)")
+
+
+def count_check_winner(check_winner: Callable[[int, int], Optional[str]],
+                       stats: SearchStats) -> Callable[[int, int], Optional[str]]:
+    def wrapper(row: int, col: int) -> Optional[str]:
+        stats.check_winner_calls += 1
+        return check_winner(row, col)
+    return wrapper
+
+
+def time_evaluate(evaluate: Callable[[], float], stats: SearchStats) -> Callable[[], float]:
+    def wrapper() -> float:
+        start = time.perf_counter()
+        score = evaluate()
+        stats.eval_time += time.perf_counter() - start
+        stats.leaf_evals += 1
+        return score
+    return wrapper
+
+
+def time_candidates(generate: Callable[[], list[tuple[int, int]]],
+                    stats: SearchStats) -> Callable[[], list[tuple[int, int]]]:
+    def wrapper() -> list[tuple[int, int]]:
+        start = time.perf_counter()
+        moves = generate()
+        stats.movegen_time += time.perf_counter() - start
+        stats.candidate_lists += 1
+        stats.candidate_moves += len(moves)
+        if len(moves) > stats.max_candidates:
+            stats.max_candidates = len(moves)
+        return moves
+    return wrapper
+
+
+def count_candidates(generate: Callable[[], set[tuple[int, int]]],
+                     stats: SearchStats) -> Callable[[], set[tuple[int, int]]]:
+    # Chỉ đếm, không đo thời gian: người gọi (vd _classify_moves) đã được đo bằng time_classify
+    def wrapper() -> set[tuple[int, int]]:
+        moves = generate()
+        stats.candidate_lists += 1
+        stats.candidate_moves += len(moves)
+        if len(moves) > stats.max_candidates:
+            stats.max_candidates = len(moves)
+        return moves
+    return wrapper
+
+
+def time_classify(classify: Callable[..., Optional[tuple[int, int]]],
+                  stats: SearchStats) -> Callable[..., Optional[tuple[int, int]]]:
+    def wrapper(*args: Any) -> Optional[tuple[int, int]]:
+        start = time.perf_counter()
+        win = classify(*args)
+        stats.movegen_time += time.perf_counter() - start
+        return win
+    return wrapper
+
+
+def time_ordering(order: Callable[..., list[tuple[int, int]]],
+                  stats: SearchStats) -> Callable[..., list[tuple[int, int]]]:
+    def wrapper(*args: Any) -> list[tuple[int, int]]:
+        start = time.perf_counter()
+        moves = order(*args)
+        stats.movegen_time += time.perf_counter() - start
+        return moves
+    return wrapper
+
+
+class SearchProfiler:
+    """cProfile cộng dồn qua mọi lần search, ghi ra file sau mỗi lần."""
+
+    __slots__ = ('_path', '_profile')
+
+    def __init__(self, path: str) -> None:
+        # cProfile (kéo theo argparse...) chỉ được import khi thật sự profile
+        import cProfile
+        self._path: str = path
+        self._profile: 'cProfile.Profile' = cProfile.Profile()
+
+    @classmethod
+    def from_env(cls) -> Optional['SearchProfiler']:
+        """SearchProfiler nếu CARO_PROFILE được đặt, ngược lại None."""
+        path = os.environ.get(PROFILE_ENV_VAR)
+        return cls(path) if path else None
+
+    def __enter__(self) -> 'SearchProfiler':
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._profile.disable()
+        self._profile.dump_stats(self._path)
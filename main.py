@@ -1,24 +1,77 @@
 """
 main.py - Entry point.
+
+    python main.py                      # Giao diện Tk
+    python main.py --engine mcts        # Dùng MCTSEngine thay cho minimax (GUI, --protocol)
+    python main.py --algorithm pvs      # Minimax bằng negamax PVS (xem ai.py)
+    python main.py --protocol           # Engine Gomocup qua stdin/stdout (không cần tkinter)
+    python main.py --serve [--port N]   # Server TCP nhiều ván (xem server.py)
+
+Process engine sống ngắn nên dùng `python -m engine` (engine.py): chỉ import
+phần engine, khởi động nhanh hơn.
 """
-from board import Board
-from ai import AIEngine
-from gui import CaroGUI
-from consts import AI_DEPTH
+import argparse
+from consts import AI_DEPTH, SEARCH_ALGORITHM, MCTS_TIME_LIMIT, PARALLEL_WORKERS, SERVER_HOST, SERVER_PORT, SERVER_MAX_PENDING, SERVER_TIME_LIMIT
+
+
+def make_engine(kind: str, depth: int, time_limit: float, algorithm: str = SEARCH_ALGORITHM):
+    if kind == "mcts":
+        from mcts import MCTSEngine
+        return MCTSEngine(time_limit=time_limit)
+    from ai import AIEngine
+    return AIEngine(depth=depth, algorithm=algorithm)
+
+
+def run_gui(kind: str, depth: int, time_limit: float, algorithm: str = SEARCH_ALGORITHM) -> None:
+    # tkinter chỉ được import khi thật sự mở giao diện
+    from board import Board
+    from gui import CaroGUI
 
-def main() -> None:
     board = Board()
-    ai_engine = AIEngine(depth=AI_DEPTH)
-    gui = CaroGUI(board=board, ai_engine=ai_engine, human_first=True)
-    
+    ai_engine = make_engine(kind, depth, time_limit, algorithm)
+    # MCTSEngine không có ponder
+    gui = CaroGUI(board=board, ai_engine=ai_engine, human_first=True, ponder=kind == "minimax")
+
     print("=" * 50)
     print("       CỜ CARO (GOMOKU) - MINIMAX AI")
     print("=" * 50)
-    print(f"  Kích thước: 15x15")
+    print(f"  Kích thước: {board.size}x{board.size}")
     print("  Style: Hand Drawn")
     print("=" * 50)
-    
+
     gui.run()
 
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cờ Caro (Gomoku) - Minimax AI")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--protocol", action="store_true",
+                      help="chạy engine theo giao thức Gomocup trên stdin/stdout")
+    mode.add_argument("--serve", action="store_true", help="chạy server TCP nhiều ván")
+    parser.add_argument("--engine", choices=("minimax", "mcts"), default="minimax")
+    parser.add_argument("--algorithm", choices=("alphabeta", "pvs"), default=SEARCH_ALGORITHM,
+                        help="thuật toán tìm của minimax")
+    parser.add_argument("--depth", type=int, default=AI_DEPTH,
+                        help="độ sâu tìm khi không có giới hạn thời gian")
+    parser.add_argument("--mcts-time", type=float, default=MCTS_TIME_LIMIT,
+                        help="thời gian mỗi nước của MCTSEngine (giây)")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=PARALLEL_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=SERVER_MAX_PENDING)
+    parser.add_argument("--time-limit", type=float, default=SERVER_TIME_LIMIT,
+                        help="giới hạn thời gian mỗi nước của server (giây)")
+    args = parser.parse_args()
+
+    if args.protocol:
+        from protocol import run_stdio
+        run_stdio(engine=make_engine(args.engine, args.depth, args.mcts_time, args.algorithm))
+    elif args.serve:
+        from server import run_server
+        run_server(args.host, args.port, args.workers, args.max_pending, args.time_limit,
+                   depth=args.depth, algorithm=args.algorithm)
+    else:
+        run_gui(args.engine, args.depth, args.mcts_time, args.algorithm)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,548 @@
+"""
+mcts.py - Engine Monte Carlo Tree Search (UCT) thay thế cho minimax.
+
+Dùng như AIEngine: get_best_move(board) / search(board, time_limit=...),
+luôn tìm nước cho AI. Mỗi vòng lặp:
+    - chọn: đi xuống cây theo UCT (con chưa thăm được thử theo thứ tự ưu
+      tiên: hình cờ tạo ra / chặn được, rồi gần tâm)
+    - mở rộng: nút lá đã thăm MCTS_EXPAND_VISITS lần được mở rộng với tối
+      đa MCTS_MAX_CHILDREN nước ứng viên (có nước thắng ngay hoặc phải chặn
+      năm thì chỉ giữ các nước đó)
+    - mô phỏng: đánh nhanh tối đa MCTS_ROLLOUT_DEPTH nước bằng
+      Board.make_move/check_winner; mỗi nước chọn trong vài ô ngẫu nhiên
+      quanh hai nước gần nhất theo hình cờ (threats.shape_at). Hết độ sâu
+      thì quy điểm heuristic của Board về [0, 1]
+    - lan truyền ngược kết quả theo góc nhìn của bên vừa đi ở mỗi nút
+
+Các nút nằm trong một pool dạng mảng song song (array) có sức chứa cố
+định max_nodes (~25 byte mỗi nút): pool đầy thì cây ngừng mở rộng nhưng
+vẫn tiếp tục mô phỏng. Giữa các lượt, cây được giữ lại: thế cờ mới (nước
+của engine + nước trả lời của đối thủ) được tìm trong cây cũ theo các ô
+mới có quân, cây con đó được chép gọn về đầu một pool mới làm gốc.
+
+ParallelMCTSEngine chạy song song kiểu root parallel: mỗi process tìm độc
+lập trên cây riêng (seed khác nhau), số lần thăm và thắng của các nước ở
+gốc được cộng dồn để chọn nước.
+
+Đấu thử với minimax:
+    python arena.py match --a engine=mcts time_limit=1.0 --b depth=2 --games 4
+"""
+
+import math
+import random
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+from consts import (
+    EMPTY, HUMAN, AI, SCORE_OPEN_THREE, PARALLEL_WORKERS,
+    MCTS_TIME_LIMIT, MCTS_MAX_NODES, MCTS_MAX_CHILDREN, MCTS_EXPLORATION,
+    MCTS_EXPAND_VISITS, MCTS_ROLLOUT_DEPTH, MCTS_ROLLOUT_SAMPLES, MCTS_REPORT_INTERVAL
+)
+from board import Board
+from geometry import Geometry
+from ai import SearchResult
+from parallel import Snapshot, board_snapshot, board_from_snapshot
+from threats import shape_at, SHAPE_FIVE
+
+# Thống kê một nước ở gốc: (nước, số lần thăm, tổng kết quả theo góc nhìn AI)
+RootStats = list[tuple[tuple[int, int], int, float]]
+
+_NO_NODE = -1
+
+
+def _opponent(player: str) -> str:
+    return HUMAN if player == AI else AI
+
+
+class _NodePool:
+    """
+    Pool nút dạng mảng song song, cấp phát liên tiếp; các con của một nút
+    nằm liền nhau từ first[node] tới first[node] + count[node] - 1.
+
+    Attributes:
+        move: Chỉ số ô (row * size + col) của nước dẫn tới nút (-1 ở gốc)
+        parent: Nút cha (-1 ở gốc)
+        first / count: Khối con (first = -1: chưa mở rộng)
+        visits / wins: Số lần thăm và tổng kết quả theo góc nhìn bên vừa đi
+        terminal: 1 nếu nước dẫn tới nút thắng ngay, -1 chưa kiểm tra, 0 không
+    """
+
+    __slots__ = ('capacity', 'move', 'parent', 'first', 'count', 'visits', 'wins', 'terminal')
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity: int = capacity
+        self.move: array = array('h')
+        self.parent: array = array('i')
+        self.first: array = array('i')
+        self.count: array = array('h')
+        self.visits: array = array('i')
+        self.wins: array = array('d')
+        self.terminal: array = array('b')
+
+    def __len__(self) -> int:
+        return len(self.move)
+
+    def allocate(self, parent: int, moves: list[int]) -> int:
+        """Thêm một khối nút con liên tiếp; trả về nút đầu tiên, -1 nếu pool đầy."""
+        if len(self.move) + len(moves) > self.capacity:
+            return _NO_NODE
+        first = len(self.move)
+        count = len(moves)
+        self.move.extend(moves)
+        self.parent.extend([parent] * count)
+        self.first.extend([_NO_NODE] * count)
+        self.count.extend([0] * count)
+        self.visits.extend([0] * count)
+        self.wins.extend([0.0] * count)
+        self.terminal.extend([-1] * count)
+        return first
+
+    def copy_subtree(self, root: int) -> '_NodePool':
+        """Pool mới chỉ chứa cây con gốc `root` (thành nút 0), giữ nguyên thống kê."""
+        pool = _NodePool(self.capacity)
+        pool.allocate(_NO_NODE, [self.move[root]])
+        pool.visits[0] = self.visits[root]
+        pool.wins[0] = self.wins[root]
+        pool.terminal[0] = self.terminal[root]
+        queue = [(root, 0)]
+        for old, new in queue:
+            first = self.first[old]
+            if first == _NO_NODE:
+                continue
+            count = self.count[old]
+            new_first = pool.allocate(new, list(self.move[first:first + count]))
+            pool.first[new] = new_first
+            pool.count[new] = count
+            pool.visits[new_first:new_first + count] = self.visits[first:first + count]
+            pool.wins[new_first:new_first + count] = self.wins[first:first + count]
+            pool.terminal[new_first:new_first + count] = self.terminal[first:first + count]
+            queue.extend((first + k, new_first + k) for k in range(count))
+        return pool
+
+
+class MCTSEngine:
+    """
+    Engine UCT chỉ dừng theo thời gian hoặc số vòng lặp (anytime).
+
+    Attributes:
+        _pool: Cây của lượt tìm gần nhất (nút 0 là gốc)
+        _root_cells: Các ô có quân ở thế cờ gốc của _pool (để dùng lại cây)
+        _rng: Nguồn ngẫu nhiên của mô phỏng
+    """
+
+    __slots__ = ('_time_limit', '_max_nodes', '_max_children', '_exploration', '_expand_visits',
+                 '_rollout_depth', '_rollout_samples', '_reuse_tree', '_rng',
+                 '_pool', '_root_cells', '_root_geometry', '_last_result')
+
+    def __init__(self, time_limit: float = MCTS_TIME_LIMIT, max_nodes: int = MCTS_MAX_NODES,
+                 max_children: int = MCTS_MAX_CHILDREN, exploration: float = MCTS_EXPLORATION,
+                 expand_visits: int = MCTS_EXPAND_VISITS, rollout_depth: int = MCTS_ROLLOUT_DEPTH,
+                 rollout_samples: int = MCTS_ROLLOUT_SAMPLES, reuse_tree: bool = True,
+                 seed: Optional[int] = None) -> None:
+        if max_nodes < 1:
+            raise ValueError(f"max_nodes phải >= 1, nhận {max_nodes}")
+        self._time_limit: float = time_limit
+        self._max_nodes: int = max_nodes
+        self._max_children: int = max_children
+        self._exploration: float = exploration
+        self._expand_visits: int = expand_visits
+        self._rollout_depth: int = rollout_depth
+        self._rollout_samples: int = rollout_samples
+        self._reuse_tree: bool = reuse_tree
+        self._rng: random.Random = random.Random(seed)
+        self._pool: Optional[_NodePool] = None
+        self._root_cells: frozenset[tuple[int, int]] = frozenset()
+        self._root_geometry: Optional[Geometry] = None
+        self._last_result: Optional[SearchResult] = None
+
+    @property
+    def last_result(self) -> Optional[SearchResult]:
+        return self._last_result
+
+    @property
+    def tree_size(self) -> int:
+        """Số nút của cây hiện tại."""
+        return len(self._pool) if self._pool is not None else 0
+
+    def get_best_move(self, board: Board) -> Optional[tuple[int, int]]:
+        return self.search(board).move
+
+    def search(self, board: Board, depth: Optional[int] = None,
+               time_limit: Optional[float] = None, iterations: Optional[int] = None,
+               on_iteration: Optional[Callable[[SearchResult], None]] = None,
+               stop_event: Optional[threading.Event] = None) -> SearchResult:
+        """
+        Tìm nước cho AI tới khi hết time_limit (mặc định của engine), đủ
+        `iterations` vòng lặp, hoặc stop_event được set.
+
+        depth chỉ để tương thích với AIEngine.search và bị bỏ qua.
+        on_iteration nhận kết quả tạm mỗi MCTS_REPORT_INTERVAL giây.
+
+        Returns:
+            SearchResult: score là tỉ lệ thắng ước lượng của AI với nước
+            được chọn, depth là độ sâu lớn nhất của cây, nodes là số vòng lặp
+        """
+        start = time.perf_counter()
+        if time_limit is None and iterations is None:
+            time_limit = self._time_limit
+        if board.move_count == 0:
+            center = board.size // 2
+            result = SearchResult((center, center), 0.5)
+            self._last_result = result
+            return result
+
+        board = board.clone()
+        self._set_root(board)
+        pool = self._pool
+        if pool.first[0] == _NO_NODE:
+            self._expand(board, 0, AI)
+        if pool.count[0] == 1:
+            # Nước bắt buộc (thắng ngay hoặc chặn năm duy nhất): không cần tìm
+            iterations = 0
+        deadline = start + time_limit if time_limit is not None else None
+        next_report = start + MCTS_REPORT_INTERVAL
+        done = 0
+        max_depth = 0
+        while iterations is None or done < iterations:
+            max_depth = max(max_depth, self._iterate(board))
+            done += 1
+            if done & 15 == 0 or iterations is not None:
+                now = time.perf_counter()
+                if deadline is not None and now >= deadline:
+                    break
+                if stop_event is not None and stop_event.is_set():
+                    break
+                if on_iteration is not None and now >= next_report:
+                    next_report = now + MCTS_REPORT_INTERVAL
+                    on_iteration(self._result(board, done, max_depth, now - start))
+        result = self._result(board, done, max_depth, time.perf_counter() - start)
+        self._last_result = result
+        return result
+
+    def root_stats(self) -> RootStats:
+        """Thống kê các nước ở gốc của lượt tìm gần nhất (dùng để gộp giữa các process)."""
+        pool = self._pool
+        if pool is None or pool.first[0] == _NO_NODE:
+            return []
+        size = self._root_geometry.size
+        first = pool.first[0]
+        return [
+            (divmod(pool.move[child], size), pool.visits[child], pool.wins[child])
+            for child in range(first, first + pool.count[0])
+        ]
+
+    # =========================================================================
+    # CÂY
+    # =========================================================================
+
+    def _set_root(self, board: Board) -> None:
+        # Dùng lại cây con của lượt trước nếu thế cờ mới là hậu duệ của gốc cũ
+        cells = frozenset(board.played_cells)
+        pool = self._pool
+        node = _NO_NODE
+        if self._reuse_tree and pool is not None and board.geometry is self._root_geometry \
+                and cells >= self._root_cells:
+            node = self._descend(board, cells - self._root_cells)
+        if node == _NO_NODE:
+            self._pool = _NodePool(self._max_nodes)
+            self._pool.allocate(_NO_NODE, [_NO_NODE])
+        elif node != 0:
+            self._pool = pool.copy_subtree(node)
+        self._pool.terminal[0] = 0
+        self._root_cells = cells
+        self._root_geometry = board.geometry
+
+    def _descend(self, board: Board, added: frozenset[tuple[int, int]]) -> int:
+        # Đi từ gốc cũ theo các ô mới có quân; bên đi ở gốc luôn là AI
+        pool = self._pool
+        size = board.size
+        grid = board.grid
+        remaining = set(added)
+        node = 0
+        player = AI
+        while remaining:
+            first = pool.first[node]
+            if first == _NO_NODE:
+                return _NO_NODE
+            for child in range(first, first + pool.count[node]):
+                cell = divmod(pool.move[child], size)
+                if cell in remaining and grid[cell[0]][cell[1]] == player:
+                    remaining.discard(cell)
+                    node = child
+                    break
+            else:
+                return _NO_NODE
+            player = _opponent(player)
+        # Gốc mới phải tới lượt AI
+        return node if player == AI else _NO_NODE
+
+    def _iterate(self, board: Board) -> int:
+        pool = self._pool
+        size = board.size
+        node = 0
+        player = AI
+        made: list[tuple[int, int]] = []
+        value: Optional[float] = None  # Kết quả theo góc nhìn AI
+        while True:
+            if pool.first[node] == _NO_NODE:
+                if pool.visits[node] >= self._expand_visits:
+                    self._expand(board, node, player)
+                if pool.first[node] == _NO_NODE:
+                    break
+            node = self._select(node)
+            row, col = divmod(pool.move[node], size)
+            board.make_move(row, col, player)
+            made.append((row, col))
+            terminal = pool.terminal[node]
+            if terminal == -1:
+                terminal = pool.terminal[node] = 1 if board.check_winner(row, col) == player else 0
+            if terminal:
+                value = 1.0 if player == AI else 0.0
+                break
+            player = _opponent(player)
+            if pool.visits[node] == 0:
+                break
+        depth = len(made)
+        if value is None:
+            value = self._rollout(board, player, made)
+        for row, col in reversed(made):
+            board.undo_move(row, col)
+        # Lan truyền ngược: wins của nút tính theo bên vừa đi vào nút đó
+        mover_is_ai = depth % 2 == 1
+        while node != _NO_NODE:
+            pool.visits[node] += 1
+            pool.wins[node] += value if mover_is_ai else 1.0 - value
+            mover_is_ai = not mover_is_ai
+            node = pool.parent[node]
+        return depth
+
+    def _select(self, node: int) -> int:
+        pool = self._pool
+        first = pool.first[node]
+        log_parent = math.log(pool.visits[node] + 1)
+        exploration = self._exploration
+        visits = pool.visits
+        wins = pool.wins
+        best = first
+        best_value = -1.0
+        for child in range(first, first + pool.count[node]):
+            n = visits[child]
+            if n == 0:
+                # Con chưa thăm được thử theo thứ tự ưu tiên lúc mở rộng
+                return child
+            value = wins[child] / n + exploration * math.sqrt(log_parent / n)
+            if value > best_value:
+                best_value = value
+                best = child
+        return best
+
+    def _expand(self, board: Board, node: int, player: str) -> None:
+        moves = self._candidates(board, player, self._max_children)
+        if not moves:
+            return
+        size = board.size
+        first = self._pool.allocate(node, [row * size + col for row, col in moves])
+        if first != _NO_NODE:
+            self._pool.first[node] = first
+            self._pool.count[node] = len(moves)
+
+    def _candidates(self, board: Board, player: str, limit: int) -> list[tuple[int, int]]:
+        # Thắng ngay > chặn năm > hình cờ mạnh nhất (tạo hoặc chặn) > gần tâm
+        opponent = _opponent(player)
+        center_rank = board.geometry.center_rank
+        blocks = []
+        keys: dict[tuple[int, int], int] = {}
+        for move in board.frontier:
+            row, col = move
+            own = shape_at(board, row, col, player)
+            if own == SHAPE_FIVE:
+                return [move]
+            opp = shape_at(board, row, col, opponent)
+            if opp == SHAPE_FIVE:
+                blocks.append(move)
+                continue
+            keys[move] = max(2 * own, 2 * opp - 1)
+        if blocks:
+            return blocks
+        ordered = sorted(keys, key=lambda m: (-keys[m], center_rank[m]))
+        return ordered[:limit]
+
+    # =========================================================================
+    # MÔ PHỎNG
+    # =========================================================================
+
+    def _rollout(self, board: Board, player: str, made: list[tuple[int, int]]) -> float:
+        # Đánh nhanh từ nút lá; các nước được thêm vào `made` để bên gọi hoàn tác
+        for _ in range(self._rollout_depth):
+            move = self._rollout_move(board, player)
+            if move is None:
+                return 0.5
+            board.make_move(move[0], move[1], player)
+            made.append(move)
+            if board.check_winner(move[0], move[1]) == player:
+                return 1.0 if player == AI else 0.0
+            player = _opponent(player)
+        diff = board.heuristic_score(AI) - board.heuristic_score(HUMAN)
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, diff / SCORE_OPEN_THREE))))
+
+    def _rollout_move(self, board: Board, player: str) -> Optional[tuple[int, int]]:
+        # Ô ứng viên: ô trống quanh hai nước gần nhất (vùng đang tranh chấp)
+        grid = board.grid
+        neighbors = board.geometry.neighbors
+        history = board.history
+        local = [
+            cell for row, col in history[-2:] for cell in neighbors[row][col]
+            if grid[cell[0]][cell[1]] == EMPTY
+        ]
+        if not local:
+            frontier = board.frontier
+            if not frontier:
+                return None
+            local = list(frontier)
+        rng = self._rng
+        samples = local if len(local) <= self._rollout_samples else rng.sample(local, self._rollout_samples)
+        opponent = _opponent(player)
+        best = samples[0]
+        best_key = -1
+        for move in samples:
+            own = shape_at(board, move[0], move[1], player)
+            if own == SHAPE_FIVE:
+                return move
+            opp = shape_at(board, move[0], move[1], opponent)
+            key = 2 * SHAPE_FIVE if opp == SHAPE_FIVE else max(2 * own, 2 * opp - 1)
+            if key > best_key:
+                best_key = key
+                best = move
+        return best
+
+    def _result(self, board: Board, iterations: int, depth: int, elapsed: float) -> SearchResult:
+        pool = self._pool
+        size = board.size
+        first = pool.first[0]
+        if first == _NO_NODE:
+            moves = self._candidates(board, AI, 1)
+            return SearchResult(moves[0] if moves else None, 0.5, depth, iterations, elapsed)
+        best = max(range(first, first + pool.count[0]), key=lambda child: pool.visits[child])
+        visits = pool.visits[best]
+        score = pool.wins[best] / visits if visits else 0.5
+        # PV: đi theo con được thăm nhiều nhất
+        pv = []
+        node = best
+        while node != _NO_NODE:
+            pv.append(divmod(pool.move[node], size))
+            first = pool.first[node]
+            if first == _NO_NODE:
+                break
+            node = max(range(first, first + pool.count[node]), key=lambda child: pool.visits[child])
+            if pool.visits[node] == 0:
+                break
+        return SearchResult(pv[0], score, depth, iterations, elapsed, pv)
+
+
+# Engine riêng của mỗi worker process (khởi tạo một lần trong _init_worker)
+_worker_engine: Optional[MCTSEngine] = None
+
+
+def _init_worker(engine_kwargs: dict[str, Any]) -> None:
+    global _worker_engine
+    _worker_engine = MCTSEngine(**engine_kwargs)
+
+
+def _worker_search(snapshot: Snapshot, time_limit: Optional[float], iterations: Optional[int],
+                   seed: int) -> tuple[RootStats, int, int]:
+    _worker_engine._rng.seed(seed)
+    result = _worker_engine.search(board_from_snapshot(snapshot), time_limit=time_limit,
+                                   iterations=iterations)
+    stats = _worker_engine.root_stats()
+    if not stats and result.move is not None:
+        stats = [(result.move, 1, result.score)]
+    return stats, result.nodes, result.depth
+
+
+class ParallelMCTSEngine(MCTSEngine):
+    """
+    MCTS song song kiểu root parallel trên một ProcessPoolExecutor.
+
+    Mỗi worker tìm độc lập (cây riêng, dùng lại giữa các lượt nếu worker
+    đó nhận lại thế cờ nối tiếp), rồi số lần thăm/thắng của các nước ở gốc
+    được cộng dồn. Gọi close() hoặc dùng `with` để tắt pool.
+    """
+
+    __slots__ = ('_workers', '_engine_kwargs', '_executor', '_seed')
+
+    def __init__(self, workers: int = PARALLEL_WORKERS, **engine_kwargs: Any) -> None:
+        super().__init__(**engine_kwargs)
+        if workers < 1:
+            raise ValueError(f"workers phải >= 1, nhận {workers}")
+        self._workers: int = workers
+        self._engine_kwargs: dict[str, Any] = {k: v for k, v in engine_kwargs.items() if k != 'seed'}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._seed: int = engine_kwargs.get('seed') or 0
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def close(self) -> None:
+        """Tắt pool worker."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self) -> 'ParallelMCTSEngine':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                initializer=_init_worker,
+                initargs=(self._engine_kwargs,),
+            )
+        return self._executor
+
+    def search(self, board: Board, depth: Optional[int] = None,
+               time_limit: Optional[float] = None, iterations: Optional[int] = None,
+               on_iteration: Optional[Callable[[SearchResult], None]] = None,
+               stop_event: Optional[threading.Event] = None) -> SearchResult:
+        """
+        Như MCTSEngine.search, nhưng chạy trên `workers` process và gộp
+        thống kê ở gốc (iterations là số vòng lặp của mỗi worker).
+        on_iteration và stop_event không được hỗ trợ (mỗi worker dừng theo
+        thời gian của nó).
+        """
+        start = time.perf_counter()
+        if time_limit is None and iterations is None:
+            time_limit = self._time_limit
+        if board.move_count == 0:
+            return super().search(board)
+        snapshot = board_snapshot(board)
+        executor = self._get_executor()
+        futures = []
+        for _ in range(self._workers):
+            self._seed += 1
+            futures.append(executor.submit(_worker_search, snapshot, time_limit, iterations, self._seed))
+        merged: dict[tuple[int, int], list[float]] = {}
+        total = max_depth = 0
+        for future in futures:
+            stats, nodes, depth_reached = future.result()
+            total += nodes
+            max_depth = max(max_depth, depth_reached)
+            for move, visits, wins in stats:
+                entry = merged.setdefault(move, [0, 0.0])
+                entry[0] += visits
+                entry[1] += wins
+        elapsed = time.perf_counter() - start
+        if not merged:
+            result = SearchResult(None, 0.0, 0, total, elapsed)
+        else:
+            move = max(merged, key=lambda m: merged[m][0])
+            visits, wins = merged[move]
+            result = SearchResult(move, wins / visits if visits else 0.5, max_depth, total, elapsed, [move])
+        self._last_result = result
+        return result
@@ -0,0 +1,204 @@
+"""
+parallel.py - Tìm kiếm song song nhiều process, chia việc theo nước ở gốc.
+
+Mỗi vòng lặp sâu dần chạy theo kiểu "Young Brothers Wait": nước đầu tiên
+(anh cả) được tìm ngay trong process chính để có cận alpha, sau đó các
+nước còn lại được gửi tới pool worker với cửa sổ (alpha, +inf). Nước nào
+vượt alpha sẽ có điểm chính xác, nước không vượt chỉ trả về cận trên nên
+không bao giờ được chọn; vì vậy nước đi và điểm trả về giống hệt tìm kiếm
+tuần tự cùng độ sâu (khi không dùng beam_width); tests/test_parallel.py
+kiểm tra điều này. stop_event được đọc cả trong lúc chờ worker.
+
+Worker sống suốt vòng đời engine và giữ transposition table riêng giữa các
+lần gọi; mỗi task chỉ gửi ảnh chụp gọn của bàn cờ (CompactBoard.encode, 57 byte,
+cùng thứ tự nước đi 2 byte mỗi nước).
+
+Chạy đo tốc độ:
+    python parallel.py --depth 4 --workers 1 2 4 8
+"""
+
+import argparse
+import concurrent.futures
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Optional
+from consts import SCORE_FIVE, PARALLEL_WORKERS
+from board import Board
+from compact import CompactBoard
+from ai import AIEngine, SearchTimeout
+
+# (size, win_length, exact, CompactBoard.encode(), CompactBoard.move_stack())
+Snapshot = tuple[int, int, bool, bytes, bytes]
+
+# Engine riêng của mỗi worker process (khởi tạo một lần trong _init_worker)
+_worker_engine: Optional[AIEngine] = None
+
+# Chu kỳ (giây) đọc stop_event trong lúc chờ kết quả của worker
+_STOP_POLL_INTERVAL = 0.01
+
+
+def board_snapshot(board: Board) -> Snapshot:
+    """
+    Ảnh chụp gọn của bàn cờ để gửi giữa các process: các ô
+    (CompactBoard.encode) và thứ tự nước đi (CompactBoard.move_stack).
+    """
+    geometry = board.geometry
+    compact = CompactBoard.from_board(board)
+    return geometry.size, geometry.win_length, geometry.exact, compact.encode(), compact.move_stack()
+
+
+def board_from_snapshot(snapshot: Snapshot) -> Board:
+    """Dựng lại Board từ ảnh chụp của board_snapshot, cùng history/last_move với bàn gốc."""
+    size, win_length, exact, data, moves = snapshot
+    return CompactBoard.decode(data, size, win_length, exact, moves).to_board()
+
+
+def _init_worker(engine_kwargs: dict[str, Any]) -> None:
+    global _worker_engine
+    _worker_engine = AIEngine(**engine_kwargs)
+
+
+def _score_move(snapshot: Snapshot, move: tuple[int, int], depth: int, alpha: float,
+                deadline: Optional[float]) -> tuple[Optional[float], int]:
+    # deadline theo time.time() vì perf_counter không so sánh được giữa các process
+    time_limit = None
+    if deadline is not None:
+        time_limit = deadline - time.time()
+        if time_limit <= 0:
+            return None, 0
+    score = _worker_engine.score_root_move(
+        board_from_snapshot(snapshot), move, depth, alpha, time_limit
+    )
+    return score, _worker_engine.nodes
+
+
+class ParallelAIEngine(AIEngine):
+    """
+    AIEngine chia các nước ở gốc cho một ProcessPoolExecutor.
+
+    Dùng như AIEngine (get_best_move/search); gọi close() hoặc dùng `with`
+    để tắt pool khi không cần nữa.
+    """
+
+    __slots__ = ('_workers', '_engine_kwargs', '_pool')
+
+    def __init__(self, workers: int = PARALLEL_WORKERS, **engine_kwargs: Any) -> None:
+        super().__init__(**engine_kwargs)
+        if workers < 1:
+            raise ValueError(f"workers phải >= 1, nhận {workers}")
+        self._workers: int = workers
+        # Worker chỉ cần cấu hình tìm kiếm, không cần depth/time_limit của engine chính
+        self._engine_kwargs: dict[str, Any] = {
+            key: value for key, value in engine_kwargs.items()
+            if key in ('tt_size', 'tt_policy', 'board_backend', 'algorithm', 'beam_width')
+        }
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def close(self) -> None:
+        """Tắt pool worker."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> 'ParallelAIEngine':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self._workers,
+                initializer=_init_worker,
+                initargs=(self._engine_kwargs,),
+            )
+        return self._pool
+
+    def _search_root(self, candidate_moves: list[tuple[int, int]], depth: int,
+                     alpha: float = float('-inf'),
+                     beta: float = float('inf')) -> tuple[tuple[int, int], float]:
+        # Anh cả: tìm tại chỗ với cửa sổ của vòng lặp (aspiration khi dùng PVS) để có alpha
+        best_move = candidate_moves[0]
+        best_score = self._score_root_move(best_move, depth, alpha, beta)
+        if best_score >= SCORE_FIVE + depth or best_score >= beta or len(candidate_moves) == 1:
+            return best_move, best_score
+        alpha = max(alpha, best_score)
+
+        # Các em: song song với cửa sổ (alpha, +inf)
+        deadline = None
+        if self._deadline is not None:
+            remaining = self._deadline - time.perf_counter()
+            if remaining <= 0:
+                raise SearchTimeout
+            deadline = time.time() + remaining
+        snapshot = board_snapshot(self._board)
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_score_move, snapshot, move, depth, alpha, deadline)
+            for move in candidate_moves[1:]
+        ]
+        timed_out = False
+        for move, future in zip(candidate_moves[1:], futures):
+            score, nodes = self._wait_result(future, futures)
+            self._nodes += nodes
+            if score is None:
+                timed_out = True
+            elif not timed_out and score > best_score:
+                # Theo thứ tự nước ở gốc, chỉ điểm lớn hơn hẳn mới thay: giống tìm tuần tự
+                best_score = score
+                best_move = move
+        if timed_out:
+            raise SearchTimeout
+        return best_move, best_score
+
+    def _wait_result(self, future: Future, futures: list[Future]) -> tuple[Optional[float], int]:
+        # Chờ một task; stop_event được set thì hủy các task chưa chạy và dừng như hết giờ
+        # (task đang chạy trong worker vẫn chạy tới deadline riêng của nó)
+        stop_event = self._stop_event
+        if stop_event is None:
+            return future.result()
+        while True:
+            try:
+                return future.result(timeout=_STOP_POLL_INTERVAL)
+            except concurrent.futures.TimeoutError:
+                if stop_event.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    raise SearchTimeout
+
+
+def main() -> None:
+    from benchmark import POSITIONS, load_position
+
+    parser = argparse.ArgumentParser(description="Đo tốc độ tìm kiếm song song theo số worker")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    print(f"CPU: {os.cpu_count()}, depth: {args.depth}")
+    start = time.perf_counter()
+    serial = [AIEngine(depth=args.depth).search(load_position(moves)) for moves in POSITIONS]
+    serial_time = time.perf_counter() - start
+    print(f"{'workers':<8} {'time (s)':>10} {'speedup':>8}  giống tuần tự")
+    print(f"{'serial':<8} {serial_time:>10.3f} {1.0:>7.2f}x  -")
+    for workers in args.workers:
+        with ParallelAIEngine(workers=workers, depth=args.depth) as engine:
+            # Khởi động pool trước để không tính thời gian spawn process
+            engine._get_pool().submit(int).result()
+            start = time.perf_counter()
+            results = [engine.search(load_position(moves)) for moves in POSITIONS]
+            elapsed = time.perf_counter() - start
+        same = all(
+            (a.move, a.score) == (b.move, b.score) for a, b in zip(serial, results)
+        )
+        print(f"{workers:<8} {elapsed:>10.3f} {serial_time / elapsed:>7.2f}x  {'có' if same else 'KHÔNG'}")
+
+
+if __name__ == "__main__":
+    main()
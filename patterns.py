@@ -0,0 +1,235 @@
+"""
+patterns.py - Bảng tra hình cờ theo cửa sổ 9 ô.
+
+Board giữ mỗi đường (hàng, cột, chéo) dưới dạng một số nguyên, 2 bit mỗi ô
+(EMPTY_CODE / HUMAN_CODE / AI_CODE), đệm PATTERN_RADIUS ô WALL_CODE ở hai
+đầu và cập nhật tăng dần theo nước đi (xem Geometry.line_deltas). Cửa sổ
+9 ô quanh một ô theo một hướng vì vậy chỉ là
+
+    (line_codes[line] >> shift) & WINDOW_MASK
+
+với (line, shift) lấy từ Geometry.window_slots. Bảng của mỗi người chơi
+ánh xạ mã cửa sổ (ô giữa trống) sang lớp hình CLASS_* mà người đó tạo ra
+khi đánh vào ô giữa. Khác với cách đếm chuỗi liên tiếp, bảng nhận ra cả
+hình gián đoạn: ba X_XX, bốn XX_XX / X_XXX. Bảng dùng để phân loại nước
+đi (threats.shape_at, sắp xếp nước của AIEngine, ThreatSolver); điểm
+heuristic ở nút lá chấm cùng các hình gián đoạn đó nhưng tra theo mã của
+cả đường (evaluator.LineScoreTable).
+
+Bảng được dựng lười ở lần dùng đầu tiên cho mỗi win_length (chỉ liệt kê
+các cửa sổ có thể xuất hiện: ô biên chỉ nằm liền ở hai đầu, ~15 nghìn cửa
+sổ) nên không ảnh hưởng thời gian import. Dựng bảng mất ~0.1 giây, phần
+lớn độ trễ nước đi đầu tiên của một process mới, nên bảng đã dựng được
+ghi ra PATTERN_CACHE_PATH và các process sau chỉ đọc lại file (2 x 256 KB). Cửa sổ 9 ô đủ nhìn mọi hình
+tới năm khi win_length <= PATTERN_RADIUS + 1 theo luật tự do; luật chính
+xác cần nhìn thêm một ô mỗi phía nên không có bảng (pattern_table trả về
+None, người gọi dùng cách quét tia).
+"""
+
+import os
+import struct
+from itertools import product
+from typing import Optional
+from consts import (
+    HUMAN, AI, EMPTY_CODE, HUMAN_CODE, AI_CODE, WALL_CODE, PATTERN_RADIUS, PATTERN_CACHE_PATH
+)
+from geometry import Geometry
+
+WINDOW_CELLS: int = 2 * PATTERN_RADIUS + 1
+WINDOW_MASK: int = (1 << (2 * WINDOW_CELLS)) - 1
+
+# Lớp hình trên một hướng khi đánh vào ô giữa cửa sổ (lớn hơn là mạnh hơn)
+CLASS_NONE: int = 0          # Không còn chỗ cho năm quân
+CLASS_ONE: int = 1
+CLASS_CLOSED_TWO: int = 2
+CLASS_OPEN_TWO: int = 3
+CLASS_CLOSED_THREE: int = 4  # Thêm một quân thành bốn
+CLASS_OPEN_THREE: int = 5    # Thêm một quân thành bốn mở (gồm ba gián đoạn X_XX)
+CLASS_FOUR: int = 6          # Đúng một ô thắng (gồm bốn gián đoạn XX_XX)
+CLASS_OPEN_FOUR: int = 7     # Từ hai ô thắng trở lên
+CLASS_FIVE: int = 8
+
+_OWN = 1
+_OPPONENT = 2
+_TABLES: dict[int, dict[str, bytes]] = {}
+
+# Header file bảng: magic, phiên bản (tăng khi đổi cách phân lớp), win_length, PATTERN_RADIUS
+_CACHE_MAGIC = b'CPT1'
+_CACHE_VERSION = 1
+_CACHE_HEADER = struct.Struct('<4sIBB')
+
+
+def _run_through_center(cells: tuple[int, ...]) -> int:
+    # Độ dài chuỗi quân của mình liên tiếp đi qua ô giữa
+    count = 1
+    k = PATTERN_RADIUS + 1
+    while k < WINDOW_CELLS and cells[k] == _OWN:
+        count += 1
+        k += 1
+    k = PATTERN_RADIUS - 1
+    while k >= 0 and cells[k] == _OWN:
+        count += 1
+        k -= 1
+    return count
+
+
+def _has_room(cells: tuple[int, ...], win_length: int) -> bool:
+    # Có đoạn win_length ô đi qua ô giữa không chứa quân đối thủ hay biên
+    for start in range(PATTERN_RADIUS - win_length + 1, PATTERN_RADIUS + 1):
+        if start >= 0 and start + win_length <= WINDOW_CELLS and all(
+            cells[k] in (EMPTY_CODE, _OWN) for k in range(start, start + win_length)
+        ):
+            return True
+    return False
+
+
+def _classify(cells: tuple[int, ...], win_length: int, memo: dict[tuple[int, ...], int]) -> int:
+    """
+    Lớp hình của cửa sổ `cells` (ô giữa là quân của mình), góc nhìn của
+    người có quân _OWN.
+
+    Bốn/năm chỉ tính các chuỗi đi qua ô giữa; ba/hai là hình trở thành
+    bốn/ba sau thêm một quân trong cửa sổ.
+    """
+    known = memo.get(cells)
+    if known is not None:
+        return known
+    if _run_through_center(cells) >= win_length:
+        result = CLASS_FIVE
+    elif not _has_room(cells, win_length):
+        result = CLASS_NONE
+    else:
+        wins = 0
+        children = []
+        for k, cell in enumerate(cells):
+            if cell != EMPTY_CODE:
+                continue
+            child = cells[:k] + (_OWN,) + cells[k + 1:]
+            if _run_through_center(child) >= win_length:
+                wins += 1
+            else:
+                children.append(child)
+        if wins >= 2:
+            result = CLASS_OPEN_FOUR
+        elif wins:
+            result = CLASS_FOUR
+        else:
+            result = CLASS_ONE
+            for child in children:
+                shape = _classify(child, win_length, memo)
+                # Bốn mở -> ba mở, bốn -> ba, ba mở -> hai mở, ba -> hai
+                if shape >= CLASS_CLOSED_THREE:
+                    result = max(result, shape - 2)
+    memo[cells] = result
+    return result
+
+
+def _window_code(cells: tuple[int, ...], own_code: int, opponent_code: int) -> int:
+    code = 0
+    for k, cell in enumerate(cells):
+        if cell == _OWN: value = own_code
+        elif cell == _OPPONENT: value = opponent_code
+        else: value = cell
+        code |= value << (2 * k)
+    return code
+
+
+def build_tables(win_length: int) -> dict[str, bytes]:
+    """
+    Dựng bảng lớp hình của cả hai người chơi theo luật tự do.
+
+    Returns:
+        {HUMAN: bảng, AI: bảng}; bảng[mã cửa sổ] là CLASS_*, mã cửa sổ có
+        ô giữa trống và các ô theo mã tuyệt đối HUMAN_CODE/AI_CODE
+    """
+    human = bytearray(WINDOW_MASK + 1)
+    ai = bytearray(WINDOW_MASK + 1)
+    memo: dict[tuple[int, ...], int] = {}
+    side = PATTERN_RADIUS
+    # Ô biên chỉ có ở đầu đường: mỗi phía là `walls` ô biên ngoài cùng rồi các ô thường
+    for left_walls in range(side + 1):
+        for right_walls in range(side + 1):
+            inner = 2 * side - left_walls - right_walls
+            for values in product((EMPTY_CODE, _OWN, _OPPONENT), repeat=inner):
+                left = (WALL_CODE,) * left_walls + values[:side - left_walls]
+                right = values[side - left_walls:] + (WALL_CODE,) * right_walls
+                shape = _classify(left + (_OWN,) + right, win_length, memo)
+                if shape == CLASS_NONE:
+                    continue
+                window = left + (EMPTY_CODE,) + right
+                human[_window_code(window, HUMAN_CODE, AI_CODE)] = shape
+                ai[_window_code(window, AI_CODE, HUMAN_CODE)] = shape
+    return {HUMAN: bytes(human), AI: bytes(ai)}
+
+
+def pattern_tables(geometry: Geometry) -> Optional[dict[str, bytes]]:
+    """
+    Bảng lớp hình theo người chơi của Geometry, dựng ở lần gọi đầu tiên.
+
+    Returns:
+        None nếu cửa sổ 9 ô không đủ cho luật thắng (luật chính xác hoặc
+        win_length > PATTERN_RADIUS + 1)
+    """
+    if geometry.exact or geometry.win_length > PATTERN_RADIUS + 1:
+        return None
+    tables = _TABLES.get(geometry.win_length)
+    if tables is None:
+        path = cache_path(geometry.win_length)
+        tables = load_tables(path, geometry.win_length) if path is not None else None
+        if tables is None:
+            tables = build_tables(geometry.win_length)
+            if path is not None:
+                save_tables(path, geometry.win_length, tables)
+        _TABLES[geometry.win_length] = tables
+    return tables
+
+
+def cache_path(win_length: int) -> Optional[str]:
+    """Đường dẫn file bảng của win_length (None nếu tắt cache)."""
+    if PATTERN_CACHE_PATH is None:
+        return None
+    path = PATTERN_CACHE_PATH.format(win_length=win_length)
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    return path
+
+
+def load_tables(path: str, win_length: int) -> Optional[dict[str, bytes]]:
+    """
+    Đọc bảng đã ghi bởi save_tables.
+
+    Returns:
+        None nếu chưa có file, không đọc được hoặc file không khớp
+        (phiên bản, win_length, PATTERN_RADIUS, kích thước)
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    table_size = WINDOW_MASK + 1
+    if len(data) != _CACHE_HEADER.size + 2 * table_size:
+        return None
+    if _CACHE_HEADER.unpack_from(data) != (_CACHE_MAGIC, _CACHE_VERSION, win_length, PATTERN_RADIUS):
+        return None
+    start = _CACHE_HEADER.size
+    return {HUMAN: data[start:start + table_size], AI: data[start + table_size:]}
+
+
+def save_tables(path: str, win_length: int, tables: dict[str, bytes]) -> None:
+    """
+    Ghi bảng ra file (qua file tạm rồi đổi tên để process khác không đọc
+    phải file ghi dở). Không ghi được (thư mục chỉ đọc...) thì bỏ qua.
+    """
+    temp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp, 'wb') as f:
+            f.write(_CACHE_HEADER.pack(_CACHE_MAGIC, _CACHE_VERSION, win_length, PATTERN_RADIUS))
+            f.write(tables[HUMAN])
+            f.write(tables[AI])
+        os.replace(temp, path)
+    except OSError:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
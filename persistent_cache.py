@@ -0,0 +1,169 @@
+"""
+persistent_cache.py - Bộ nhớ đệm kết quả tìm kiếm lưu trên đĩa, dùng chung giữa các process.
+
+File là bảng băm kích thước cố định, ánh xạ vào bộ nhớ bằng mmap:
+
+    header: magic b'CPC1', version (u64), số slot (u32), pad
+    slot:   check (u64), score (f64), info (u32: depth | flag << 8 | move << 16), pad
+
+Key là Board.canonical_hash() (cộng khóa lượt đi) nên các thế cờ đối xứng
+dùng chung entry; nước đi được lưu theo hướng của thế cờ chuẩn hóa.
+
+Nhiều process có thể đọc/ghi cùng lúc mà không cần khóa: trường check lưu
+key XOR với dữ liệu của slot, khi đọc nếu check XOR dữ liệu không ra đúng
+key (slot của thế cờ khác, hoặc bị ghi dở bởi process khác) thì coi như
+không có. Thay thế theo độ sâu: chỉ ghi đè khi entry mới sâu hơn hoặc bằng.
+
+version là hash của các hằng số heuristic trong consts.py; khi các hằng số
+này thay đổi, file cũ bị bỏ và tạo lại nên không bao giờ đọc phải điểm cũ.
+Cache chỉ dành cho bàn cờ mặc định: AIEngine không dùng cache khi tìm trên
+bàn cờ có kích thước hoặc luật thắng khác.
+"""
+
+import mmap
+import os
+import struct
+from typing import Optional
+from consts import (
+    BOARD_SIZE, WIN_CONDITION, EXACT_WIN, NEIGHBOR_RADIUS, ZOBRIST_SEED, DEFENSE_MULTIPLIER,
+    SCORE_FIVE, SCORE_OPEN_FOUR, SCORE_CLOSED_FOUR,
+    SCORE_OPEN_THREE, SCORE_CLOSED_THREE,
+    SCORE_OPEN_TWO, SCORE_CLOSED_TWO, SCORE_ONE,
+    PERSISTENT_CACHE_SLOTS
+)
+from board import transform_cell, inverse_symmetry
+
+CACHE_MAGIC: bytes = b'CPC1'
+CACHE_FORMAT: int = 1
+
+_HEADER = struct.Struct('<4sQI4x')
+_SLOT = struct.Struct('<QdI4x')
+_SCORE = struct.Struct('<d')
+_NO_MOVE = 0xFFFF
+_MASK64 = (1 << 64) - 1
+
+# Khóa lượt đi: cùng một thế cờ nhưng khác bên đi là hai entry khác nhau
+_SIDE_KEY = 0x9E3779B97F4A7C15
+
+CacheEntry = tuple[int, float, int, Optional[tuple[int, int]]]
+
+
+def heuristic_version() -> int:
+    """Hash 64-bit của định dạng file và các hằng số ảnh hưởng tới điểm số."""
+    values = (
+        CACHE_FORMAT, BOARD_SIZE, WIN_CONDITION, EXACT_WIN, NEIGHBOR_RADIUS, ZOBRIST_SEED, DEFENSE_MULTIPLIER,
+        SCORE_FIVE, SCORE_OPEN_FOUR, SCORE_CLOSED_FOUR, SCORE_OPEN_THREE, SCORE_CLOSED_THREE,
+        SCORE_OPEN_TWO, SCORE_CLOSED_TWO, SCORE_ONE,
+    )
+    import hashlib  # Chỉ import khi mở file cache
+    digest = hashlib.blake2b(repr(values).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def cache_key(canonical_hash: int, maximizing: bool) -> int:
+    """Key của slot: hash chuẩn hóa cộng khóa lượt đi."""
+    return canonical_hash ^ _SIDE_KEY if maximizing else canonical_hash
+
+
+class PersistentCache:
+    """
+    Bảng (depth, score, flag, best_move) trên file mmap, dùng chung giữa các process.
+
+    Attributes:
+        path: Đường dẫn file
+        hits / misses / stores: Bộ đếm của process hiện tại
+    """
+
+    __slots__ = ('path', '_slots', '_file', '_map', 'hits', 'misses', 'stores')
+
+    def __init__(self, path: str, slots: int = PERSISTENT_CACHE_SLOTS) -> None:
+        if slots <= 0 or slots & (slots - 1):
+            raise ValueError(f"slots phải là lũy thừa của 2, nhận {slots}")
+        self.path: str = path
+        self._slots: int = slots
+        self.hits: int = 0
+        self.misses: int = 0
+        self.stores: int = 0
+        if not self._header_matches(slots):
+            self._create(slots)
+        self._file = open(path, 'r+b')
+        self._map: mmap.mmap = mmap.mmap(self._file.fileno(), 0)
+
+    def _header_matches(self, slots: int) -> bool:
+        try:
+            with open(self.path, 'rb') as f:
+                header = f.read(_HEADER.size)
+                size = os.fstat(f.fileno()).st_size
+        except OSError:
+            return False
+        if len(header) != _HEADER.size:
+            return False
+        magic, version, file_slots = _HEADER.unpack(header)
+        return (magic == CACHE_MAGIC and version == heuristic_version() and file_slots == slots
+                and size == _HEADER.size + slots * _SLOT.size)
+
+    def _create(self, slots: int) -> None:
+        # Ghi file mới rồi thay thế nguyên tử: process khác đang mở file cũ vẫn đọc được bản cũ
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(_HEADER.pack(CACHE_MAGIC, heuristic_version(), slots))
+            f.truncate(_HEADER.size + slots * _SLOT.size)
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def _check(key: int, score: float, info: int) -> int:
+        return (key ^ int.from_bytes(_SCORE.pack(score), 'little') ^ info) & _MASK64
+
+    def probe(self, canonical: tuple[int, int], maximizing: bool) -> Optional[CacheEntry]:
+        """
+        Tra entry của thế cờ.
+
+        Args:
+            canonical: Kết quả Board.canonical_hash() của thế cờ
+            maximizing: True nếu tới lượt AI
+
+        Returns:
+            (depth, score, flag, best_move theo hướng của bàn cờ) hoặc None
+        """
+        canonical_hash, symmetry = canonical
+        key = cache_key(canonical_hash, maximizing)
+        offset = _HEADER.size + (key & (self._slots - 1)) * _SLOT.size
+        check, score, info = _SLOT.unpack_from(self._map, offset)
+        if info == 0 or self._check(key, score, info) != check:
+            self.misses += 1
+            return None
+        self.hits += 1
+        depth, flag, move = info & 0xFF, (info >> 8) & 0xFF, info >> 16
+        best_move = None
+        if move != _NO_MOVE:
+            best_move = transform_cell(inverse_symmetry(symmetry), move // BOARD_SIZE, move % BOARD_SIZE)
+        return depth, score, flag, best_move
+
+    def store(self, canonical: tuple[int, int], maximizing: bool, depth: int, score: float,
+              flag: int, best_move: Optional[tuple[int, int]]) -> None:
+        """Ghi entry nếu slot trống hoặc entry cũ không sâu hơn (depth >= 1)."""
+        canonical_hash, symmetry = canonical
+        key = cache_key(canonical_hash, maximizing)
+        offset = _HEADER.size + (key & (self._slots - 1)) * _SLOT.size
+        _, _, old_info = _SLOT.unpack_from(self._map, offset)
+        if old_info and (old_info & 0xFF) > depth:
+            return
+        move = _NO_MOVE
+        if best_move is not None:
+            row, col = transform_cell(symmetry, best_move[0], best_move[1])
+            move = row * BOARD_SIZE + col
+        # depth >= 1 nên info != 0; info == 0 đánh dấu slot trống
+        info = min(depth, 255) | (flag << 8) | (move << 16)
+        _SLOT.pack_into(self._map, offset, self._check(key, score, info), score, info)
+        self.stores += 1
+
+    def flush(self) -> None:
+        """Đẩy các trang đã ghi xuống đĩa."""
+        self._map.flush()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+            self._map = None
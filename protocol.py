@@ -0,0 +1,300 @@
+"""
+protocol.py - Chạy AIEngine không cần giao diện qua giao thức dòng lệnh Gomocup (piskvork).
+
+Engine đọc lệnh từ stdin và trả lời ra stdout, mỗi dòng một lệnh. Tọa độ
+theo quy ước Gomocup là "x,y" = (cột, hàng). Engine luôn cầm quân AI,
+đối thủ là HUMAN.
+
+    START size            -> OK              (bàn size x size)
+    RECTSTART w,h         -> OK | ERROR      (chỉ hỗ trợ w == h)
+    RESTART               -> OK
+    INFO key value        -> (không trả lời) timeout_turn, timeout_match,
+                             time_left (ms), rule (bit 1: đúng năm quân)
+    BEGIN                 -> x,y             (engine đi trước)
+    TURN x,y              -> x,y             (nước của đối thủ, engine trả lời)
+    BOARD ... DONE        -> x,y             (mỗi dòng "x,y,who", who 1 = engine,
+                                              2 = đối thủ)
+    TAKEBACK x,y          -> OK              (hoàn tác nước cuối cùng)
+    PLAY x,y              -> x,y             (đánh hộ engine một nước)
+    ABOUT                 -> name="...", version="..."
+    END                   -> (thoát)
+
+GomocupSession chỉ giữ trạng thái ván và phân tích lệnh, không tự tìm
+kiếm: feed() cho biết khi nào engine phải đi, bên điều khiển tìm nước
+(tại chỗ với run_stdio, hoặc qua pool process với server.py) rồi gọi
+play(). Thời gian mỗi nước lấy từ các lệnh INFO (xem move_time()).
+
+Chạy:
+    python main.py --protocol
+"""
+
+import sys
+from typing import Any, Optional, TextIO
+from consts import (
+    WIN_CONDITION, HUMAN, AI, ENGINE_NAME, ENGINE_VERSION,
+    PROTOCOL_TIME_SHARE, PROTOCOL_MOVES_LEFT, PROTOCOL_MIN_MOVE_TIME
+)
+from board import Board
+from ai import AIEngine
+
+# Bit của INFO rule được hỗ trợ (các bit khác - renju, caro... - bị bỏ qua)
+RULE_EXACT_FIVE: int = 1
+
+_WHO = {'1': AI, '2': HUMAN}
+
+
+class ProtocolError(ValueError):
+    """Lệnh không hợp lệ; nội dung được trả về cho bên điều khiển sau ERROR."""
+
+
+def _parse_cell(text: str) -> tuple[int, int]:
+    # "x,y" -> (row, col)
+    try:
+        x, y = (int(part) for part in text.split(','))
+    except ValueError:
+        raise ProtocolError(f"tọa độ không hợp lệ: {text!r}") from None
+    return y, x
+
+
+def format_move(move: tuple[int, int]) -> str:
+    """(row, col) -> "x,y" theo quy ước Gomocup."""
+    row, col = move
+    return f"{col},{row}"
+
+
+class GomocupSession:
+    """
+    Trạng thái của một ván theo giao thức Gomocup.
+
+    Attributes:
+        _board: Bàn cờ hiện tại (None trước lệnh START)
+        _exact: Luật đúng năm quân (INFO rule)
+        _timeout_turn / _timeout_match / _time_left: Các giá trị INFO (giây)
+        _board_moves: Các nước đang nhận trong khối BOARD ... DONE (None = không trong khối)
+        _turn_move: Nước của đối thủ do lệnh TURN vừa xử lý đặt vào (xem cancel_turn)
+        _finished: Đã nhận END
+    """
+
+    __slots__ = ('_board', '_exact', '_timeout_turn', '_timeout_match', '_time_left',
+                 '_board_moves', '_turn_move', '_finished')
+
+    def __init__(self) -> None:
+        self._board: Optional[Board] = None
+        self._exact: bool = False
+        self._timeout_turn: Optional[float] = None
+        self._timeout_match: Optional[float] = None
+        self._time_left: Optional[float] = None
+        self._board_moves: Optional[list[tuple[int, int, str]]] = None
+        self._turn_move: Optional[tuple[int, int]] = None
+        self._finished: bool = False
+
+    @property
+    def board(self) -> Optional[Board]:
+        return self._board
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def feed(self, line: str) -> tuple[list[str], bool]:
+        """
+        Xử lý một dòng lệnh.
+
+        Returns:
+            (các dòng trả lời, True nếu engine phải đi ngay: bên gọi tìm
+            nước trên `board` rồi gọi play())
+        """
+        line = line.strip()
+        if not line:
+            return [], False
+        self._turn_move = None
+        try:
+            if self._board_moves is not None:
+                return [], self._feed_board_line(line)
+            command, _, args = line.partition(' ')
+            handler = getattr(self, '_cmd_' + command.lower(), None)
+            if handler is None:
+                return [f"UNKNOWN lệnh không hỗ trợ: {command}"], False
+            return handler(args.strip())
+        except ProtocolError as e:
+            return [f"ERROR {e}"], False
+
+    def play(self, move: Optional[tuple[int, int]]) -> str:
+        """Đánh nước engine đã chọn; trả về dòng trả lời cho bên điều khiển."""
+        if move is None or not self._board.make_move(move[0], move[1], AI):
+            return "ERROR không còn nước đi"
+        return format_move(move)
+
+    def cancel_turn(self) -> None:
+        """
+        Bỏ nước đối thủ của lệnh TURN vừa xử lý khi engine không trả lời
+        được (server bận, hết giờ) để bên điều khiển gửi lại đúng lệnh đó.
+        BEGIN và BOARD gửi lại được mà không cần hoàn tác.
+        """
+        if self._turn_move is not None:
+            self._board.undo_move(*self._turn_move)
+            self._turn_move = None
+
+    def move_time(self) -> Optional[float]:
+        """
+        Thời gian tìm (giây) cho nước tiếp theo theo INFO: phần
+        PROTOCOL_TIME_SHARE của min(timeout_turn, time_left /
+        PROTOCOL_MOVES_LEFT). None nếu chưa có INFO thời gian (dùng cấu hình
+        của engine).
+        """
+        limits = []
+        if self._timeout_turn is not None:
+            limits.append(self._timeout_turn)
+        if self._time_left is not None and self._timeout_match:
+            limits.append(self._time_left / PROTOCOL_MOVES_LEFT)
+        if not limits:
+            return None
+        return max(PROTOCOL_MIN_MOVE_TIME, min(limits) * PROTOCOL_TIME_SHARE)
+
+    def _require_board(self) -> Board:
+        if self._board is None:
+            raise ProtocolError("chưa có lệnh START")
+        return self._board
+
+    def _new_board(self, size: int) -> None:
+        try:
+            board = Board(size, WIN_CONDITION, self._exact)
+        except ValueError as e:
+            raise ProtocolError(f"kích thước không hỗ trợ: {size} ({e})") from None
+        # Đổi luật giữa ván: đánh lại các nước đã có trên bàn cờ mới
+        if self._board is not None:
+            grid = self._board.grid
+            for row, col in self._board.history:
+                board.make_move(row, col, grid[row][col])
+        self._board = board
+
+    def _cmd_start(self, args: str) -> tuple[list[str], bool]:
+        try:
+            size = int(args)
+        except ValueError:
+            raise ProtocolError(f"kích thước không hợp lệ: {args!r}") from None
+        self._board = None
+        self._new_board(size)
+        return ["OK"], False
+
+    def _cmd_rectstart(self, args: str) -> tuple[list[str], bool]:
+        height, width = _parse_cell(args)
+        if width != height:
+            raise ProtocolError("chỉ hỗ trợ bàn cờ vuông")
+        return self._cmd_start(str(width))
+
+    def _cmd_restart(self, args: str) -> tuple[list[str], bool]:
+        self._require_board().reset()
+        return ["OK"], False
+
+    def _cmd_info(self, args: str) -> tuple[list[str], bool]:
+        key, _, value = args.partition(' ')
+        key = key.lower()
+        if key in ('timeout_turn', 'timeout_match', 'time_left'):
+            try:
+                seconds = int(value) / 1000
+            except ValueError:
+                raise ProtocolError(f"giá trị INFO không hợp lệ: {args!r}") from None
+            setattr(self, '_' + key, seconds)
+        elif key == 'rule':
+            try:
+                exact = bool(int(value) & RULE_EXACT_FIVE)
+            except ValueError:
+                raise ProtocolError(f"giá trị INFO không hợp lệ: {args!r}") from None
+            if exact != self._exact:
+                self._exact = exact
+                if self._board is not None:
+                    self._new_board(self._board.size)
+        # Các khóa khác (max_memory, game_type, folder...) không ảnh hưởng engine
+        return [], False
+
+    def _cmd_begin(self, args: str) -> tuple[list[str], bool]:
+        self._require_board()
+        return [], True
+
+    def _cmd_turn(self, args: str) -> tuple[list[str], bool]:
+        self._turn_move = self._place(args, HUMAN)
+        return [], True
+
+    def _cmd_play(self, args: str) -> tuple[list[str], bool]:
+        row, col = self._place(args, AI)
+        return [format_move((row, col))], False
+
+    def _cmd_takeback(self, args: str) -> tuple[list[str], bool]:
+        board = self._require_board()
+        row, col = _parse_cell(args)
+        if board.last_move != (row, col):
+            raise ProtocolError(f"chỉ hoàn tác được nước cuối cùng: {args}")
+        board.undo_move(row, col)
+        return ["OK"], False
+
+    def _cmd_board(self, args: str) -> tuple[list[str], bool]:
+        self._require_board()
+        self._board_moves = []
+        return [], False
+
+    def _feed_board_line(self, line: str) -> bool:
+        if line.upper() != 'DONE':
+            cell, _, who = line.rpartition(',')
+            if who not in _WHO:
+                self._board_moves = None
+                raise ProtocolError(f"dòng BOARD không hợp lệ: {line!r}")
+            try:
+                row, col = _parse_cell(cell)
+            except ProtocolError:
+                self._board_moves = None
+                raise
+            self._board_moves.append((row, col, _WHO[who]))
+            return False
+        moves = self._board_moves
+        self._board_moves = None
+        board = self._board
+        board.reset()
+        for row, col, player in moves:
+            if not board.make_move(row, col, player):
+                board.reset()
+                raise ProtocolError(f"nước đi không hợp lệ: {col},{row}")
+        return True
+
+    def _cmd_about(self, args: str) -> tuple[list[str], bool]:
+        return [f'name="{ENGINE_NAME}", version="{ENGINE_VERSION}", country="Vietnam"'], False
+
+    def _cmd_end(self, args: str) -> tuple[list[str], bool]:
+        self._finished = True
+        return [], False
+
+    def _place(self, args: str, player: str) -> tuple[int, int]:
+        board = self._require_board()
+        row, col = _parse_cell(args)
+        if not board.make_move(row, col, player):
+            raise ProtocolError(f"nước đi không hợp lệ: {args}")
+        return row, col
+
+
+def run_stdio(stdin: TextIO = sys.stdin, stdout: TextIO = sys.stdout,
+              engine: Optional[Any] = None, **engine_kwargs: Any) -> None:
+    """
+    Vòng lặp giao thức trên stdin/stdout, tìm nước bằng một engine tại chỗ.
+
+    Args:
+        engine: Engine có search(board, time_limit=...) (AIEngine,
+            MCTSEngine); None = AIEngine(**engine_kwargs)
+        engine_kwargs: Cấu hình AIEngine (depth dùng khi chưa có INFO thời gian)
+    """
+    if engine is None:
+        engine = AIEngine(**engine_kwargs)
+    session = GomocupSession()
+    for line in stdin:
+        replies, think = session.feed(line)
+        if think:
+            time_limit = session.move_time()
+            if time_limit is None:
+                result = engine.search(session.board)
+            else:
+                result = engine.search(session.board, time_limit=time_limit)
+            replies.append(session.play(result.move))
+        for reply in replies:
+            stdout.write(reply + '\n')
+        stdout.flush()
+        if session.finished:
+            break
@@ -0,0 +1,378 @@
+"""
+records.py - Lưu ván cờ đã chơi và phân tích hàng loạt offline.
+
+File ván cờ (.cgr) chỉ ghi nối tiếp: mỗi ván là một bản ghi nhị phân,
+ghi bằng một lần write nên file không bao giờ phải viết lại, nhiều ván có
+thể được nối vào cùng một file từ GUI hoặc arena:
+
+    header: magic b'CGR1', version (u32)
+    ván:    size (u8), win_length (u8), flags (u8: bit 0 luật chính xác,
+            bit 1 AI đi trước), kết quả (u8, RESULT_*), số nước (u16),
+            thời điểm (f64, time.time())
+    nước:   ô (u16, row * size + col), flags (u8: bit 0 có thống kê),
+            depth (u8), score (f64), nodes (u32), elapsed (f32)
+
+Thống kê chỉ có ở các nước do engine đi (điểm theo góc nhìn của bên đi
+nước đó). read_records() đọc từng ván một nên file lớn không phải nạp hết
+vào bộ nhớ; ván cuối bị ghi dở (chương trình bị tắt giữa chừng) được bỏ
+qua. replay_positions() đi lại ván qua Board.
+
+Phân tích: chấm lại mọi thế cờ của một hoặc nhiều file bằng AIEngine trên
+ProcessPoolExecutor, ghi mỗi thế cờ một dòng JSONL (dữ liệu hồi quy, đầu
+vào cho sách khai cuộc):
+    python records.py list games.cgr
+    python records.py analyze games.cgr --depth 3 --workers 4 --output analysis.jsonl
+"""
+
+import argparse
+import json
+import os
+import struct
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, BinaryIO, Iterable, Iterator, Optional, Sequence
+from consts import (
+    BOARD_SIZE, WIN_CONDITION, EXACT_WIN, HUMAN, AI, HUMAN_CODE, AI_CODE,
+    AI_DEPTH, PARALLEL_WORKERS
+)
+from board import Board
+
+RECORD_MAGIC: bytes = b'CGR1'
+RECORD_VERSION: int = 1
+
+# Kết quả ván
+RESULT_UNFINISHED: int = 0
+RESULT_HUMAN: int = HUMAN_CODE
+RESULT_AI: int = AI_CODE
+RESULT_DRAW: int = 3
+
+_FILE_HEADER = struct.Struct('<4sI')
+_GAME = struct.Struct('<BBBBHd')
+_MOVE = struct.Struct('<HBBdIf')
+_FLAG_EXACT = 1
+_FLAG_AI_FIRST = 2
+_FLAG_STATS = 1
+
+# Thống kê một nước của engine: (depth, score, nodes, elapsed)
+MoveStats = tuple[int, float, int, float]
+
+
+class GameRecord:
+    """
+    Một ván cờ: luật, các nước đi theo thứ tự và thống kê của engine.
+
+    Attributes:
+        moves: Các ô (row, col), hai bên luân phiên bắt đầu từ first_player
+        stats: Cùng độ dài với moves; None ở nước không do engine đi
+        result: Một trong RESULT_*
+        timestamp: Thời điểm ghi ván (time.time())
+    """
+
+    __slots__ = ('size', 'win_length', 'exact', 'first_player', 'result', 'moves', 'stats', 'timestamp')
+
+    def __init__(self, moves: Sequence[tuple[int, int]],
+                 stats: Optional[Sequence[Optional[MoveStats]]] = None,
+                 result: int = RESULT_UNFINISHED, first_player: str = HUMAN,
+                 size: int = BOARD_SIZE, win_length: int = WIN_CONDITION, exact: bool = EXACT_WIN,
+                 timestamp: Optional[float] = None) -> None:
+        self.size: int = size
+        self.win_length: int = win_length
+        self.exact: bool = exact
+        self.first_player: str = first_player
+        self.result: int = result
+        self.moves: list[tuple[int, int]] = list(moves)
+        self.stats: list[Optional[MoveStats]] = list(stats) if stats is not None else [None] * len(self.moves)
+        if len(self.stats) != len(self.moves):
+            raise ValueError(f"stats phải có {len(self.moves)} phần tử, nhận {len(self.stats)}")
+        self.timestamp: float = time.time() if timestamp is None else timestamp
+
+    @classmethod
+    def from_board(cls, board: Board, stats: Optional[Sequence[Optional[MoveStats]]] = None,
+                   result: Optional[int] = None) -> 'GameRecord':
+        """
+        Ván cờ theo Board.history. result mặc định suy từ nước cuối (thắng /
+        hòa khi đầy bàn / chưa kết thúc).
+        """
+        history = board.history
+        grid = board.grid
+        first_player = grid[history[0][0]][history[0][1]] if history else HUMAN
+        if result is None:
+            winner = board.check_winner(*history[-1]) if history else None
+            if winner is not None:
+                result = RESULT_HUMAN if winner == HUMAN else RESULT_AI
+            else:
+                result = RESULT_DRAW if board.is_full() else RESULT_UNFINISHED
+        return cls(history, stats, result, first_player,
+                   board.size, board.win_length, board.geometry.exact)
+
+    def player_at(self, ply: int) -> str:
+        """Bên đi nước thứ ply (tính từ 0)."""
+        if ply % 2 == 0:
+            return self.first_player
+        return AI if self.first_player == HUMAN else HUMAN
+
+    def new_board(self) -> Board:
+        return Board(self.size, self.win_length, self.exact)
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def __repr__(self) -> str:
+        return (f"GameRecord({self.size}x{self.size}, {len(self.moves)} nước, "
+                f"first={self.first_player}, result={self.result})")
+
+
+def encode_record(record: GameRecord) -> bytes:
+    """Mã hóa một ván thành bản ghi nhị phân (không gồm header file)."""
+    flags = (_FLAG_EXACT if record.exact else 0) | (_FLAG_AI_FIRST if record.first_player == AI else 0)
+    parts = [_GAME.pack(record.size, record.win_length, flags, record.result,
+                        len(record.moves), record.timestamp)]
+    for (row, col), stats in zip(record.moves, record.stats):
+        if stats is None:
+            parts.append(_MOVE.pack(row * record.size + col, 0, 0, 0, 0, 0.0))
+        else:
+            depth, score, nodes, elapsed = stats
+            parts.append(_MOVE.pack(row * record.size + col, _FLAG_STATS, min(depth, 255), score,
+                                    min(nodes, 2**32 - 1), elapsed))
+    return b''.join(parts)
+
+
+def _read_header(f: BinaryIO, path: str) -> None:
+    header = f.read(_FILE_HEADER.size)
+    if len(header) < _FILE_HEADER.size:
+        raise ValueError(f"file ván cờ không hợp lệ: {path}")
+    magic, version = _FILE_HEADER.unpack(header)
+    if magic != RECORD_MAGIC or version != RECORD_VERSION:
+        raise ValueError(f"file ván cờ không hợp lệ: {path}")
+
+
+class RecordWriter:
+    """
+    Ghi nối tiếp các ván vào một file .cgr (tạo file và header nếu chưa có).
+
+    Mỗi append() là một lần write rồi flush; dùng `with` hoặc close().
+    """
+
+    __slots__ = ('path', '_file')
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                _read_header(f, path)
+        self._file: Optional[BinaryIO] = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(_FILE_HEADER.pack(RECORD_MAGIC, RECORD_VERSION))
+
+    def append(self, record: GameRecord) -> None:
+        self._file.write(encode_record(record))
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'RecordWriter':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def append_record(path: str, record: GameRecord) -> None:
+    """Ghi thêm một ván vào file (mở rồi đóng ngay)."""
+    with RecordWriter(path) as writer:
+        writer.append(record)
+
+
+def read_records(path: str) -> Iterator[GameRecord]:
+    """
+    Đọc lần lượt các ván trong file, mỗi lần chỉ giữ một ván trong bộ nhớ.
+
+    Ván cuối bị ghi dở được bỏ qua.
+
+    Raises:
+        ValueError: Nếu header file không hợp lệ
+    """
+    with open(path, 'rb') as f:
+        _read_header(f, path)
+        while True:
+            head = f.read(_GAME.size)
+            if len(head) < _GAME.size:
+                return
+            size, win_length, flags, result, count, timestamp = _GAME.unpack(head)
+            body = f.read(count * _MOVE.size)
+            if len(body) < count * _MOVE.size:
+                return
+            moves: list[tuple[int, int]] = []
+            stats: list[Optional[MoveStats]] = []
+            for cell, move_flags, depth, score, nodes, elapsed in _MOVE.iter_unpack(body):
+                moves.append(divmod(cell, size))
+                stats.append((depth, score, nodes, elapsed) if move_flags & _FLAG_STATS else None)
+            yield GameRecord(moves, stats, result, AI if flags & _FLAG_AI_FIRST else HUMAN,
+                             size, win_length, bool(flags & _FLAG_EXACT), timestamp)
+
+
+def replay_positions(record: GameRecord) -> Iterator[tuple[Board, tuple[int, int], str, Optional[MoveStats]]]:
+    """
+    Đi lại ván qua Board.
+
+    Yields:
+        (bàn cờ trước nước đi, nước đi, bên đi, thống kê). Bàn cờ là cùng
+        một đối tượng được đánh tiếp sau mỗi lần yield: clone() nếu cần giữ.
+
+    Raises:
+        ValueError: Nếu ván có nước đi không hợp lệ
+    """
+    board = record.new_board()
+    for ply, (row, col) in enumerate(record.moves):
+        player = record.player_at(ply)
+        yield board, (row, col), player, record.stats[ply]
+        if not board.push(row, col, player):
+            raise ValueError(f"nước đi không hợp lệ ở nước {ply}: {(row, col)}")
+
+
+# =============================================================================
+# PHÂN TÍCH HÀNG LOẠT
+# =============================================================================
+
+# Engine riêng của mỗi worker process (khởi tạo một lần trong _init_worker)
+_worker_engine = None
+
+
+def _init_worker(engine_kwargs: dict[str, Any]) -> None:
+    global _worker_engine
+    from ai import AIEngine
+    _worker_engine = AIEngine(**engine_kwargs)
+
+
+def analyze_game(engine: Any, record: GameRecord, game: int = 0) -> list[dict[str, Any]]:
+    """
+    Chấm lại mọi thế cờ (trước mỗi nước đi) của một ván bằng engine.
+
+    AIEngine luôn tìm cho AI nên thế cờ tới lượt HUMAN được tìm trên bàn cờ
+    đổi màu; score theo góc nhìn của bên tới lượt.
+
+    Returns:
+        Mỗi thế cờ một dict: game, ply, player, played, best, score, depth,
+        nodes, recorded_score (điểm lúc chơi nếu nước đó do engine đi)
+    """
+    board = record.new_board()
+    swapped = record.new_board()
+    rows: list[dict[str, Any]] = []
+    for ply, (row, col) in enumerate(record.moves):
+        player = record.player_at(ply)
+        result = engine.search(board if player == AI else swapped)
+        stats = record.stats[ply]
+        rows.append({
+            'game': game, 'ply': ply, 'player': player, 'played': [row, col],
+            'best': list(result.move) if result.move else None,
+            'score': result.score, 'depth': result.depth, 'nodes': result.nodes,
+            'recorded_score': stats[1] if stats is not None else None,
+        })
+        if not board.push(row, col, player):
+            raise ValueError(f"ván {game}: nước đi không hợp lệ ở nước {ply}: {(row, col)}")
+        swapped.push(row, col, AI if player == HUMAN else HUMAN)
+        if board.check_winner(row, col) is not None:
+            break
+    return rows
+
+
+def _analyze_task(record: GameRecord, game: int) -> list[dict[str, Any]]:
+    return analyze_game(_worker_engine, record, game)
+
+
+def analyze_corpus(paths: Sequence[str], depth: int = AI_DEPTH, workers: int = PARALLEL_WORKERS,
+                   limit: Optional[int] = None, **engine_kwargs: Any) -> Iterator[dict[str, Any]]:
+    """
+    Chấm lại mọi thế cờ của các file ván cờ trên một pool `workers` process.
+
+    Các ván được đọc dần và gửi cho pool (tối đa 2 * workers ván đang chờ)
+    nên bộ nhớ không phụ thuộc kích thước corpus; kết quả trả về theo thứ
+    tự ván trong file.
+
+    Args:
+        limit: Chỉ phân tích tối đa `limit` ván đầu tiên
+        engine_kwargs: Cấu hình thêm của AIEngine (mặc định không dùng sách khai cuộc)
+
+    Yields:
+        Các dòng của analyze_game, game đánh số liên tục qua mọi file
+    """
+    engine_kwargs = {'opening_book': None, **engine_kwargs, 'depth': depth}
+    records = _iter_corpus(paths, limit)
+    if workers <= 1:
+        _init_worker(engine_kwargs)
+        for game, record in records:
+            yield from analyze_game(_worker_engine, record, game)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(engine_kwargs,)) as pool:
+        pending: deque[Future] = deque()
+        for game, record in records:
+            pending.append(pool.submit(_analyze_task, record, game))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _iter_corpus(paths: Iterable[str], limit: Optional[int]) -> Iterator[tuple[int, GameRecord]]:
+    game = 0
+    for path in paths:
+        for record in read_records(path):
+            if limit is not None and game >= limit:
+                return
+            yield game, record
+            game += 1
+
+
+def _list_command(args: argparse.Namespace) -> None:
+    names = {RESULT_UNFINISHED: 'chưa xong', RESULT_HUMAN: 'X thắng', RESULT_AI: 'O thắng', RESULT_DRAW: 'hòa'}
+    totals = {result: 0 for result in names}
+    game = 0
+    for path in args.paths:
+        for record in read_records(path):
+            totals[record.result] += 1
+            if args.verbose:
+                stamp = time.strftime('%Y-%m-%d %H:%M', time.localtime(record.timestamp))
+                print(f"{game:>6} {stamp} {record.size}x{record.size} {len(record):>4} nước  "
+                      f"{record.first_player} đi trước  {names[record.result]}")
+            game += 1
+    print(f"{game} ván: " + ", ".join(f"{names[result]} {count}" for result, count in totals.items()))
+
+
+def _analyze_command(args: argparse.Namespace) -> None:
+    start = time.perf_counter()
+    positions = 0
+    with open(args.output, 'w', encoding='utf-8') as f:
+        for row in analyze_corpus(args.paths, args.depth, args.workers, args.limit):
+            f.write(json.dumps(row) + '\n')
+            positions += 1
+    print(f"Đã chấm {positions} thế cờ vào {args.output} ({time.perf_counter() - start:.1f}s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="File ván cờ: liệt kê và phân tích hàng loạt")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    listing = commands.add_parser('list', help="thống kê các ván trong file")
+    listing.add_argument('paths', nargs='+')
+    listing.add_argument('-v', '--verbose', action='store_true', help="in từng ván")
+    listing.set_defaults(handler=_list_command)
+
+    analyze = commands.add_parser('analyze', help="chấm lại mọi thế cờ bằng AIEngine")
+    analyze.add_argument('paths', nargs='+')
+    analyze.add_argument('--depth', type=int, default=AI_DEPTH)
+    analyze.add_argument('--workers', type=int, default=PARALLEL_WORKERS)
+    analyze.add_argument('--limit', type=int, help="chỉ phân tích N ván đầu")
+    analyze.add_argument('--output', default='analysis.jsonl', help="file JSONL kết quả")
+    analyze.set_defaults(handler=_analyze_command)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
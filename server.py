@@ -0,0 +1,187 @@
+"""
+server.py - Server TCP asyncio cho nhiều ván đồng thời theo giao thức Gomocup.
+
+Mỗi kết nối là một ván (GomocupSession của protocol.py), lệnh và trả lời
+theo dòng giống chế độ stdin. Việc tìm kiếm được gửi tới một
+ProcessPoolExecutor `workers` process; mỗi process giữ một AIEngine (và
+transposition table của nó) suốt vòng đời server, task chỉ mang ảnh chụp
+gọn của bàn cờ (parallel.board_snapshot).
+
+- Hạn chót của mỗi yêu cầu = lúc nhận + min(thời gian theo INFO,
+  time_limit của server); thời gian xếp hàng được trừ vào thời gian tìm.
+- Tối đa `workers` lượt tìm chạy cùng lúc, tối đa `max_pending` yêu cầu
+  đang chờ hoặc đang chạy: vượt quá thì trả "ERROR" ngay thay vì xếp hàng
+  vô hạn (nước của lệnh TURN bị bỏ để gửi lại được). Trong lúc một kết nối chờ nước đi, server không đọc thêm lệnh
+  của kết nối đó nên bên gửi dồn dập bị chặn lại bởi bộ đệm TCP.
+
+Chạy:
+    python main.py --serve --port 7878 --workers 4
+"""
+
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
+from consts import (
+    PARALLEL_WORKERS, SERVER_HOST, SERVER_PORT, SERVER_MAX_PENDING, SERVER_TIME_LIMIT,
+    PROTOCOL_MIN_MOVE_TIME
+)
+from ai import AIEngine
+from parallel import Snapshot, board_snapshot, board_from_snapshot
+from protocol import GomocupSession
+
+# Thời gian chờ thêm (giây) sau hạn chót trước khi coi worker là treo
+_GRACE_TIME = 1.0
+
+# Engine riêng của mỗi worker process (khởi tạo một lần trong _init_worker)
+_worker_engine: Optional[AIEngine] = None
+
+
+def _init_worker(engine_kwargs: dict[str, Any]) -> None:
+    global _worker_engine
+    _worker_engine = AIEngine(**engine_kwargs)
+
+
+def _search_move(snapshot: Snapshot, time_limit: float) -> Optional[tuple[int, int]]:
+    return _worker_engine.search(board_from_snapshot(snapshot), time_limit=time_limit).move
+
+
+class EngineServer:
+    """
+    Server TCP chơi nhiều ván cùng lúc trên một pool process.
+
+    Dùng `await server.start()` rồi `await server.serve_forever()` (hoặc
+    run_server()); `await server.close()` dừng nhận kết nối và tắt pool.
+
+    Attributes:
+        _time_limit: Giới hạn thời gian mỗi yêu cầu (giây)
+        _slots: Số lượt tìm được chạy cùng lúc (bằng số worker)
+        _pending: Số yêu cầu đang chờ hoặc đang chạy
+    """
+
+    __slots__ = ('_host', '_port', '_workers', '_max_pending', '_time_limit', '_engine_kwargs',
+                 '_pool', '_slots', '_pending', '_server')
+
+    def __init__(self, host: str = SERVER_HOST, port: int = SERVER_PORT,
+                 workers: int = PARALLEL_WORKERS, max_pending: int = SERVER_MAX_PENDING,
+                 time_limit: float = SERVER_TIME_LIMIT, **engine_kwargs: Any) -> None:
+        if workers < 1:
+            raise ValueError(f"workers phải >= 1, nhận {workers}")
+        if max_pending < workers:
+            raise ValueError(f"max_pending phải >= workers, nhận {max_pending}")
+        self._host: str = host
+        self._port: int = port
+        self._workers: int = workers
+        self._max_pending: int = max_pending
+        self._time_limit: float = time_limit
+        self._engine_kwargs: dict[str, Any] = engine_kwargs
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending: int = 0
+        self._server: Optional[asyncio.Server] = None
+
+    @property
+    def port(self) -> int:
+        """Cổng đang nghe (cổng thật nếu khởi tạo với port=0)."""
+        if self._server is not None:
+            return self._server.sockets[0].getsockname()[1]
+        return self._port
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def start(self) -> None:
+        """Tạo pool worker và bắt đầu nhận kết nối."""
+        self._pool = ProcessPoolExecutor(
+            max_workers=self._workers,
+            initializer=_init_worker,
+            initargs=(self._engine_kwargs,),
+        )
+        self._slots = asyncio.Semaphore(self._workers)
+        self._server = await asyncio.start_server(self._handle_client, self._host, self._port)
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = GomocupSession()
+        try:
+            while not session.finished:
+                line = await reader.readline()
+                if not line:
+                    break
+                replies, think = session.feed(line.decode('utf-8', errors='replace'))
+                if think:
+                    replies.append(await self._think(session))
+                for reply in replies:
+                    writer.write(reply.encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _think(self, session: GomocupSession) -> str:
+        # Hạn chót tính từ lúc nhận yêu cầu, kể cả thời gian chờ worker rảnh
+        move_time = session.move_time()
+        time_limit = self._time_limit if move_time is None else min(move_time, self._time_limit)
+        deadline = time.perf_counter() + time_limit
+        if self._pending >= self._max_pending:
+            session.cancel_turn()
+            return "ERROR server bận, thử lại sau"
+        self._pending += 1
+        try:
+            await self._slots.acquire()
+            remaining = max(PROTOCOL_MIN_MOVE_TIME, deadline - time.perf_counter())
+            try:
+                future = asyncio.get_running_loop().run_in_executor(
+                    self._pool, _search_move, board_snapshot(session.board), remaining
+                )
+            except Exception as e:
+                # Chưa có future để trả slot (vd: BrokenProcessPool): trả ngay kẻo mất slot vĩnh viễn
+                self._slots.release()
+                session.cancel_turn()
+                return f"ERROR lỗi engine: {e}"
+            # Worker chỉ nhận lượt mới khi lượt cũ thật sự xong, kể cả khi đã quá hạn
+            future.add_done_callback(lambda _: self._slots.release())
+            try:
+                move = await asyncio.wait_for(asyncio.shield(future), remaining + _GRACE_TIME)
+            except asyncio.TimeoutError:
+                session.cancel_turn()
+                return "ERROR hết thời gian tìm nước đi"
+            except Exception as e:
+                session.cancel_turn()
+                return f"ERROR lỗi engine: {e}"
+        finally:
+            self._pending -= 1
+        return session.play(move)
+
+
+def run_server(host: str = SERVER_HOST, port: int = SERVER_PORT, workers: int = PARALLEL_WORKERS,
+               max_pending: int = SERVER_MAX_PENDING, time_limit: float = SERVER_TIME_LIMIT,
+               **engine_kwargs: Any) -> None:
+    """Chạy EngineServer tới khi bị ngắt (Ctrl+C)."""
+    async def main() -> None:
+        server = EngineServer(host, port, workers, max_pending, time_limit, **engine_kwargs)
+        await server.start()
+        print(f"Engine server: {host}:{server.port}, {workers} worker, "
+              f"tối đa {max_pending} yêu cầu, {time_limit}s mỗi nước")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,40 @@
+"""
+Cấu hình chung cho pytest: đưa thư mục gốc của dự án vào sys.path (các
+module nằm phẳng ở gốc, không có package), fixture bàn cờ theo backend và
+bộ sinh thế cờ ngẫu nhiên.
+"""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from consts import HUMAN, AI  # noqa: E402
+from board import Board  # noqa: E402
+from bitboard import BitBoard  # noqa: E402
+
+
+def _random_board(rng, moves, exact=False):
+    # Thế cờ ngẫu nhiên dồn về giữa bàn để có nhiều chuỗi quân, X đi trước, hai bên luân phiên
+    board = Board(exact=exact)
+    player = HUMAN
+    center = board.size // 2
+    while board.move_count < moves:
+        row = min(board.size - 1, max(0, int(rng.gauss(center, 3))))
+        col = min(board.size - 1, max(0, int(rng.gauss(center, 3))))
+        if board.make_move(row, col, player):
+            player = AI if player == HUMAN else HUMAN
+    return board
+
+
+@pytest.fixture(params=[Board, BitBoard], ids=["list", "bitboard"])
+def board_type(request):
+    """Class bàn cờ của từng backend (Board, BitBoard), cùng API."""
+    return request.param
+
+
+@pytest.fixture
+def random_board():
+    """Hàm random_board(rng, moves, exact=False) -> Board có `moves` quân ngẫu nhiên."""
+    return _random_board
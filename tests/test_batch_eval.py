@@ -0,0 +1,38 @@
+"""
+evaluate_batch (NumPy) phải cho đúng điểm của AIEngine._evaluate_board trên
+từng thế cờ. Bỏ qua khi không có NumPy.
+"""
+
+import random
+import pytest
+from consts import AI
+from board import Board
+from ai import AIEngine
+
+pytest.importorskip("numpy")
+
+from batch_eval import boards_to_array, evaluate_batch, pattern_scores  # noqa: E402
+
+
+@pytest.mark.parametrize("exact", [False, True], ids=["freestyle", "exact"])
+def test_evaluate_batch_matches_engine(random_board, exact):
+    rng = random.Random(0)
+    boards = [random_board(rng, rng.randint(0, 80), exact) for _ in range(200)]
+    batch = evaluate_batch(boards_to_array(boards), exact=exact)
+    engine = AIEngine(opening_book=None)
+    for board, score in zip(boards, batch):
+        engine._set_search_board(board)
+        assert engine._evaluate_board() == pytest.approx(score, rel=1e-9)
+
+
+def test_pattern_scores_broken_shapes():
+    # X_XX và XX_XX được chấm như Board (ba / bốn gián đoạn)
+    boards = []
+    for cols in ((5, 7, 8), (4, 5, 7, 8)):
+        board = Board()
+        for col in cols:
+            board.make_move(7, col, AI)
+        boards.append(board)
+    human_scores, ai_scores = pattern_scores(boards_to_array(boards))
+    assert ai_scores.tolist() == [board.heuristic_score(AI) for board in boards]
+    assert human_scores.tolist() == [0, 0]
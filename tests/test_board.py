@@ -0,0 +1,48 @@
+"""
+Ngăn xếp nước đi của bàn cờ: push/pop/takeback và undo_move chỉ nhận nước
+cuối cùng, trên cả hai backend.
+"""
+
+import pytest
+from consts import HUMAN, AI
+from protocol import GomocupSession
+
+
+def test_undo_only_last_move(board_type):
+    board = board_type()
+    board.push(7, 7, HUMAN)
+    board.push(7, 8, AI)
+    with pytest.raises(ValueError):
+        board.undo_move(7, 7)
+    with pytest.raises(ValueError):
+        board.undo_move(0, 0)
+    assert board.history == [(7, 7), (7, 8)]
+    board.undo_move(7, 8)
+    assert board.pop() == (7, 7)
+    assert board.pop() is None
+    with pytest.raises(ValueError):
+        board.undo_move(7, 7)
+
+
+def test_takeback_restores_state(board_type):
+    board = board_type()
+    board.push(7, 7, HUMAN)
+    snapshot = (board.zobrist_hash, board.heuristic_score(AI), board.heuristic_score(HUMAN),
+                set(board.neighbor_cells()), board.history[:])
+    board.push(6, 6, AI)
+    board.push(8, 8, HUMAN)
+    assert board.takeback(2) == [(8, 8), (6, 6)]
+    assert (board.zobrist_hash, board.heuristic_score(AI), board.heuristic_score(HUMAN),
+            set(board.neighbor_cells()), board.history) == snapshot
+
+
+def test_protocol_takeback_only_last_move():
+    session = GomocupSession()
+    session.feed("START 15")
+    session.feed("PLAY 7,7")
+    session.feed("PLAY 8,8")
+    replies, _ = session.feed("TAKEBACK 7,7")
+    assert replies[0].startswith("ERROR")
+    replies, _ = session.feed("TAKEBACK 8,8")
+    assert replies == ["OK"]
+    assert session.board.history == [(7, 7)]
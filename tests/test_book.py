@@ -0,0 +1,49 @@
+"""
+Sách khai cuộc: file thiếu hoặc hỏng được coi như sách rỗng, không làm
+hỏng lượt tìm của AIEngine.
+"""
+
+import logging
+import pytest
+from consts import HUMAN
+from board import Board
+from book import OpeningBook, write_book, BOOK_MAGIC, _HEADER
+from ai import AIEngine
+
+
+def opening():
+    board = Board()
+    board.make_move(7, 7, HUMAN)
+    return board
+
+
+@pytest.mark.parametrize("content", [
+    b"",
+    b"CB",
+    b"XXXX" + bytes(_HEADER.size),
+    _HEADER.pack(BOOK_MAGIC, 1, 1024, 1),
+], ids=["empty", "truncated-header", "wrong-magic", "truncated-slots"])
+def test_bad_book_is_empty(tmp_path, caplog, content):
+    path = tmp_path / "book.bin"
+    path.write_bytes(content)
+    book = OpeningBook(str(path))
+    with caplog.at_level(logging.WARNING):
+        assert book.probe(opening()) is None
+    assert len(book) == 0
+    assert "sách khai cuộc" in caplog.text
+    # AIEngine vẫn tìm được nước đi với sách hỏng
+    result = AIEngine(depth=1, opening_book=book).search(opening())
+    assert result.move is not None
+
+
+def test_book_roundtrip(tmp_path):
+    board = opening()
+    key, symmetry = board.canonical_hash()
+    path = tmp_path / "book.bin"
+    write_book(str(path), {key: ((6, 6), 4, 10)})
+    book = OpeningBook(str(path))
+    assert len(book) == 1
+    assert book.probe(Board()) is None
+    move, depth, score = book.probe(board)
+    assert board.is_valid_move(*move) and (depth, score) == (4, 10)
+    book.close()
@@ -0,0 +1,37 @@
+"""
+Ảnh chụp bàn cờ gửi giữa các process (parallel.board_snapshot) phải giữ
+nguyên thế cờ lẫn thứ tự nước đi (history / last_move).
+"""
+
+import random
+import pytest
+from compact import CompactBoard
+from parallel import board_snapshot, board_from_snapshot
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_snapshot_keeps_move_order(random_board, seed):
+    rng = random.Random(seed)
+    board = random_board(rng, rng.randint(1, 60))
+    restored = board_from_snapshot(board_snapshot(board))
+    assert restored.history == board.history
+    assert restored.last_move == board.last_move
+    assert restored.grid == board.grid
+    assert restored.zobrist_hash == board.zobrist_hash
+
+
+def test_decode_rejects_foreign_move_stack(random_board):
+    board = random_board(random.Random(0), 10)
+    compact = CompactBoard.from_board(board)
+    other = CompactBoard.from_board(random_board(random.Random(1), 10))
+    with pytest.raises(ValueError):
+        CompactBoard.decode(compact.encode(), moves=other.move_stack())
+
+
+def test_compact_board_is_unhashable(random_board):
+    board = random_board(random.Random(2), 6)
+    compact = CompactBoard.from_board(board)
+    assert compact == CompactBoard.decode(compact.encode())
+    with pytest.raises(TypeError):
+        hash(compact)
+    assert {compact.encode(): 1}[CompactBoard.from_board(board).encode()] == 1
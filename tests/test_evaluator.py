@@ -0,0 +1,64 @@
+"""
+Đối chiếu điểm heuristic tăng dần (_evaluate_board) với bản quét toàn bộ
+bàn cờ (_evaluate_board_full) sau các chuỗi make/undo ngẫu nhiên, và kiểm
+tra điểm của các hình gián đoạn (X_XX, XX_XX) ở nút lá.
+"""
+
+import random
+import pytest
+from consts import (
+    HUMAN, AI, EMPTY_CODE, HUMAN_CODE, AI_CODE,
+    SCORE_CLOSED_FOUR, SCORE_OPEN_THREE, SCORE_CLOSED_THREE, SCORE_OPEN_TWO, SCORE_ONE
+)
+from ai import AIEngine
+from evaluator import score_cells
+from geometry import get_geometry
+
+
+@pytest.mark.parametrize("exact", [False, True], ids=["freestyle", "exact"])
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_matches_full_scan(board_type, exact, seed):
+    rng = random.Random(seed)
+    engine = AIEngine(depth=1, opening_book=None)
+    board = board_type(exact=exact)
+    engine._set_search_board(board)
+    board = engine._board
+    for _ in range(300):
+        if board.history and rng.random() < 0.35:
+            row, col = board.last_move
+            board.undo_move(row, col)
+        else:
+            row, col = rng.randrange(board.size), rng.randrange(board.size)
+            board.make_move(row, col, rng.choice((HUMAN, AI)))
+        assert engine._evaluate_board() == engine._evaluate_board_full()
+
+
+_ = EMPTY_CODE
+X = AI_CODE
+O = HUMAN_CODE
+
+
+@pytest.mark.parametrize("cells, exact, expected", [
+    ([_, X, _, X, X, _, _], False, SCORE_OPEN_THREE),
+    ([O, X, _, X, X, _, _], False, SCORE_CLOSED_THREE),
+    ([_, X, X, _, X, X, _], False, SCORE_CLOSED_FOUR),
+    ([_, X, _, X, X, X, _], True, SCORE_CLOSED_FOUR),
+    # Luật chính xác: lấp ô trống thành sáu quân nên không phải bốn
+    ([_, X, X, X, _, X, X, _], True, SCORE_OPEN_THREE + SCORE_OPEN_TWO),
+], ids=["broken-three", "closed-broken-three", "split-four", "split-four-exact", "exact-overline"])
+def test_score_cells_broken_shapes(cells, exact, expected):
+    geometry = get_geometry(exact=exact)
+    human_score, ai_score = score_cells(cells, geometry)
+    assert ai_score == expected
+
+
+@pytest.mark.parametrize("cols, shape_score", [
+    ((5, 7, 8), SCORE_OPEN_THREE),
+    ((4, 5, 7, 8), SCORE_CLOSED_FOUR),
+], ids=["X_XX", "XX_XX"])
+def test_leaf_scores_broken_shapes(board_type, cols, shape_score):
+    board = board_type()
+    for col in cols:
+        board.make_move(7, col, AI)
+    # Ba đường còn lại qua mỗi quân chỉ có một quân lẻ, hai đầu trống
+    assert board.heuristic_score(AI) == shape_score + 3 * len(cols) * SCORE_ONE
@@ -0,0 +1,49 @@
+"""
+Frontier (neighbor_cells) so với quét lại vùng 5x5 quanh mọi quân, sau các
+chuỗi make / undo / pop / clone / reset ngẫu nhiên.
+"""
+
+import random
+import pytest
+from consts import EMPTY, HUMAN, AI, NEIGHBOR_RADIUS
+
+
+def rescan_neighbors(board, radius=NEIGHBOR_RADIUS):
+    # Các ô trống trong vùng (2 * radius + 1)^2 quanh một quân bất kỳ
+    size = board.size
+    cells = set()
+    for row in range(size):
+        for col in range(size):
+            if board.get_cell(row, col) == EMPTY:
+                continue
+            for r in range(max(0, row - radius), min(size, row + radius + 1)):
+                for c in range(max(0, col - radius), min(size, col + radius + 1)):
+                    if board.get_cell(r, c) == EMPTY:
+                        cells.add((r, c))
+    return cells
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_frontier_matches_rescan(board_type, seed):
+    rng = random.Random(seed)
+    board = board_type()
+    for _ in range(300):
+        action = rng.random()
+        if action < 0.2 and board.history:
+            row, col = board.last_move
+            board.undo_move(row, col)
+        elif action < 0.35:
+            board.pop()
+        elif action < 0.4:
+            # Bản sao phải độc lập: sửa bản gốc không được làm lệch frontier của bản sao
+            original = board
+            board = board.clone()
+            original.make_move(rng.randrange(original.size), rng.randrange(original.size), HUMAN)
+            assert original.neighbor_cells() == rescan_neighbors(original)
+        elif action < 0.42:
+            board.reset()
+        else:
+            board.make_move(rng.randrange(board.size), rng.randrange(board.size), rng.choice((HUMAN, AI)))
+        assert board.neighbor_cells() == rescan_neighbors(board)
+        assert board.frontier == board.neighbor_cells()
+        assert board.neighbor_cells(1) == rescan_neighbors(board, 1)
@@ -0,0 +1,15 @@
+"""
+Thống kê chi tiết của AIEngine: mỗi khoảng thời gian chỉ được tính vào
+một bộ đếm (không đo lồng nhau).
+"""
+
+from ai import AIEngine
+from benchmark import POSITIONS, load_position
+
+
+def test_timers_do_not_overlap():
+    engine = AIEngine(depth=3, instrument=True, opening_book=None)
+    stats = engine.search(load_position(POSITIONS[0])).stats
+    assert stats.detailed
+    assert stats.candidate_lists > 0 and stats.leaf_evals > 0
+    assert stats.eval_time + stats.movegen_time <= stats.elapsed
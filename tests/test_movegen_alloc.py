@@ -0,0 +1,42 @@
+"""
+Bộ nhớ cấp phát khi sinh nước đi theo giai đoạn (_staged_moves), đo bằng
+tracemalloc: node bị cắt ngay sau nước đầu tiên không được dựng danh sách
+ứng viên đầy đủ.
+"""
+
+import tracemalloc
+import pytest
+from consts import HUMAN, AI
+from ai import AIEngine
+from benchmark import POSITIONS, load_position
+
+# Đỉnh cấp phát tối đa (byte) mỗi node khi chỉ lấy nước đầu tiên: đủ cho
+# generator và frame của nó, nhỏ hơn nhiều so với danh sách ứng viên (~6 KB)
+STAGED_FIRST_MOVE_PEAK = 2048
+
+
+def peak_allocation(action):
+    # Bộ nhớ cấp phát thêm ở đỉnh (byte) trong lúc chạy action
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    action()
+    return tracemalloc.get_traced_memory()[1] - before
+
+
+@pytest.mark.parametrize("position", POSITIONS[:3], ids=["p0", "p1", "p2"])
+def test_staged_first_move_peak(position):
+    engine = AIEngine(depth=2, threat_search=False, opening_book=None)
+    # Tìm trước để bảng history/killer và bộ đệm theo ply đã có dữ liệu thật
+    engine.search(load_position(position))
+    board = engine._board
+    first_move = lambda: next(engine._staged_moves(HUMAN, 1, None, None))
+    tracemalloc.start()
+    try:
+        for row, col in sorted(board.neighbor_cells()):
+            board.make_move(row, col, AI)
+            first_move()  # Lần chạy đầu cho bộ đệm theo ply đủ lớn
+            peak = peak_allocation(first_move)
+            board.undo_move(row, col)
+            assert peak <= STAGED_FIRST_MOVE_PEAK, f"{peak} byte ở node {(row, col)}"
+    finally:
+        tracemalloc.stop()
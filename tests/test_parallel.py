@@ -0,0 +1,48 @@
+"""
+ParallelAIEngine phải cho cùng nước và điểm với AIEngine tuần tự ở cùng độ
+sâu, và dừng được bằng stop_event. Bỏ qua khi không tạo được process pool.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+import pytest
+from ai import AIEngine, SearchTimeout
+from benchmark import POSITIONS, load_position
+from parallel import ParallelAIEngine
+
+# Solver đe dọa có giới hạn thời gian riêng nên tắt để kết quả chỉ phụ thuộc độ sâu
+ENGINE_KWARGS = {"threat_search": False, "opening_book": None}
+
+
+@pytest.fixture(scope="module")
+def parallel_engine():
+    engine = ParallelAIEngine(workers=2, depth=3, **ENGINE_KWARGS)
+    try:
+        engine._get_pool().submit(int).result(timeout=30)
+    except (ImportError, OSError, NotImplementedError) as e:
+        engine.close()
+        pytest.skip(f"không tạo được process pool: {e}")
+    yield engine
+    engine.close()
+
+
+@pytest.mark.parametrize("position", POSITIONS[:3], ids=["p0", "p1", "p2"])
+def test_parallel_matches_serial(parallel_engine, position):
+    serial = AIEngine(depth=3, **ENGINE_KWARGS).search(load_position(position))
+    parallel = parallel_engine.search(load_position(position))
+    assert (parallel.move, parallel.score) == (serial.move, serial.score)
+
+
+def test_stop_event_interrupts_wait():
+    # Task chưa xong (không bao giờ xong): chờ kết quả phải dừng khi stop_event được set
+    engine = ParallelAIEngine(workers=1, **ENGINE_KWARGS)
+    stop = threading.Event()
+    engine._stop_event = stop
+    pending = [Future(), Future()]
+    threading.Timer(0.05, stop.set).start()
+    start = time.perf_counter()
+    with pytest.raises(SearchTimeout):
+        engine._wait_result(pending[0], pending)
+    assert time.perf_counter() - start < 1.0
+    assert all(future.cancelled() for future in pending)
@@ -0,0 +1,36 @@
+"""
+AIEngine.search: giới hạn thời gian được tôn trọng (kể cả phần ThreatSolver
+chạy trước minimax), và PVS cho cùng kết quả với alpha-beta.
+"""
+
+import time
+import pytest
+from ai import AIEngine
+from benchmark import POSITIONS, load_position
+
+TIME_LIMIT = 0.05
+
+
+@pytest.mark.parametrize("position", POSITIONS[:3], ids=["p0", "p1", "p2"])
+def test_time_limit_with_threat_search(position):
+    board = load_position(position)
+    engine = AIEngine(time_limit=TIME_LIMIT, threat_search=True, opening_book=None)
+    start = time.perf_counter()
+    result = engine.search(board)
+    elapsed = time.perf_counter() - start
+    # Vượt một chút là bình thường (kiểm tra giờ theo chu kỳ node), gấp đôi thì không
+    assert elapsed < 2 * TIME_LIMIT
+    assert result.depth >= 1
+    assert board.is_valid_move(*result.move)
+
+
+@pytest.mark.parametrize("position", POSITIONS, ids=[f"p{i}" for i in range(len(POSITIONS))])
+def test_pvs_matches_alphabeta(position):
+    # Cùng độ sâu, PVS (cửa sổ rỗng + aspiration) phải cho cùng nước và điểm với alpha-beta
+    results = {
+        algorithm: AIEngine(depth=3, algorithm=algorithm, threat_search=False,
+                            opening_book=None).search(load_position(position))
+        for algorithm in ("alphabeta", "pvs")
+    }
+    assert results["pvs"].move == results["alphabeta"].move
+    assert results["pvs"].score == results["alphabeta"].score
@@ -0,0 +1,30 @@
+"""
+EngineServer phải trả slot worker và trả lời "ERROR" khi không gửi được
+lượt tìm sang pool (pool đã hỏng hoặc đã tắt).
+"""
+
+import asyncio
+from server import EngineServer
+
+
+def test_failed_submit_releases_slot():
+    async def scenario():
+        server = EngineServer(host="127.0.0.1", port=0, workers=1, max_pending=1)
+        await server.start()
+        try:
+            # Pool đã tắt: run_in_executor raise ngay, trước khi có future
+            server._pool.shutdown()
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"START 15\n")
+            assert (await asyncio.wait_for(reader.readline(), 5)).startswith(b"OK")
+            # Lần hai chỉ trả lời được nếu slot của lần đầu đã được trả
+            for _ in range(2):
+                writer.write(b"BEGIN\n")
+                reply = await asyncio.wait_for(reader.readline(), 5)
+                assert reply.startswith(b"ERROR")
+            assert server.pending == 0
+            writer.close()
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
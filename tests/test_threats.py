@@ -0,0 +1,71 @@
+"""
+ThreatSolver trên các thế cờ biết trước: thắng bằng VCF (chỉ đi bốn), thắng
+bằng VCT (cần ba mở), và thế cờ không có chuỗi thắng cưỡng bức.
+"""
+
+import threading
+from consts import HUMAN, AI
+from board import Board
+from threats import ThreatSolver
+
+# Quân X ở xa, chỉ để số quân hai bên xấp xỉ nhau
+_FAR_HUMAN = ((0, 0), (0, 14), (14, 0))
+
+
+def position(ai_cells, human_cells=()):
+    board = Board()
+    for row, col in ai_cells:
+        board.make_move(row, col, AI)
+    for row, col in tuple(human_cells) + _FAR_HUMAN:
+        board.make_move(row, col, HUMAN)
+    return board
+
+
+def assert_winning_line(board, line, attacker=AI):
+    # Đánh lại chuỗi (tấn công/phòng thủ xen kẽ): chỉ nước cuối mới thắng, và là của bên tấn công
+    board = board.clone()
+    defender = HUMAN if attacker == AI else AI
+    for index, (row, col) in enumerate(line):
+        player = attacker if index % 2 == 0 else defender
+        assert board.make_move(row, col, player)
+        winner = board.check_winner(row, col)
+        assert winner == (attacker if index == len(line) - 1 else None)
+
+
+# Hai ba bị chặn một đầu cắt nhau ở (7, 8): đánh vào đó thành hai bốn
+VCF = position([(7, 5), (7, 6), (7, 7), (4, 8), (5, 8), (6, 8)], [(7, 4), (3, 8)])
+# Hai hai mở cắt nhau ở (7, 8): đánh vào đó thành hai ba mở, chưa có bốn nào
+VCT = position([(7, 6), (7, 7), (5, 8), (6, 8)])
+# Quân rời rạc, không có chuỗi thắng cưỡng bức
+QUIET = position([(7, 7), (5, 10), (10, 4)], [(7, 8), (6, 6)])
+
+
+def test_vcf():
+    line = ThreatSolver(use_threes=False).solve(VCF, AI)
+    assert line is not None and line[0] == (7, 8)
+    assert_winning_line(VCF, line)
+
+
+def test_vct_needs_threes():
+    assert ThreatSolver(use_threes=False).solve(VCT, AI) is None
+    line = ThreatSolver().solve(VCT, AI)
+    assert line is not None
+    assert_winning_line(VCT, line)
+
+
+def test_no_forced_win():
+    assert ThreatSolver().solve(QUIET, AI) is None
+    assert ThreatSolver().solve(QUIET, HUMAN) is None
+
+
+def test_solve_leaves_board_unchanged():
+    history = VCT.history[:]
+    key = VCT.zobrist_hash
+    ThreatSolver().solve(VCT, AI)
+    assert VCT.history == history and VCT.zobrist_hash == key
+
+
+def test_stop_event_aborts():
+    stop = threading.Event()
+    stop.set()
+    assert ThreatSolver(time_limit=None).solve(VCT, AI, stop_event=stop) is None
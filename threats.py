@@ -0,0 +1,390 @@
+"""
+threats.py - Nhận diện hình cờ đe dọa và tìm kiếm trong không gian đe dọa.
+
+- shape_at: hình sẽ tạo ra nếu đánh vào một ô trống, tra bảng cửa sổ 9 ô
+  của patterns.py (gồm cả ba/bốn gián đoạn), dùng cho sắp xếp nước đi
+  của AIEngine. shape_tables/SHAPE_BY_WEIGHT cho phép vòng lặp nóng tự
+  tra bảng, đọc cửa sổ một lần cho cả hai người chơi.
+- gain_cells / three_defenses: ô hoàn thành năm và ô chặn ba mở, xét cả
+  hình gián đoạn (XX_XX, X_XX_...).
+  "Năm", "bốn", "ba" tính theo win_length của Geometry (thiếu 0, 1, 2 quân).
+- ThreatSolver: tìm chuỗi thắng cưỡng bức VCF (liên tục bốn) và VCT (bốn
+  hoặc ba mở) trước khi chạy minimax.
+"""
+
+import threading
+import time
+from typing import Optional
+from consts import EMPTY, HUMAN, AI, THREAT_MAX_NODES, THREAT_TIME_LIMIT, THREAT_MAX_DEPTH
+from board import Board
+from geometry import Geometry
+from patterns import (
+    pattern_tables, WINDOW_MASK, CLASS_OPEN_THREE, CLASS_FOUR, CLASS_OPEN_FOUR, CLASS_FIVE
+)
+
+# Hình cờ tạo ra khi đánh vào một ô (giá trị càng lớn càng nguy hiểm)
+SHAPE_NONE: int = 0
+SHAPE_OPEN_THREE: int = 1   # Ba mở hai đầu
+SHAPE_FOUR: int = 2         # Bốn bị chặn một đầu
+SHAPE_OPEN_FOUR: int = 3    # Bốn mở, hai bốn, hoặc bốn + ba mở (thắng nếu đối thủ không có bốn)
+SHAPE_FIVE: int = 4         # Năm quân: thắng ngay
+
+# Trọng số của lớp hình trên một hướng; tổng của 4 hướng tra SHAPE_BY_WEIGHT
+_WEIGHT_THREE = 1
+_WEIGHT_FOUR = 8
+_WEIGHT_FIVE = 128
+_CLASS_WEIGHTS: bytes = bytes(
+    _WEIGHT_FIVE if shape == CLASS_FIVE
+    else 2 * _WEIGHT_FOUR if shape == CLASS_OPEN_FOUR
+    else _WEIGHT_FOUR if shape == CLASS_FOUR
+    else _WEIGHT_THREE if shape == CLASS_OPEN_THREE
+    else 0
+    for shape in range(256)
+)
+_SHAPE_TABLES: dict[int, dict[str, bytes]] = {}
+
+
+def shape_at(board: Board, row: int, col: int, player: str) -> int:
+    """
+    Hình cờ mạnh nhất mà `player` tạo ra nếu đánh vào ô trống (row, col).
+
+    Mỗi hướng là một lần tra bảng theo cửa sổ 9 ô (Board.line_codes); bốn
+    mở hoặc hai ô thắng trên một hướng tính như hai bốn. Luật không có
+    bảng (luật chính xác) dùng _scan_shape.
+
+    Args:
+        board: Bàn cờ
+        row: Chỉ số hàng
+        col: Chỉ số cột
+        player: Người chơi (HUMAN hoặc AI)
+
+    Returns:
+        Một trong các hằng SHAPE_*
+    """
+    geometry = board.geometry
+    tables = shape_tables(geometry)
+    if tables is None:
+        return _scan_shape(geometry, board.grid, row, col, player)
+    table = tables[player]
+    codes = board.line_codes
+    weight = 0
+    for line, shift in geometry.window_slots[row][col]:
+        weight += table[(codes[line] >> shift) & WINDOW_MASK]
+    return SHAPE_BY_WEIGHT[weight]
+
+
+def shape_tables(geometry: Geometry) -> Optional[dict[str, bytes]]:
+    """
+    Bảng trọng số hình theo cửa sổ 9 ô của từng người chơi (None nếu luật
+    không có bảng, xem pattern_tables).
+
+    Tổng trọng số của 4 cửa sổ quanh một ô tra SHAPE_BY_WEIGHT ra hình
+    giống shape_at.
+    """
+    tables = pattern_tables(geometry)
+    if tables is None:
+        return None
+    weights = _SHAPE_TABLES.get(geometry.win_length)
+    if weights is None:
+        weights = _SHAPE_TABLES[geometry.win_length] = {
+            player: table.translate(_CLASS_WEIGHTS) for player, table in tables.items()
+        }
+    return weights
+
+
+def _combine(fours: int, threes: int) -> int:
+    if fours >= 2 or (fours and threes):
+        return SHAPE_OPEN_FOUR
+    if fours:
+        return SHAPE_FOUR
+    if threes:
+        return SHAPE_OPEN_THREE
+    return SHAPE_NONE
+
+
+# Bốn mở (hai bốn trên một hướng) hoặc hai bốn, bốn + ba mở đều là SHAPE_OPEN_FOUR
+SHAPE_BY_WEIGHT: tuple[int, ...] = tuple(
+    SHAPE_FIVE if weight >= _WEIGHT_FIVE
+    else _combine(weight // _WEIGHT_FOUR, weight % _WEIGHT_FOUR)
+    for weight in range(4 * _WEIGHT_FIVE + 1)
+)
+
+
+def _scan_shape(geometry: Geometry, grid: list[list[str]], row: int, col: int, player: str) -> int:
+    # Quét chuỗi liên tiếp theo tia quanh ô (không nhận hình gián đoạn)
+    win_length = geometry.win_length
+    exact = geometry.exact
+    fours = threes = 0
+    for forward, backward in geometry.rays[row][col]:
+        count = 1
+        open_ends = 0
+        for r, c in forward:
+            cell = grid[r][c]
+            if cell != player:
+                if cell == EMPTY: open_ends += 1
+                break
+            count += 1
+        for r, c in backward:
+            cell = grid[r][c]
+            if cell != player:
+                if cell == EMPTY: open_ends += 1
+                break
+            count += 1
+        if count == win_length or (count > win_length and not exact):
+            return SHAPE_FIVE
+        if count == win_length - 1:
+            fours += open_ends        # Bốn mở tính như hai bốn
+        elif count == win_length - 2 and open_ends == 2:
+            threes += 1
+    return _combine(fours, threes)
+
+
+def gain_cells(geometry: Geometry, grid: list[list[str]], row: int, col: int,
+               player: str) -> list[tuple[int, int]]:
+    """
+    Các ô trống hoàn thành năm quân nếu `player` có quân tại (row, col).
+
+    Xét mọi cửa sổ win_length ô đi qua (row, col): cửa sổ thiếu đúng một
+    quân của player thì ô trống đó là ô thắng (gồm cả bốn gián đoạn XX_XX).
+    Với luật chính xác, hai ô ngay ngoài cửa sổ không được là quân của
+    player (nếu không sẽ thành chuỗi quá dài). Danh sách khác rỗng nghĩa
+    là nước đi tạo ra "bốn".
+    """
+    win_length = geometry.win_length
+    exact = geometry.exact
+    gains: list[tuple[int, int]] = []
+    for cells, center in geometry.segments[row][col]:
+        # Lọc nhanh: bốn cần ít nhất một quân cùng màu cách tối đa 2 ô
+        near = False
+        for k in (center - 2, center - 1, center + 1, center + 2):
+            if 0 <= k < len(cells):
+                r, c = cells[k]
+                if grid[r][c] == player:
+                    near = True
+                    break
+        if not near:
+            continue
+        for start in range(max(0, center - win_length + 1), min(center, len(cells) - win_length) + 1):
+            if exact and _extends(grid, cells, start, start + win_length - 1, player):
+                continue
+            empty = None
+            blocked = False
+            for k in range(start, start + win_length):
+                if k == center:
+                    continue
+                r, c = cells[k]
+                cell = grid[r][c]
+                if cell == EMPTY:
+                    if empty is not None:
+                        blocked = True
+                        break
+                    empty = cells[k]
+                elif cell != player:
+                    blocked = True
+                    break
+            if not blocked and empty is not None and empty not in gains:
+                gains.append(empty)
+    return gains
+
+
+def _extends(grid: list[list[str]], cells: list[tuple[int, int]], first: int, last: int, player: str) -> bool:
+    # Ô liền trước first hoặc liền sau last là quân của player
+    for k in (first - 1, last + 1):
+        if 0 <= k < len(cells):
+            r, c = cells[k]
+            if grid[r][c] == player:
+                return True
+    return False
+
+
+def three_defenses(geometry: Geometry, grid: list[list[str]], row: int, col: int,
+                   player: str) -> list[tuple[int, int]]:
+    """
+    Các ô chặn ba mở mà `player` tạo ra nếu có quân tại (row, col).
+
+    Ba mở là cửa sổ 6 ô có hai đầu trống, 4 ô giữa gồm 3 quân của player
+    (kể cả ô gốc) và 1 ô trống: đánh vào ô trống đó sẽ thành bốn mở. Kết
+    quả là mọi ô trống của các cửa sổ như vậy; rỗng nếu không có ba mở.
+    """
+    defenses: list[tuple[int, int]] = []
+    win_length = geometry.win_length
+    span = win_length + 1
+    for cells, center in geometry.segments[row][col]:
+        for start in range(max(0, center - span + 2), min(center - 1, len(cells) - span) + 1):
+            empties = []
+            own = 0
+            for k in range(start, start + span):
+                r, c = cells[k]
+                cell = player if k == center else grid[r][c]
+                if cell == EMPTY:
+                    empties.append(cells[k])
+                elif cell == player and start < k < start + span - 1:
+                    own += 1
+                else:
+                    break
+            else:
+                if own == win_length - 2 and len(empties) == 3:
+                    first, last = cells[start], cells[start + span - 1]
+                    if first in empties and last in empties:
+                        for cell in empties:
+                            if cell not in defenses:
+                                defenses.append(cell)
+    return defenses
+
+
+class _SolverAbort(Exception):
+    """Vượt giới hạn node hoặc thời gian của ThreatSolver."""
+
+
+class ThreatSolver:
+    """
+    Tìm chuỗi thắng cưỡng bức trong không gian đe dọa.
+
+    Bên tấn công chỉ đi các nước tạo bốn (VCF) hoặc bốn/ba mở (VCT); bên
+    phòng thủ chỉ được xét các nước chặn bắt buộc (và các nước tạo bốn để
+    phản công khi bị dọa bằng ba mở). Chiến thắng của cả hai bên được xác
+    nhận bằng Board.check_winner. Có giới hạn node và thời gian riêng;
+    người gọi có thể rút ngắn hạn chót và dừng qua stop_event (xem solve).
+    """
+
+    __slots__ = ('_max_nodes', '_time_limit', '_max_depth', '_use_threes',
+                 '_nodes', '_deadline', '_stop_event', '_board', '_failed')
+
+    def __init__(self, max_nodes: int = THREAT_MAX_NODES,
+                 time_limit: Optional[float] = THREAT_TIME_LIMIT,
+                 max_depth: int = THREAT_MAX_DEPTH, use_threes: bool = True) -> None:
+        self._max_nodes: int = max_nodes
+        self._time_limit: Optional[float] = time_limit
+        self._max_depth: int = max_depth
+        self._use_threes: bool = use_threes
+        self._nodes: int = 0
+        self._deadline: Optional[float] = None
+        self._stop_event: Optional[threading.Event] = None
+        self._board: Optional[Board] = None
+        self._failed: dict[tuple[int, bool], int] = {}
+
+    @property
+    def nodes(self) -> int:
+        """Số node của lần solve gần nhất."""
+        return self._nodes
+
+    def solve(self, board: Board, attacker: str, deadline: Optional[float] = None,
+              stop_event: Optional[threading.Event] = None) -> Optional[list[tuple[int, int]]]:
+        """
+        Tìm chuỗi thắng cưỡng bức cho `attacker` (đang tới lượt).
+
+        Args:
+            board: Bàn cờ (không bị thay đổi)
+            attacker: Bên tấn công (HUMAN hoặc AI)
+            deadline: Hạn chót theo time.perf_counter(); solver dừng ở hạn
+                sớm hơn giữa nó và time_limit riêng
+            stop_event: Dừng ngay khi được set (từ thread khác)
+
+        Returns:
+            Chuỗi nước xen kẽ tấn công/phòng thủ kết thúc bằng nước thành
+            năm, hoặc None nếu không tìm thấy trong giới hạn
+        """
+        # Solver đọc board.grid sống trong lúc đánh thử nên luôn chạy trên Board
+        self._board = board.clone() if isinstance(board, Board) else board.to_board()
+        self._nodes = 0
+        self._failed = {}
+        self._deadline = time.perf_counter() + self._time_limit if self._time_limit is not None else None
+        if deadline is not None:
+            self._deadline = deadline if self._deadline is None else min(self._deadline, deadline)
+        self._stop_event = stop_event
+        defender = HUMAN if attacker == AI else AI
+        try:
+            # VCF trước (hẹp, rẻ), sau đó VCT; sâu dần để ưu tiên chuỗi ngắn
+            for threes in ((False, True) if self._use_threes else (False,)):
+                for depth in range(1, self._max_depth + 1):
+                    line = self._attack(attacker, defender, depth, threes)
+                    if line is not None:
+                        return line
+        except _SolverAbort:
+            pass
+        finally:
+            self._board = None
+            self._stop_event = None
+        return None
+
+    def _tick(self) -> None:
+        self._nodes += 1
+        if self._nodes > self._max_nodes:
+            raise _SolverAbort
+        # Mỗi node của solver tốn cỡ mili giây (quét frontier, tra hình) nên kiểm tra ở mọi node
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise _SolverAbort
+        if self._stop_event is not None and self._stop_event.is_set():
+            raise _SolverAbort
+
+    def _attack(self, attacker: str, defender: str, depth: int,
+                threes: bool) -> Optional[list[tuple[int, int]]]:
+        self._tick()
+        board = self._board
+        geometry = board.geometry
+        grid = board.grid
+        cells = sorted(board.frontier)
+
+        for row, col in cells:
+            if shape_at(board, row, col, attacker) == SHAPE_FIVE:
+                # Bảng hình chỉ báo trước; nước kết thúc được xác nhận bằng check_winner
+                board.make_move(row, col, attacker)
+                won = board.check_winner(row, col) == attacker
+                board.undo_move(row, col)
+                if won:
+                    return [(row, col)]
+        if depth == 0:
+            return None
+        key = (board.zobrist_hash, threes)
+        if self._failed.get(key, -1) >= depth:
+            return None
+
+        # Đối thủ có ô thắng ngay: bắt buộc phải chặn (và nước chặn phải là đe dọa)
+        blocks = [cell for cell in cells if shape_at(board, cell[0], cell[1], defender) == SHAPE_FIVE]
+        if len(blocks) > 1:
+            self._failed[key] = depth
+            return None
+
+        for move in (blocks or cells):
+            row, col = move
+            defenses = gain_cells(geometry, grid, row, col, attacker)
+            is_three = False
+            if not defenses and threes and not blocks:
+                defenses = three_defenses(geometry, grid, row, col, attacker)
+                is_three = True
+            if not defenses:
+                continue
+            board.make_move(row, col, attacker)
+            if is_three:
+                # Trước ba mở, đối thủ còn có thể phản công bằng một nước tạo bốn
+                defenses = defenses + [
+                    cell for cell in sorted(board.frontier)
+                    if cell not in defenses and gain_cells(geometry, grid, cell[0], cell[1], defender)
+                ]
+            line = self._defend(attacker, defender, depth, threes, defenses)
+            board.undo_move(row, col)
+            if line is not None:
+                return [move] + line
+
+        self._failed[key] = depth
+        return None
+
+    def _defend(self, attacker: str, defender: str, depth: int, threes: bool,
+                defenses: list[tuple[int, int]]) -> Optional[list[tuple[int, int]]]:
+        # Mọi nước phòng thủ đều phải thua thì chuỗi tấn công mới thành công
+        board = self._board
+        principal: Optional[list[tuple[int, int]]] = None
+        for row, col in defenses:
+            if not board.is_valid_move(row, col):
+                continue
+            board.make_move(row, col, defender)
+            if board.check_winner(row, col) == defender:
+                line = None
+            else:
+                line = self._attack(attacker, defender, depth - 1, threes)
+            board.undo_move(row, col)
+            if line is None:
+                return None
+            if principal is None:
+                principal = [(row, col)] + line
+        return principal
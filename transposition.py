@@ -0,0 +1,138 @@
+"""
+transposition.py - Transposition Table (bảng chuyển vị) cho AIEngine.
+
+Lưu kết quả tìm kiếm theo Zobrist hash của thế cờ để không phải tìm lại
+các thế cờ lặp lại do hoán vị thứ tự nước đi.
+"""
+
+from typing import Optional
+from consts import TT_SIZE, TT_REPLACEMENT
+
+# Loại bound của điểm lưu trong bảng
+EXACT: int = 0   # Điểm chính xác
+LOWER: int = 1   # Cận dưới (fail-high, điểm thực >= score)
+UPPER: int = 2   # Cận trên (fail-low, điểm thực <= score)
+
+REPLACEMENT_POLICIES: tuple[str, ...] = ("depth", "always")
+
+TTEntry = tuple[int, float, int, Optional[tuple[int, int]]]
+
+
+class TranspositionTable:
+    """
+    Bảng băm kích thước cố định, mỗi slot giữ một entry.
+
+    Entry gồm (depth, score, flag, best_move). Slot được chọn bằng
+    key % size; khi hai thế cờ khác nhau trùng slot, chính sách thay thế
+    quyết định entry nào được giữ lại:
+        - "depth": giữ entry sâu hơn, trừ khi entry cũ thuộc lượt tìm
+          kiếm trước (generation cũ)
+        - "always": luôn ghi đè
+
+    Attributes:
+        hits: Số lần probe trúng key
+        misses: Số lần probe không tìm thấy key
+        collisions: Số lần probe gặp slot đang chứa key khác
+        stores: Số lần ghi entry
+        overwrites: Số lần ghi đè entry của thế cờ khác
+    """
+
+    __slots__ = (
+        '_size', '_policy', '_keys', '_entries', '_ages', '_generation',
+        'hits', 'misses', 'collisions', 'stores', 'overwrites'
+    )
+
+    def __init__(self, size: int = TT_SIZE, policy: str = TT_REPLACEMENT) -> None:
+        if size <= 0:
+            raise ValueError(f"size phải dương, nhận {size}")
+        if policy not in REPLACEMENT_POLICIES:
+            raise ValueError(f"policy phải là một trong {REPLACEMENT_POLICIES}, nhận {policy!r}")
+        self._size: int = size
+        self._policy: str = policy
+        self._keys: list[Optional[int]] = [None] * size
+        self._entries: list[Optional[TTEntry]] = [None] * size
+        self._ages: list[int] = [0] * size
+        self._generation: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.collisions: int = 0
+        self.stores: int = 0
+        self.overwrites: int = 0
+
+    @property
+    def size(self) -> int:
+        """Số slot của bảng."""
+        return self._size
+
+    @property
+    def policy(self) -> str:
+        """Chính sách thay thế đang dùng."""
+        return self._policy
+
+    def new_search(self) -> None:
+        """Đánh dấu bắt đầu lượt tìm kiếm mới (entry cũ được ưu tiên thay thế)."""
+        self._generation += 1
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        """
+        Tra cứu entry theo key.
+
+        Returns:
+            (depth, score, flag, best_move) hoặc None nếu không có
+        """
+        index = key % self._size
+        stored = self._keys[index]
+        if stored == key:
+            self.hits += 1
+            return self._entries[index]
+        self.misses += 1
+        if stored is not None:
+            self.collisions += 1
+        return None
+
+    def store(
+        self,
+        key: int,
+        depth: int,
+        score: float,
+        flag: int,
+        best_move: Optional[tuple[int, int]]
+    ) -> None:
+        """Ghi entry theo chính sách thay thế."""
+        index = key % self._size
+        stored = self._keys[index]
+        if stored is not None and stored != key:
+            if (self._policy == "depth"
+                    and self._ages[index] == self._generation
+                    and self._entries[index][0] > depth):
+                return
+            self.overwrites += 1
+        elif stored == key and best_move is None:
+            # Giữ lại best_move cũ khi lần tìm mới không có (fail-low)
+            best_move = self._entries[index][3]
+        self._keys[index] = key
+        self._entries[index] = (depth, score, flag, best_move)
+        self._ages[index] = self._generation
+        self.stores += 1
+
+    def clear(self) -> None:
+        """Xóa toàn bộ entry (giữ nguyên bộ đếm)."""
+        self._keys = [None] * self._size
+        self._entries = [None] * self._size
+        self._ages = [0] * self._size
+
+    def reset_stats(self) -> None:
+        """Đưa các bộ đếm về 0."""
+        self.hits = self.misses = self.collisions = 0
+        self.stores = self.overwrites = 0
+
+    def stats(self) -> dict[str, int]:
+        """Trả về các bộ đếm dưới dạng dict."""
+        return {
+            'size': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+        }